@@ -4,87 +4,148 @@
 集成工具调用、多轮对话和策略决策逻辑
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.agents.react.base import DocstoreExplorer
-from langchain.memory import ConversationBufferMemory
 from langchain.schema import BaseMessage
 from langchain.tools import BaseTool
 from langchain.prompts import PromptTemplate
-from langchain_community.llms import Ollama
 import sys
 import os
+import queue
+import asyncio
+import threading
+import functools
+import contextvars
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from tracing import traced, annotate_span
 
+from .llm_client import PooledOllamaLLM, create_ollama_llm
+from .llm_health import get_health_monitor, is_llm_healthy
+from .deadline import DeadlineExceeded, request_deadline
+from .steps import Call, Parallel, Steps, run_steps, arun_steps
+from .streaming import StreamingEventHandler
+from .summary_memory import SummarizingTokenBufferMemory
+from .preferences import PreferenceTracker, PreferenceTrackingHistory
+from .session_store import get_session_store
+from .model_router import get_model_router
+from .intent_router import route_request, format_tool_answer
+from .lexicon import match_product_category
 from .tools.merchant_tools import (
     generate_product_title,
     suggest_strategy, 
     estimate_ctr,
-<<<<<<< HEAD
     analyze_competitor_title,
     set_llm_instance,
+    use_llm,
     preprocess_product_info,
     get_audience_profile
-=======
-    analyze_competitor_title
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
 )
 
 
-class MerchantAssistantAgent:
-    """商家智能助手Agent类"""
+# ReAct prompt 静态前缀：不含任何随请求变化的内容
+REACT_PROMPT_PREFIX = """你是一个专业的电商运营顾问助手，帮助商家完成商品内容优化与投放策略建议。
+
+你拥有以下工具来协助商家：
+{tools}
+
+工具名称：{tool_names}
+
+使用以下格式进行回复：
+
+Question: 用户的问题或需求
+Thought: 分析用户需求，确定需要使用哪些工具
+Action: 选择要使用的工具名称
+Action Input: 工具的输入参数
+Observation: 工具返回的结果
+... (可以重复 Thought/Action/Action Input/Observation 多次)
+Thought: 现在我知道最终答案了
+Final Answer: 给用户的最终回复，包含具体建议和解释
+
+工作原则：
+1. 始终站在商家角度，提供实用的运营建议
+2. 结合数据分析给出量化的评估结果
+3. 提供具体可执行的优化建议
+4. 如果需要多个工具配合，按合理顺序执行
+"""
+
+# ReAct prompt 动态部分：按变化频率从低到高排列
+REACT_PROMPT_SUFFIX = """
+当前对话历史：
+{chat_history}
+
+用户输入：{input}
+
+{agent_scratchpad}"""
+
+
+def _with_session_llm(method):
+    """让方法执行期间（含其派生的线程池任务和协程）的工具调用使用本会话的LLM"""
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            with use_llm(self.llm):
+                return await method(self, *args, **kwargs)
+        return async_wrapper
     
-    def __init__(self, llm_type: str = None, embedding_type: str = None):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with use_llm(self.llm):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _with_time_budget(method):
+    """为请求设置时间预算（AGENT_CONFIG.request_time_budget），期间的LLM调用以剩余时间为超时"""
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            with request_deadline(Config.AGENT_CONFIG["request_time_budget"]):
+                return await method(self, *args, **kwargs)
+        return async_wrapper
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with request_deadline(Config.AGENT_CONFIG["request_time_budget"]):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _deadline_response() -> Dict[str, Any]:
+    """超出时间预算时的返回结果"""
+    return {
+        "success": False,
+        "error": "请求超出时间预算",
+        "response": f"抱歉，本次请求未能在{Config.AGENT_CONFIG['request_time_budget']}秒内完成，"
+                    "请简化问题后重试，或使用单项工具分步处理。"
+    }
+
+
+class AgentCore:
+    """
+    进程内共享的Agent核心：LLM客户端、工具、编译好的prompt和Agent执行器
+    
+    核心不持有任何会话状态（对话记忆在调用时传入），同一LLM类型的所有会话共用一份
+    """
+    
+    def __init__(self, llm_type: str):
         """
-        初始化商家助手Agent
+        初始化Agent核心
         
         Args:
             llm_type: LLM类型 (mock, ollama_qwen, ollama_qwen_large)
-            embedding_type: Embedding类型 (mock, sentence_transformers, sentence_transformers_large)
         """
-        self.llm_type = llm_type or Config.DEFAULT_LLM
-        self.embedding_type = embedding_type or Config.DEFAULT_EMBEDDING
-        self.llm_config = Config.get_llm_config(self.llm_type)
-        self.embedding_config = Config.get_embedding_config(self.embedding_type)
+        self.llm_type = llm_type
+        self.llm_config = Config.get_llm_config(llm_type)
         
         # 初始化LLM
         self.llm = self._init_llm()
         
-<<<<<<< HEAD
-        # 设置LLM实例到工具中
-        set_llm_instance(self.llm)
-        
         # 初始化工具
         self.tools = self._init_tools()
+        self.tools_by_name = {tool.name: tool for tool in self.tools}
         
-        # 初始化增强记忆
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            max_token_limit=2000  # 控制记忆长度
-        )
-        
-        # 用户偏好记忆
-        self.user_preferences = {
-            "preferred_styles": [],
-            "target_audiences": [],
-            "feedback_history": [],
-            "successful_titles": [],
-            "successful_strategies": []
-        }
-        
-=======
-        # 初始化工具
-        self.tools = self._init_tools()
-        
-        # 初始化记忆
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
-        
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
         # 初始化Agent
         self.agent_executor = self._init_agent()
     
@@ -96,19 +157,17 @@ class MerchantAssistantAgent:
         
         elif self.llm_config["type"] == "ollama":
             try:
-                print(f"尝试连接Ollama模型: {self.llm_config['model_name']}")
-                llm = Ollama(
-                    model=self.llm_config["model_name"],
-                    base_url=self.llm_config["base_url"],
-                    temperature=self.llm_config.get("temperature", 0.7)
-                )
-                # 测试连接
-                test_response = llm.invoke("你好")
-                print(f"✅ Ollama模型连接成功: {self.llm_config['model_name']}")
+                llm = create_ollama_llm(self.llm_config)
+                # 健康状态由后台线程探测并在进程内共享，这里不等待生成结果
+                monitor = get_health_monitor(self.llm_config["base_url"])
+                status = monitor.get_status()
+                if status["last_check_ok"] is False:
+                    print(f"⚠️ Ollama服务暂不可用，工具将回退到规则引擎直至恢复: {status['last_error']}")
+                print(f"使用Ollama模型: {self.llm_config['model_name']}")
                 return llm
                 
             except Exception as e:
-                print(f"❌ Ollama连接失败: {e}")
+                print(f"❌ Ollama客户端初始化失败: {e}")
                 print("回退到模拟LLM模式")
                 return MockLLM()
         
@@ -128,40 +187,10 @@ class MerchantAssistantAgent:
     def _init_agent(self) -> AgentExecutor:
         """初始化Agent执行器"""
         
-        # 定义商家助手专用Prompt模板
-        prompt_template = """你是一个专业的电商运营顾问助手，帮助商家完成商品内容优化与投放策略建议。
-
-你拥有以下工具来协助商家：
-{tools}
-
-工具名称：{tool_names}
-
-使用以下格式进行回复：
-
-Question: 用户的问题或需求
-Thought: 分析用户需求，确定需要使用哪些工具
-Action: 选择要使用的工具名称
-Action Input: 工具的输入参数
-Observation: 工具返回的结果
-... (可以重复 Thought/Action/Action Input/Observation 多次)
-Thought: 现在我知道最终答案了
-Final Answer: 给用户的最终回复，包含具体建议和解释
-
-工作原则：
-1. 始终站在商家角度，提供实用的运营建议
-2. 结合数据分析给出量化的评估结果
-3. 提供具体可执行的优化建议
-4. 如果需要多个工具配合，按合理顺序执行
-
-当前对话历史：
-{chat_history}
-
-用户输入：{input}
-
-{agent_scratchpad}"""
-
+        # 静态前缀（角色、工具、格式、工作原则）放在最前且每次渲染结果逐字节一致，
+        # Ollama可复用该前缀的KV缓存，只需评估其后的对话历史、用户输入和推理过程
         prompt = PromptTemplate(
-            template=prompt_template,
+            template=REACT_PROMPT_PREFIX + REACT_PROMPT_SUFFIX,
             input_variables=["input", "chat_history", "agent_scratchpad"],
             partial_variables={
                 "tools": self._format_tools(),
@@ -169,29 +198,33 @@ Final Answer: 给用户的最终回复，包含具体建议和解释
             }
         )
         
-        # 创建ReAct Agent
+        # 创建ReAct Agent（使用同一份工具描述渲染，保证前缀与预热内容一致）
         agent = create_react_agent(
             llm=self.llm,
             tools=self.tools,
-            prompt=prompt
+            prompt=prompt,
+            tools_renderer=lambda tools: self._format_tools()
         )
         
+        if (isinstance(self.llm, PooledOllamaLLM) and Config.OLLAMA_CLIENT_CONFIG["warm_prompt_prefix"]
+                and is_llm_healthy(self.llm)):
+            self.llm.warm_up(self.get_static_prompt_prefix())
+        
+        # 不绑定记忆：执行器在会话间共享，对话历史由调用方按会话传入
         return AgentExecutor(
             agent=agent,
             tools=self.tools,
-            memory=self.memory,
             verbose=True,
-<<<<<<< HEAD
             max_iterations=10,  # 增加迭代次数
-            max_execution_time=300,  # 增加执行时间限制（5分钟）
+            max_execution_time=Config.AGENT_CONFIG["max_execution_time"],
             early_stopping_method="force",
             handle_parsing_errors=True
-=======
-            max_iterations=5,
-            early_stopping_method="generate"
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
         )
     
+    def get_static_prompt_prefix(self) -> str:
+        """渲染ReAct prompt的静态前缀"""
+        return REACT_PROMPT_PREFIX.format(tools=self._format_tools(), tool_names=self._format_tool_names())
+    
     def _format_tools(self) -> str:
         """格式化工具描述"""
         tool_descriptions = []
@@ -203,42 +236,185 @@ Final Answer: 给用户的最终回复，包含具体建议和解释
         """格式化工具名称列表"""
         tool_names = [tool.name for tool in self.tools]
         return ", ".join(tool_names)
+
+
+_agent_cores: Dict[str, AgentCore] = {}
+_agent_cores_lock = threading.Lock()
+
+
+def get_agent_core(llm_type: str = None) -> AgentCore:
+    """获取进程内共享的Agent核心，每种LLM类型只构建一次"""
+    llm_type = llm_type or Config.DEFAULT_LLM
+    with _agent_cores_lock:
+        core = _agent_cores.get(llm_type)
+        if core is None:
+            core = AgentCore(llm_type)
+            _agent_cores[llm_type] = core
+        return core
+
+
+class SessionState:
+    """单个会话独有的状态：对话记忆和用户偏好"""
     
-    def process_request(self, user_input: str) -> Dict[str, Any]:
+    def __init__(self, llm=None, preferences: PreferenceTracker = None):
         """
-<<<<<<< HEAD
-        处理用户请求（增强版，包含学习机制）
-=======
-        处理用户请求
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
+        Args:
+            llm: 用于生成对话摘要的LLM（通常为共享核心的LLM）
+            preferences: 已有的用户偏好状态，为空时新建
+        """
+        # 用户偏好：每条新消息写入对话历史时增量更新，读取无需扫描历史
+        self.preferences = preferences or PreferenceTracker(window=Config.MEMORY_CONFIG["preference_window"])
+        
+        # 最近轮次保留原文，超出token预算的早期轮次在后台折叠为摘要
+        self.memory = SummarizingTokenBufferMemory(
+            llm=llm,
+            chat_memory=PreferenceTrackingHistory(tracker=self.preferences),
+            memory_key="chat_history",
+            max_token_limit=Config.MEMORY_CONFIG["max_token_limit"],
+            summary_token_limit=Config.MEMORY_CONFIG["summary_token_limit"]
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """导出可持久化的会话状态：最近消息、摘要和用户偏好"""
+        return {"memory": self.memory.export_state(), "preferences": self.preferences.to_dict()}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], llm=None) -> "SessionState":
+        """从 to_dict 的结果恢复会话状态"""
+        session = cls(llm=llm, preferences=PreferenceTracker.from_dict(data.get("preferences", {})))
+        session.memory.load_state(data.get("memory", {}))
+        return session
+
+
+class MerchantAssistantAgent:
+    """商家智能助手Agent类"""
+    
+    def __init__(self, llm_type: str = None, embedding_type: str = None, session: SessionState = None,
+                 session_id: str = None):
+        """
+        初始化商家助手Agent
+        
+        LLM、工具和Agent执行器取自进程内共享的核心，每个实例只创建自己的会话状态，
+        因此为每个浏览器会话创建实例的开销很小
         
         Args:
-            user_input: 用户输入
-            
-        Returns:
-            处理结果字典
+            llm_type: LLM类型 (mock, ollama_qwen, ollama_qwen_large)
+            embedding_type: Embedding类型 (mock, sentence_transformers, sentence_transformers_large)
+            session: 会话状态，为空时新建
+            session_id: 会话ID（如商家ID）；启用会话存储时从存储中恢复状态，并在每轮对话后异步保存
         """
+        self.llm_type = llm_type or Config.DEFAULT_LLM
+        self.embedding_type = embedding_type or Config.DEFAULT_EMBEDDING
+        self.embedding_config = Config.get_embedding_config(self.embedding_type)
+        
+        self.core = get_agent_core(self.llm_type)
+        self.session_id = session_id
+        self.session = session or self._load_session()
+        
+        # 工具在每次请求中通过上下文变量使用本会话的LLM（见_with_session_llm）；
+        # 进程默认值仅供脚本在创建Agent后直接调用工具
+        set_llm_instance(self.llm)
+    
+    @property
+    def llm_config(self) -> Dict[str, Any]:
+        return self.core.llm_config
+    
+    @property
+    def llm(self):
+        return self.core.llm
+    
+    @property
+    def tools(self) -> List[BaseTool]:
+        return self.core.tools
+    
+    @property
+    def _tools_by_name(self) -> Dict[str, BaseTool]:
+        return self.core.tools_by_name
+    
+    @property
+    def agent_executor(self) -> AgentExecutor:
+        return self.core.agent_executor
+    
+    @property
+    def memory(self) -> SummarizingTokenBufferMemory:
+        return self.session.memory
+    
+    @property
+    def user_preferences(self) -> Dict[str, list]:
+        return self.session.preferences.get()
+    
+    def get_static_prompt_prefix(self) -> str:
+        """渲染ReAct prompt的静态前缀"""
+        return self.core.get_static_prompt_prefix()
+    
+    def _load_session(self) -> SessionState:
+        """从会话存储恢复状态，没有会话ID、未启用存储或没有记录时新建"""
+        store = get_session_store() if self.session_id else None
+        if store is not None:
+            data = store.load(self.session_id)
+            if data:
+                print(f"已恢复会话状态: {self.session_id}")
+                return SessionState.from_dict(data, llm=self.core.llm)
+        return SessionState(llm=self.core.llm)
+    
+    def _save_session(self):
+        """异步保存会话状态（未启用存储或没有会话ID时跳过）"""
+        store = get_session_store() if self.session_id else None
+        if store is not None:
+            store.save_async(self.session_id, self.session.to_dict())
+    
+    def _remember_turn(self, user_input: str, output: str):
+        """写入本轮对话并保存会话状态"""
+        self.memory.save_context({"input": user_input}, {"output": output})
+        self._save_session()
+    
+    def clear_history(self):
+        """清空对话记忆与用户偏好，并同步到会话存储"""
+        self.memory.clear()
+        self._save_session()
+    
+    def _agent_inputs(self, user_input: str) -> Dict[str, Any]:
+        """组装Agent输入：用户输入加本会话的对话历史"""
+        return {"input": user_input, **self.memory.load_memory_variables({})}
+    
+    def _request_steps(self, user_input: str, callbacks: List[Any] = None) -> Steps:
+        """处理用户请求的流程（process_request 与 aprocess_request 共用）"""
+        config = {"callbacks": callbacks} if callbacks else None
+        
+        # 意图明确的单工具请求直接调用工具，不经过ReAct循环（LLM不可用时工具回退到规则引擎）
+        route = self._route_fast_path(user_input)
+        if route:
+            try:
+                tool_output = yield Call(self._tools_by_name[route["tool"]], route["tool_input"], {"config": config})
+                return self._finish_fast_path(user_input, route, tool_output)
+            except Exception as e:
+                print(f"快速路由执行失败，交由Agent处理: {e}")
+        
+        core = self._planning_core()
+        if not is_llm_healthy(core.llm):
+            return {
+                "success": False,
+                "error": "LLM服务暂不可用",
+                "response": "抱歉，模型服务暂时不可用，请稍后再试，或使用单项工具获取规则引擎结果。"
+            }
+        
         try:
-<<<<<<< HEAD
             # 在处理前分析用户输入，提取偏好线索
             self._analyze_user_feedback(user_input)
             
-=======
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
             # 执行Agent
-            result = self.agent_executor.invoke({"input": user_input})
+            result = yield Call(core.agent_executor, self._agent_inputs(user_input), {"config": config})
+            self._remember_turn(user_input, result["output"])
             
             return {
                 "success": True,
                 "response": result["output"],
-<<<<<<< HEAD
                 "chat_history": self.memory.chat_memory.messages,
                 "learned_preferences": self.extract_user_preferences_from_history()
-=======
-                "chat_history": self.memory.chat_memory.messages
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
             }
             
+        except DeadlineExceeded:
+            return _deadline_response()
         except Exception as e:
             return {
                 "success": False,
@@ -246,7 +422,111 @@ Final Answer: 给用户的最终回复，包含具体建议和解释
                 "response": f"抱歉，处理您的请求时出现了错误：{str(e)}"
             }
     
-<<<<<<< HEAD
+    @traced("agent.process_request", kind="request", attributes=lambda self, user_input, callbacks=None: {"input_chars": len(user_input)})
+    @_with_session_llm
+    @_with_time_budget
+    def process_request(self, user_input: str, callbacks: List[Any] = None) -> Dict[str, Any]:
+        """
+        处理用户请求（增强版，包含学习机制）
+        
+        Args:
+            user_input: 用户输入
+            callbacks: 传给AgentExecutor的LangChain回调（可选）
+            
+        Returns:
+            处理结果字典
+        """
+        return run_steps(self._request_steps(user_input, callbacks))
+    
+    @traced("agent.process_request", kind="request", attributes=lambda self, user_input, callbacks=None: {"input_chars": len(user_input)})
+    @_with_session_llm
+    @_with_time_budget
+    async def aprocess_request(self, user_input: str, callbacks: List[Any] = None) -> Dict[str, Any]:
+        """
+        process_request 的异步版本，工具与LLM调用均在事件循环中执行
+        
+        任务被取消时 CancelledError 向上传递，不转换为错误结果
+        """
+        return await arun_steps(self._request_steps(user_input, callbacks))
+    
+    def _planning_core(self) -> AgentCore:
+        """ReAct推理使用的Agent核心：按模型路由策略选择模型，未路由时为本会话的核心"""
+        router = get_model_router()
+        if not router.enabled or not isinstance(self.llm, PooledOllamaLLM):
+            return self.core
+        llm_type, reason = router.select("agent")
+        core = get_agent_core(llm_type) if llm_type else self.core
+        router.record_decision("agent", core.llm_config.get("model_name"), reason)
+        return core
+    
+    def _route_fast_path(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """判断请求能否走快速路由"""
+        if not Config.AGENT_CONFIG["intent_fast_path"]:
+            return None
+        route = route_request(user_input)
+        if route and route["tool"] in self._tools_by_name:
+            annotate_span(route="fast_path", tool=route["tool"])
+            return route
+        annotate_span(route="agent")
+        return None
+    
+    def _finish_fast_path(self, user_input: str, route: Dict[str, Any], tool_output: Any) -> Dict[str, Any]:
+        """格式化快速路由结果并写入对话记忆，返回值与Agent路径一致"""
+        self._analyze_user_feedback(user_input)
+        response = format_tool_answer(route["tool"], route["tool_input"], tool_output)
+        self._remember_turn(user_input, response)
+        
+        return {
+            "success": True,
+            "response": response,
+            "route": "fast_path",
+            "tool": route["tool"],
+            "chat_history": self.memory.chat_memory.messages,
+            "learned_preferences": self.extract_user_preferences_from_history()
+        }
+    
+    def stream_request(self, user_input: str) -> Iterator[Dict[str, Any]]:
+        """
+        流式处理用户请求，边执行边产出事件
+        
+        事件类型：
+            tool_start / tool_end: 工具调用开始与结束
+            token: 最终回答的增量文本
+            final: 处理完成，内容与process_request的返回值相同
+        
+        工作线程中未被process_request处理的异常会在产出已有事件后于调用方重新抛出
+        
+        Args:
+            user_input: 用户输入
+            
+        Yields:
+            事件字典
+        """
+        events = queue.Queue()
+        handler = StreamingEventHandler(events)
+        
+        def run():
+            # 无论工作线程如何结束都写入结束标记，消费方不会一直阻塞
+            try:
+                result = self.process_request(user_input, callbacks=[handler])
+                events.put({"type": "final", **result})
+            except BaseException as e:
+                events.put(e)
+            finally:
+                events.put(None)
+        
+        # 在新线程中沿用当前上下文（追踪span、缓存绕过等上下文变量）
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name="merchant-agent-stream", daemon=True).start()
+        
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            if isinstance(event, BaseException):
+                raise event
+            yield event
+    
     def _analyze_user_feedback(self, user_input: str):
         """分析用户输入中的反馈信息"""
         user_input_lower = user_input.lower()
@@ -259,150 +539,167 @@ Final Answer: 给用户的最终回复，包含具体建议和解释
         # 例如：记录用户对特定风格或策略的反馈
         pass
     
-=======
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
-    def generate_complete_solution(self, product_info: str, 
-                                 competitor_title: str = None,
-                                 target_audience: str = "通用",
-                                 budget: str = "中等") -> Dict[str, Any]:
-        """
-<<<<<<< HEAD
-        生成完整的商品优化解决方案（融入历史记忆）
-=======
-        生成完整的商品优化解决方案
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
-        
-        Args:
-            product_info: 商品信息
-            competitor_title: 竞品标题（可选）
-            target_audience: 目标受众
-            budget: 预算水平
-            
-        Returns:
-            完整解决方案
-        """
-        
-<<<<<<< HEAD
-        # 提取历史偏好
+    def _start_solution(self, product_info: str, target_audience: str, budget: str) -> Dict[str, Any]:
+        """提取历史偏好，创建解决方案骨架"""
         preferences = self.extract_user_preferences_from_history()
-        contextual_suggestions = self.get_contextual_suggestions(product_info, target_audience)
+        contextual_suggestions = self.get_contextual_suggestions(product_info, target_audience, preferences)
         
-        solution = {
+        return {
             "product_info": product_info,
             "target_audience": target_audience,
             "budget": budget,
             "user_preferences": preferences,
             "contextual_suggestions": contextual_suggestions
         }
+    
+    def _plan_solution_tasks(self, solution: Dict[str, Any], competitor_title: str = None) -> Dict[str, Any]:
+        """
+        准备解决方案中各工具的输入参数
         
-        try:
-            # 1. 生成商品标题（多个版本，考虑历史偏好）
-            titles = []
-            
-            # 基于历史偏好调整风格顺序
-            base_styles = ["爆款", "简约", "高端"]
-            if preferences["preferred_styles"]:
-                # 将偏好风格放在前面
-                preferred = preferences["preferred_styles"][0]
-                if preferred in base_styles:
-                    base_styles.remove(preferred)
-                    base_styles.insert(0, preferred)
-            
-            for style in base_styles:
-                # 构建包含历史偏好的上下文信息
-                enhanced_product_info = product_info
-                if contextual_suggestions:
-                    enhanced_product_info += f"\n\n用户偏好提示: {contextual_suggestions}"
-                
-                title_result = generate_product_title.invoke({
+        Returns:
+            包含 styles、title_inputs、strategy_input、competitor_input、keywords 的任务计划
+        """
+        product_info = solution["product_info"]
+        target_audience = solution["target_audience"]
+        preferences = solution["user_preferences"]
+        contextual_suggestions = solution["contextual_suggestions"]
+        
+        # 基于历史偏好调整风格顺序
+        base_styles = ["爆款", "简约", "高端"]
+        if preferences["preferred_styles"]:
+            # 将偏好风格放在前面
+            preferred = preferences["preferred_styles"][0]
+            if preferred in base_styles:
+                base_styles.remove(preferred)
+                base_styles.insert(0, preferred)
+        
+        # 构建包含历史偏好的上下文信息
+        enhanced_product_info = product_info
+        if contextual_suggestions:
+            enhanced_product_info += f"\n\n用户偏好提示: {contextual_suggestions}"
+        
+        # 从商品信息中提取类型
+        product_type = self._extract_product_type(product_info)
+        
+        # 增强策略输入信息
+        enhanced_strategy_input = product_info
+        if contextual_suggestions:
+            enhanced_strategy_input += f"\n\n用户历史偏好: {contextual_suggestions}"
+        if preferences["target_audiences"]:
+            enhanced_strategy_input += f"\n\n用户关注的受众群体: {', '.join(preferences['target_audiences'])}"
+        
+        # 提取关键词
+        import jieba
+        keywords = [k for k in jieba.cut(product_info) if len(k) > 1][:5]
+        
+        return {
+            "styles": base_styles,
+            "title_inputs": [
+                {
                     "product_info": enhanced_product_info,
                     "style": style,
                     "target_audience": target_audience
-=======
-        solution = {
-            "product_info": product_info,
-            "target_audience": target_audience,
-            "budget": budget
-        }
-        
-        try:
-            # 1. 生成商品标题（多个版本）
-            titles = []
-            styles = ["爆款", "简约", "高端"]
-            
-            for style in styles:
-                title_result = generate_product_title.invoke({
-                    "product_info": product_info,
-                    "style": style
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
-                })
-                titles.append({
-                    "style": style,
-                    "title": title_result
-                })
-            
-            solution["generated_titles"] = titles
-            
-            # 2. 获取策略建议
-            # 从商品信息中提取类型
-            product_type = self._extract_product_type(product_info)
-            
-<<<<<<< HEAD
-            # 增强策略输入信息
-            enhanced_strategy_input = product_info
-            if contextual_suggestions:
-                enhanced_strategy_input += f"\n\n用户历史偏好: {contextual_suggestions}"
-            if preferences["target_audiences"]:
-                enhanced_strategy_input += f"\n\n用户关注的受众群体: {', '.join(preferences['target_audiences'])}"
-            
-            strategy_result = suggest_strategy.invoke({
+                }
+                for style in base_styles
+            ],
+            "strategy_input": {
                 "product_type": product_type,
                 "target_audience": target_audience,
-                "budget": budget,
+                "budget": solution["budget"],
                 "product_info": enhanced_strategy_input
-=======
-            strategy_result = suggest_strategy.invoke({
-                "product_type": product_type,
-                "target_audience": target_audience,
-                "budget": budget
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
+            },
+            "competitor_input": {
+                "competitor_title": competitor_title,
+                "our_keywords": keywords
+            } if competitor_title else None,
+            "keywords": keywords
+        }
+    
+    def _finish_solution(self, solution: Dict[str, Any], plan: Dict[str, Any], generated_titles: List[Optional[str]],
+                         strategy_suggestion: Optional[str], competitor_analysis: Optional[Dict[str, Any]]):
+        """
+        汇总工具结果：评估标题CTR并推荐最佳标题
+        
+        超出时间预算而未完成的步骤结果为None，对应部分在 sections 中标记为 missing；
+        部分风格的标题未完成时标题部分标记为 partial
+        """
+        sections = {}
+        
+        # 1. 生成商品标题（多个版本，考虑历史偏好）
+        titles = [
+            {"style": style, "title": title}
+            for style, title in zip(plan["styles"], generated_titles)
+            if title is not None
+        ]
+        solution["generated_titles"] = titles
+        sections["generated_titles"] = (
+            "done" if len(titles) == len(plan["styles"]) else "partial" if titles else "missing"
+        )
+        
+        # 2. 获取策略建议
+        solution["strategy_suggestion"] = strategy_suggestion
+        sections["strategy_suggestion"] = "missing" if strategy_suggestion is None else "done"
+        
+        # 3. 评估标题CTR
+        ctr_evaluations = []
+        for title_info in titles:
+            ctr_result = estimate_ctr.invoke({
+                "title": title_info["title"],
+                "keywords": plan["keywords"]
             })
             
-            solution["strategy_suggestion"] = strategy_result
-            
-            # 3. 评估标题CTR
-            # 提取关键词
-            import jieba
-            keywords = [k for k in jieba.cut(product_info) if len(k) > 1][:5]
-            
-            ctr_evaluations = []
-            for title_info in titles:
-                ctr_result = estimate_ctr.invoke({
-                    "title": title_info["title"],
-                    "keywords": keywords
-                })
-                
-                ctr_evaluations.append({
-                    "style": title_info["style"],
-                    "title": title_info["title"],
-                    "ctr_analysis": ctr_result
-                })
-            
-            solution["ctr_evaluations"] = ctr_evaluations
-            
-            # 4. 竞品分析（如果提供）
-            if competitor_title:
-                competitor_analysis = analyze_competitor_title.invoke({
-                    "competitor_title": competitor_title,
-                    "our_keywords": keywords
-                })
+            ctr_evaluations.append({
+                "style": title_info["style"],
+                "title": title_info["title"],
+                "ctr_analysis": ctr_result
+            })
+        
+        solution["ctr_evaluations"] = ctr_evaluations
+        sections["ctr_evaluations"] = sections["generated_titles"]
+        
+        # 4. 竞品分析（如果提供）
+        if plan["competitor_input"]:
+            if competitor_analysis is not None:
                 solution["competitor_analysis"] = competitor_analysis
+            sections["competitor_analysis"] = "missing" if competitor_analysis is None else "done"
+        
+        # 5. 推荐最佳标题
+        if ctr_evaluations:
+            solution["recommended_title"] = max(ctr_evaluations, key=lambda x: x["ctr_analysis"]["ctr_score"])
+            sections["recommended_title"] = "done"
+        else:
+            solution["recommended_title"] = None
+            sections["recommended_title"] = "missing"
+        
+        solution["sections"] = sections
+        solution["partial"] = any(status != "done" for status in sections.values())
+        solution["success"] = bool(ctr_evaluations)
+        if not ctr_evaluations:
+            solution["error"] = "超出时间预算，未能生成标题"
+    
+    def _solution_steps(self, product_info: str, competitor_title: str, target_audience: str, budget: str,
+                        time_budget: Optional[float]) -> Steps:
+        """生成一站式方案的流程（generate_complete_solution 与 agenerate_complete_solution 共用）"""
+        solution = self._start_solution(product_info, target_audience, budget)
+        
+        try:
+            plan = self._plan_solution_tasks(solution, competitor_title)
+            
+            with request_deadline(self._solution_time_budget(time_budget)):
+                # 标题生成、策略建议、竞品分析互不依赖，并发执行；只等待到截止时间，未完成的步骤结果为None
+                calls = [Call(generate_product_title, title_input) for title_input in plan["title_inputs"]]
+                calls.append(Call(suggest_strategy, plan["strategy_input"]))
+                if plan["competitor_input"]:
+                    calls.append(Call(analyze_competitor_title, plan["competitor_input"]))
+                results = yield Parallel(calls, Config.AGENT_CONFIG["solution_concurrency"])
             
-            # 5. 推荐最佳标题
-            best_title = max(ctr_evaluations, key=lambda x: x["ctr_analysis"]["ctr_score"])
-            solution["recommended_title"] = best_title
+            title_count = len(plan["title_inputs"])
+            generated_titles = results[:title_count]
+            strategy_suggestion = results[title_count]
+            competitor_analysis = results[title_count + 1] if plan["competitor_input"] else None
             
-            solution["success"] = True
+            self._finish_solution(solution, plan, generated_titles, strategy_suggestion, competitor_analysis)
+            annotate_span(partial=solution["partial"])
             
         except Exception as e:
             solution["success"] = False
@@ -410,70 +707,69 @@ Final Answer: 给用户的最终回复，包含具体建议和解释
         
         return solution
     
-    def _extract_product_type(self, product_info: str) -> str:
-        """从商品信息中提取商品类型"""
-        type_keywords = {
-            "服装": ["连衣裙", "衬衫", "T恤", "裤子", "裙子", "外套", "服装"],
-            "数码": ["手机", "电脑", "耳机", "平板", "充电器", "数码"],
-            "美妆": ["口红", "粉底", "面膜", "护肤", "化妆品", "美妆"],
-            "家居": ["床单", "枕头", "台灯", "收纳", "家具", "家居"],
-            "食品": ["零食", "茶叶", "咖啡", "糖果", "食品"]
-        }
+    @traced("agent.generate_complete_solution", kind="request")
+    @_with_session_llm
+    def generate_complete_solution(self, product_info: str, 
+                                 competitor_title: str = None,
+                                 target_audience: str = "通用",
+                                 budget: str = "中等",
+                                 time_budget: float = None) -> Dict[str, Any]:
+        """
+        生成完整的商品优化解决方案（融入历史记忆）
         
-        for category, keywords in type_keywords.items():
-            for keyword in keywords:
-                if keyword in product_info:
-                    return category
+        Args:
+            product_info: 商品信息
+            competitor_title: 竞品标题（可选）
+            target_audience: 目标受众
+            budget: 预算水平
+            time_budget: 时间预算（秒），为空时使用 AGENT_CONFIG.solution_time_budget，0表示不限时；
+                超时后返回已完成的部分，未完成部分在 sections 中标记为 missing
+            
+        Returns:
+            完整解决方案
+        """
+        return run_steps(self._solution_steps(product_info, competitor_title, target_audience, budget, time_budget))
+    
+    @traced("agent.generate_complete_solution", kind="request")
+    @_with_session_llm
+    async def agenerate_complete_solution(self, product_info: str, 
+                                        competitor_title: str = None,
+                                        target_audience: str = "通用",
+                                        budget: str = "中等",
+                                        time_budget: float = None) -> Dict[str, Any]:
+        """
+        generate_complete_solution 的异步版本
         
-        return "服装"  # 默认类型
-<<<<<<< HEAD
+        各工具以协程在事件循环中并发执行，并发数受 solution_concurrency 限制；
+        超出时间预算时取消未完成的工具任务并返回已完成的部分；
+        任务被取消时 CancelledError 向上传递，未完成的LLM请求随之中止
+        """
+        return await arun_steps(self._solution_steps(product_info, competitor_title, target_audience, budget, time_budget))
+    
+    def _solution_time_budget(self, time_budget: Optional[float]) -> Optional[float]:
+        """解析一站式方案的时间预算（秒），None使用配置值（AGENT_CONFIG.solution_time_budget）"""
+        return Config.AGENT_CONFIG["solution_time_budget"] if time_budget is None else time_budget
+    
+    def get_llm_status(self) -> Dict[str, Any]:
+        """获取当前LLM的健康状态"""
+        base_url = getattr(self.llm, "base_url", None)
+        if not base_url:
+            return {"state": "mock", "healthy": True}
+        return get_health_monitor(base_url).get_status()
+    
+    def _extract_product_type(self, product_info: str) -> str:
+        """从商品信息中提取商品类型"""
+        return match_product_category(product_info) or "服装"  # 默认类型
     
     def extract_user_preferences_from_history(self) -> dict:
-        """从对话历史中提取用户偏好"""
-        messages = self.memory.chat_memory.messages
-        preferences = {
-            "preferred_styles": [],
-            "target_audiences": [],
-            "keywords_liked": [],
-            "keywords_disliked": [],
-            "price_ranges": [],
-            "product_types": []
-        }
-        
-        # 分析历史消息
-        for message in messages[-10:]:  # 只分析最近10条消息
-            content = str(message.content).lower()
-            
-            # 提取偏好的风格
-            for style in ["爆款", "简约", "高端"]:
-                if style in content and ("喜欢" in content or "好" in content or "棒" in content):
-                    preferences["preferred_styles"].append(style)
-            
-            # 提取目标受众
-            for audience in ["年轻女性", "中年女性", "年轻男性", "学生"]:
-                if audience in content:
-                    preferences["target_audiences"].append(audience)
-            
-            # 提取反馈关键词
-            if "不好" in content or "不行" in content or "不喜欢" in content:
-                # 提取负面反馈相关的词汇
-                words = content.split()
-                for i, word in enumerate(words):
-                    if word in ["不好", "不行", "不喜欢"] and i > 0:
-                        preferences["keywords_disliked"].append(words[i-1])
-        
-        # 去重和统计频次
-        for key in preferences:
-            if preferences[key]:
-                from collections import Counter
-                counter = Counter(preferences[key])
-                preferences[key] = [item for item, count in counter.most_common(3)]
-        
-        return preferences
-    
-    def get_contextual_suggestions(self, product_info: str, target_audience: str) -> str:
+        """获取用户偏好（随每条新消息增量更新，统计最近若干条消息）"""
+        return self.session.preferences.get()
+    
+    def get_contextual_suggestions(self, product_info: str, target_audience: str,
+                                   preferences: Dict[str, list] = None) -> str:
         """基于历史偏好生成上下文建议"""
-        preferences = self.extract_user_preferences_from_history()
+        if preferences is None:
+            preferences = self.extract_user_preferences_from_history()
         
         suggestions = []
         
@@ -491,8 +787,6 @@ Final Answer: 给用户的最终回复，包含具体建议和解释
             suggestions.append(f"我会避免使用您不喜欢的词汇：{', '.join(preferences['keywords_disliked'][:2])}")
         
         return "; ".join(suggestions) if suggestions else ""
-=======
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
 
 
 class MockLLM:
@@ -507,49 +801,6 @@ class MockLLM:
     
     def invoke(self, prompt: str) -> str:
         """模拟LLM调用"""
-<<<<<<< HEAD
-=======
-        # 简化的Agent响应逻辑
-        if "Question:" in prompt or "用户输入：" in prompt:
-            # 提取用户输入
-            lines = prompt.split('\n')
-            user_input = ""
-            for line in lines:
-                if "用户输入：" in line:
-                    user_input = line.split("用户输入：")[-1].strip()
-                    break
-            
-            # 基于关键词生成响应
-            if "标题" in user_input:
-                return """Thought: 用户需要生成商品标题，我应该使用generate_product_title工具
-Action: generate_product_title
-Action Input: {"product_info": "商品信息", "style": "爆款"}
-Observation: 【热销爆款】商品名称，品质保证
-Thought: 现在我知道最终答案了
-Final Answer: 我为您生成了一个爆款风格的商品标题：【热销爆款】商品名称，品质保证。这个标题突出了商品的热销特点和品质保证，能够吸引用户点击。"""
-                
-            elif "策略" in user_input:
-                return """Thought: 用户需要营销策略建议，我应该使用suggest_strategy工具
-Action: suggest_strategy  
-Action Input: {"product_type": "服装", "target_audience": "年轻女性", "budget": "中等"}
-Observation: 建议采用抖音话题挑战营销，配合KOL合作推广
-Thought: 现在我知道最终答案了
-Final Answer: 根据您的需求，我建议采用以下营销策略：参与抖音话题挑战，使用时尚穿搭等标签，配合KOL合作进行推广。这种策略适合年轻女性群体，能够有效提升品牌知名度和转化率。"""
-                
-            elif "CTR" in user_input or "评估" in user_input:
-                return """Thought: 用户需要CTR评估，我应该使用estimate_ctr工具
-Action: estimate_ctr
-Action Input: {"title": "商品标题", "keywords": ["关键词1", "关键词2"]}
-Observation: {"ctr_score": 0.85, "ctr_percentage": "85%", "recommendations": ["优化建议"]}
-Thought: 现在我知道最终答案了
-Final Answer: 经过分析，该标题的CTR评分为85%，整体质量较好。建议可以进一步优化关键词覆盖率和标题长度以获得更好的效果。"""
-                
-            else:
-                return f"""Thought: 用户的问题是关于商家运营的，我需要提供专业建议
-Thought: 现在我知道最终答案了
-Final Answer: 感谢您的咨询！作为电商运营顾问助手，我可以帮您解决商品标题优化、营销策略制定、CTR效果评估等问题。请告诉我您的具体需求，我会为您提供专业的建议。"""
-        
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
         return "这是一个模拟回复，请配置真实的LLM服务以获得更好的体验。"
     
     def __call__(self, prompt: str) -> str:
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+请求截止时间模块
+请求入口设置时间预算，截止时间通过contextvars沿调用链（含线程池和协程）传递，
+每次LLM调用以剩余时间作为超时，超出预算时抛出DeadlineExceeded
+"""
+
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+
+# 当前请求的截止时间（time.monotonic()），None表示不限时
+_deadline: contextvars.ContextVar = contextvars.ContextVar("merchant_request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求超出时间预算"""
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """
+    在该上下文内设置时间预算
+
+    嵌套使用时取更早的截止时间；seconds为None或0时不限时（沿用外层截止时间）
+    """
+    if not seconds:
+        yield remaining_time()
+        return
+
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield seconds
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """剩余时间（秒），不限时返回None，已超时返回0"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def deadline_exceeded() -> bool:
+    """当前请求是否已超出时间预算"""
+    return remaining_time() == 0.0
+
+
+def check_deadline():
+    """已超出时间预算时抛出DeadlineExceeded"""
+    if deadline_exceeded():
+        raise DeadlineExceeded("请求超出时间预算")
+
+
+def deadline_timeout(timeout: float) -> float:
+    """以剩余时间收紧超时设置，已超时时抛出DeadlineExceeded"""
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining == 0.0:
+        raise DeadlineExceeded("请求超出时间预算")
+    return min(timeout, remaining)
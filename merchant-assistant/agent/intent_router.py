@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+意图快速路由模块
+对意图明确的单工具请求（生成标题、评估CTR、策略建议、竞品分析）用规则抽取参数，
+直接调用工具并格式化回复，省去ReAct循环中的工具选择与最终回答两次LLM调用；
+意图不明确、涉及多步骤或依赖对话上下文的请求返回None，交由Agent处理
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from .tools.merchant_tools import preprocess_product_info
+from .lexicon import match_product_category
+
+
+# 各工具的触发表达（正则）
+INTENT_PATTERNS = {
+    "generate_product_title": re.compile(r'(生成|写|起|取|想|拟)(一)?个?(爆款|简约|高端)?(风格)?的?(商品)?标题|标题生成'),
+    "estimate_ctr": re.compile(r'ctr|点击率|评估(一下)?(这个)?标题|(给)?标题打分'),
+    "suggest_strategy": re.compile(r'(营销|推广|投放|运营)策略|策略建议|(怎么|如何)推广'),
+    "analyze_competitor_title": re.compile(r'竞品')
+}
+
+# 多步骤或依赖上下文的表达，出现时交由Agent处理
+AGENT_ONLY_MARKERS = ["然后", "并且", "同时", "再帮", "再给", "顺便", "以及", "另外", "刚才", "上一个", "之前", "上面"]
+
+# 否定或条件表达（如“不要写标题：…”“如果预算低的话…”），意图可能与关键词相反，交由Agent处理；
+# “别”排除“特别”“区别”“级别”“别致”等常见词
+NEGATION_PATTERN = re.compile(r'不要|不用|无需|不需要|不必|先不|(?<![特区类级性识差分派告])别(?!致)|如果|假如|要是|的话')
+
+# 请求用语，抽取商品信息时去掉
+INSTRUCTION_FILLERS = ["帮我", "麻烦", "请", "给我", "给", "为", "一下", "吧", "商品"]
+
+STYLES = ["爆款", "简约", "高端"]
+AUDIENCES = ["年轻女性", "中年女性", "年轻男性", "中年男性", "学生"]
+BUDGET_PATTERNS = [("低", ["低预算", "预算低", "预算少", "预算不多", "预算有限"]),
+                   ("高", ["高预算", "预算高", "预算充足", "预算多"]),
+                   ("中等", ["中等预算", "预算中等", "预算一般"])]
+
+QUOTE_PATTERN = re.compile(r'[“"「『《]([^”"」』》]+)[”"」』》]')
+KEYWORDS_PATTERN = re.compile(r'关键词[是为：:\s]*([^，。；;\n]+)')
+
+
+def detect_intent(user_input: str) -> Optional[str]:
+    """识别唯一明确的工具意图，命中多个或未命中时返回None"""
+    text = user_input.lower()
+    if any(marker in text for marker in AGENT_ONLY_MARKERS) or NEGATION_PATTERN.search(text):
+        return None
+
+    matched = [tool for tool, pattern in INTENT_PATTERNS.items() if pattern.search(text)]
+    # 竞品分析通常会提到标题和CTR，以竞品意图为准
+    if "analyze_competitor_title" in matched:
+        matched = ["analyze_competitor_title"] if "generate_product_title" not in matched else matched
+    return matched[0] if len(matched) == 1 else None
+
+
+def _find_option(text: str, options: List[str], default: str) -> str:
+    return next((option for option in options if option in text), default)
+
+
+def _find_budget(text: str) -> str:
+    for budget, patterns in BUDGET_PATTERNS:
+        if any(pattern in text for pattern in patterns):
+            return budget
+    return "中等"
+
+
+def _extract_payload(text: str) -> str:
+    """取冒号后的内容作为工具输入，没有冒号时返回空字符串"""
+    match = re.search(r'[：:]\s*(.+)$', text, re.S)
+    return match.group(1).strip() if match else ""
+
+
+def _extract_quoted_or_payload(text: str) -> str:
+    """优先取引号/书名号中的内容，其次取冒号后的内容"""
+    quoted = QUOTE_PATTERN.search(text)
+    if quoted:
+        return quoted.group(1).strip()
+    payload = _extract_payload(text)
+    # 冒号后若还带有关键词说明，只保留标题部分
+    return re.split(r'[，,；;]?\s*关键词', payload)[0].strip()
+
+
+def _extract_keywords(text: str) -> List[str]:
+    match = KEYWORDS_PATTERN.search(text)
+    if not match:
+        return []
+    return [keyword.strip() for keyword in re.split(r'[,，、\s]+', match.group(1)) if keyword.strip()]
+
+
+def _strip_instruction(text: str, pattern: re.Pattern) -> str:
+    """去掉触发表达和请求用语，剩余部分作为商品信息"""
+    text = pattern.sub(" ", text)
+    for filler in INSTRUCTION_FILLERS:
+        text = text.replace(filler, " ")
+    return re.sub(r'^[\s，,。！!？?]+|[\s，,。！!？?]+$', '', re.sub(r'\s+', ' ', text))
+
+
+def _route_title(user_input: str) -> Optional[Dict[str, Any]]:
+    product_info = _extract_payload(user_input) or _strip_instruction(user_input, INTENT_PATTERNS["generate_product_title"])
+    if not product_info:
+        return None
+
+    processed = preprocess_product_info(product_info)
+    # 至少识别出商品类型或价格，才认为商品信息足够明确
+    if not processed["product_type"] and not processed["price"]:
+        return None
+
+    instruction = user_input.replace(product_info, "")
+    return {
+        "product_info": product_info,
+        "style": _find_option(instruction, STYLES, "爆款"),
+        "target_audience": _find_option(user_input, AUDIENCES, "通用")
+    }
+
+
+def _route_ctr(user_input: str) -> Optional[Dict[str, Any]]:
+    title = _extract_quoted_or_payload(user_input)
+    if len(title) < 4:
+        return None
+
+    tool_input = {"title": title}
+    keywords = _extract_keywords(user_input)
+    if keywords:
+        tool_input["keywords"] = keywords
+    return tool_input
+
+
+def _route_strategy(user_input: str) -> Optional[Dict[str, Any]]:
+    product_type = match_product_category(user_input)
+    if not product_type:
+        return None
+
+    return {
+        "product_type": product_type,
+        "target_audience": _find_option(user_input, AUDIENCES, "通用"),
+        "budget": _find_budget(user_input),
+        "product_info": _extract_payload(user_input) or user_input
+    }
+
+
+def _route_competitor(user_input: str) -> Optional[Dict[str, Any]]:
+    competitor_title = _extract_quoted_or_payload(user_input)
+    if len(competitor_title) < 4:
+        return None
+
+    tool_input = {"competitor_title": competitor_title}
+    keywords = _extract_keywords(user_input)
+    if keywords:
+        tool_input["our_keywords"] = keywords
+    return tool_input
+
+
+_ARGUMENT_EXTRACTORS = {
+    "generate_product_title": _route_title,
+    "estimate_ctr": _route_ctr,
+    "suggest_strategy": _route_strategy,
+    "analyze_competitor_title": _route_competitor
+}
+
+
+def route_request(user_input: str) -> Optional[Dict[str, Any]]:
+    """
+    尝试将用户请求路由到单个工具
+
+    Returns:
+        {"tool": 工具名, "tool_input": 工具参数}，无法确定时返回None
+    """
+    intent = detect_intent(user_input)
+    if intent is None:
+        return None
+
+    tool_input = _ARGUMENT_EXTRACTORS[intent](user_input.strip())
+    if tool_input is None:
+        return None
+    return {"tool": intent, "tool_input": tool_input}
+
+
+def format_tool_answer(tool_name: str, tool_input: Dict[str, Any], output: Any) -> str:
+    """将工具结果格式化为给商家的回复"""
+    if tool_name == "generate_product_title":
+        return (f"为您生成的{tool_input['style']}风格标题（目标受众：{tool_input['target_audience']}）：\n\n"
+                f"**{output}**")
+
+    if tool_name == "estimate_ctr":
+        lines = [
+            f"标题「{tool_input['title']}」的预估CTR为 **{output['ctr_percentage']}**",
+            f"- 关键词覆盖率：{output['coverage_rate']:.1%}（覆盖：{', '.join(output['covered_keywords']) or '无'}）",
+            f"- 标题长度：{output['title_length']}字符",
+            "",
+            "优化建议："
+        ]
+        lines.extend(f"- {suggestion}" for suggestion in output["recommendations"])
+        return "\n".join(lines)
+
+    if tool_name == "suggest_strategy":
+        return (f"针对{tool_input['product_type']}类商品（受众：{tool_input['target_audience']}，"
+                f"预算：{tool_input['budget']}）的营销策略建议：\n\n{output}")
+
+    if tool_name == "analyze_competitor_title":
+        competitor_ctr = output["competitor_ctr_analysis"]
+        lines = [
+            f"竞品标题「{output['competitor_title']}」的预估CTR为 **{competitor_ctr['ctr_percentage']}**",
+            f"- 共同关键词：{', '.join(output['common_keywords']) or '无'}",
+            f"- 竞品独有关键词：{', '.join(output['competitor_unique_keywords'][:5]) or '无'}",
+            "",
+            "差异化建议："
+        ]
+        lines.extend(f"- {suggestion}" for suggestion in output["differentiation_suggestions"])
+        if output.get("detailed_analysis"):
+            lines.extend(["", output["detailed_analysis"]])
+        return "\n".join(lines)
+
+    return str(output)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+词表模块
+商品类型、颜色、季节、卖点、受众词、吸引力词、紧急词、偏好词等词表集中定义，供商品信息预处理、
+标题评估、CTR预估、意图路由和偏好提取共用；词表都很小，调用方直接逐词 `word in text` 查找
+"""
+
+from typing import Dict, Sequence
+
+
+# 商品信息要素
+PRODUCT_TYPES = ["连衣裙", "T恤", "衬衫", "裤子", "裙子", "外套", "鞋子", "包包", "手机", "电脑", "耳机", "口红", "面膜", "护肤品"]
+COLORS = ["粉色", "红色", "蓝色", "黑色", "白色", "灰色", "绿色", "黄色", "紫色", "橙色"]
+SEASONS = ["春季", "夏季", "秋季", "冬季", "春", "夏", "秋", "冬"]
+FEATURES = ["新款", "热销", "限量", "进口", "纯棉", "真丝", "防水", "透气", "显瘦", "百搭", "时尚", "经典"]
+
+# 标题质量评估与CTR预估
+TITLE_AUDIENCE_WORDS = {
+    "年轻女性": ["少女心", "甜美", "仙女", "小清新", "网红", "种草", "心动", "爱了", "可爱", "萌"],
+    "中年女性": ["优雅", "知性", "舒适", "百搭", "经典", "品质", "气质", "精致", "温柔"],
+    "年轻男性": ["潮流", "酷炫", "科技", "个性", "性能", "专业", "给力", "帅气"],
+    "学生": ["学生", "性价比", "实用", "省钱", "必备", "超值", "便宜", "划算"]
+}
+ATTRACTIVE_WORDS = ["限时", "特惠", "新款", "热销", "爆款", "必入", "推荐", "精选", "优选", "抢购"]
+EMOTION_SYMBOLS = ["【", "】", "🔥", "💕", "✨", "🌸", "⭐", "👑", "💎"]
+URGENT_WORDS = ["限时", "抢购", "特惠", "新品", "爆款", "热销"]
+
+# 商品大类
+PRODUCT_TYPE_KEYWORDS = {
+    "服装": ["连衣裙", "衬衫", "T恤", "裤子", "裙子", "外套", "服装"],
+    "数码": ["手机", "电脑", "耳机", "平板", "充电器", "数码"],
+    "美妆": ["口红", "粉底", "面膜", "护肤", "化妆品", "美妆"],
+    "家居": ["床单", "枕头", "台灯", "收纳", "家具", "家居"],
+    "食品": ["零食", "茶叶", "咖啡", "糖果", "食品"]
+}
+
+# 用户偏好信号
+PREFERENCE_STYLES = ["爆款", "简约", "高端"]
+PREFERENCE_AUDIENCES = ["年轻女性", "中年女性", "年轻男性", "学生"]
+POSITIVE_MARKERS = ["喜欢", "好", "棒"]
+NEGATIVE_MARKERS = ["不好", "不行", "不喜欢"]
+
+
+# 全部词表（类别 -> 词表），供基准测试和一致性检查使用
+LEXICONS: Dict[str, Sequence[str]] = {
+    "product_type": PRODUCT_TYPES,
+    "color": COLORS,
+    "season": SEASONS,
+    "feature": FEATURES,
+    **{f"audience:{audience}": words for audience, words in TITLE_AUDIENCE_WORDS.items()},
+    "attractive": ATTRACTIVE_WORDS,
+    "emotion_symbol": EMOTION_SYMBOLS,
+    "urgent": URGENT_WORDS,
+    **{f"category:{category}": words for category, words in PRODUCT_TYPE_KEYWORDS.items()},
+    "preference_style": PREFERENCE_STYLES,
+    "preference_audience": PREFERENCE_AUDIENCES,
+    "positive": POSITIVE_MARKERS,
+    "negative": NEGATIVE_MARKERS
+}
+
+
+def match_product_category(text: str) -> str:
+    """按PRODUCT_TYPE_KEYWORDS的顺序返回第一个出现关键词的商品大类，未命中返回空字符串"""
+    return next(
+        (category for category, words in PRODUCT_TYPE_KEYWORDS.items() if any(word in text for word in words)), ""
+    )
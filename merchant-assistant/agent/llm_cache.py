@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+LLM响应缓存模块
+按 模型名、温度、prompt哈希 缓存生成结果：内存LRU在前，SQLite持久化在后，
+支持过期时间、容量上限、命中率统计，以及"重新生成"时的单次绕过
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from metrics import CacheStats
+
+
+# 为True时当前上下文内的LLM调用跳过缓存读取（结果仍会写回缓存）
+_bypass_cache = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_llm_cache():
+    """在该上下文内跳过缓存读取，用于"重新生成"；线程池任务通过copy_context继承该设置"""
+    token = _bypass_cache.set(True)
+    try:
+        yield
+    finally:
+        _bypass_cache.reset(token)
+
+
+def is_cache_bypassed() -> bool:
+    """当前上下文是否要求跳过缓存"""
+    return _bypass_cache.get()
+
+
+def make_cache_key(model: str, temperature: float, prompt: str, stop: Optional[List[str]] = None,
+                   num_predict: Optional[int] = None) -> str:
+    """
+    生成缓存键
+
+    停止词和生成长度上限会改变生成结果，一并计入哈希
+    """
+    prompt_material = prompt
+    if stop or num_predict:
+        prompt_material += "\x00" + json.dumps({"stop": stop, "num_predict": num_predict}, ensure_ascii=False)
+    prompt_hash = hashlib.sha256(prompt_material.encode("utf-8")).hexdigest()
+    return f"{model}|{temperature}|{prompt_hash}"
+
+
+class LLMResponseCache:
+    """内存LRU + SQLite 两级LLM响应缓存"""
+
+    def __init__(self, path: str, memory_entries: int = 256, max_entries: int = 10000,
+                 ttl_seconds: float = 7 * 24 * 3600):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite文件路径
+            memory_entries: 内存LRU容量
+            max_entries: 磁盘缓存容量上限；条目数估计超出上限一定余量后，批量淘汰最久未访问的条目
+            ttl_seconds: 条目有效期（秒），0表示永不过期
+        """
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.stats = CacheStats()
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()  # 保护内存LRU
+        self._db_lock = threading.Lock()  # 保护SQLite连接，磁盘读写不阻塞内存命中
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, "
+            "created_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)")
+        self._conn.commit()
+
+        # 磁盘条目数估计（写入时递增，覆盖写入会高估），超出上限加余量时才统计并淘汰，避免每次写入都COUNT
+        self._eviction_slack = max(1, max_entries // 10)
+        self._disk_count_estimate = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """查询缓存，未命中或已过期返回None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    self.stats.hit()
+                    return response
+                del self._memory[key]
+
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.miss()
+                return None
+
+            response, created_at = row
+            if self._is_expired(created_at, now):
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._disk_count_estimate -= 1
+                self.stats.miss()
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+
+        with self._lock:
+            self._remember(key, response, created_at)
+            self.disk_hits += 1
+        self.stats.hit()
+        return response
+
+    def set(self, key: str, response: str, model: str = ""):
+        """写入缓存"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now)
+            )
+            self._disk_count_estimate += 1
+            if self._disk_count_estimate > self.max_entries + self._eviction_slack:
+                self._evict_disk()
+            self._conn.commit()
+
+    def _remember(self, key: str, response: str, created_at: float):
+        """写入内存LRU（调用方持有锁）"""
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        """批量淘汰超出容量的磁盘条目，并校正条目数估计（调用方持有 _db_lock）"""
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+        self._disk_count_estimate = min(count, self.max_entries)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._disk_count_estimate = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._db_lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        with self._lock:
+            memory_entries = len(self._memory)
+        return {
+            "path": self.path,
+            "memory_entries": memory_entries,
+            "disk_entries": disk_entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            **self.stats.to_dict()
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """获取进程内共享的LLM响应缓存；未启用时返回None"""
+    global _cache
+    cache_config = Config.LLM_CACHE_CONFIG
+    if not cache_config["enabled"]:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(
+                Config.resolve_path(cache_config["path"]),
+                memory_entries=cache_config["memory_entries"],
+                max_entries=cache_config["max_entries"],
+                ttl_seconds=cache_config["ttl_seconds"]
+            )
+        return _cache
@@ -0,0 +1,598 @@
+# -*- coding: utf-8 -*-
+"""
+Ollama客户端模块
+按服务地址共享keep-alive连接池，同步与异步调用共同限制并发请求数，并记录每次调用耗时
+"""
+
+import os
+import sys
+import json
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from metrics import LatencyTracker
+from tracing import start_span
+from .llm_health import get_health_monitor
+from .llm_cache import get_llm_cache, is_cache_bypassed, make_cache_key
+from .deadline import DeadlineExceeded, check_deadline, deadline_exceeded, deadline_timeout
+
+
+class OllamaConnectionPool:
+    """
+    单个Ollama服务地址的共享连接池
+
+    同步与异步调用共用同一组并发名额，进程内发往该地址的请求数不超过max_in_flight；
+    同步请求使用requests会话，异步请求使用所在事件循环的aiohttp会话
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 10, max_in_flight: int = 4):
+        """
+        初始化连接池
+
+        Args:
+            base_url: Ollama服务地址
+            pool_size: keep-alive连接池大小
+            max_in_flight: 同时进行中的最大请求数
+        """
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.max_in_flight = max_in_flight
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.latency = LatencyTracker()
+
+        # 事件循环 -> (会话生命周期异步生成器, aiohttp会话)
+        self._async_sessions: Dict[asyncio.AbstractEventLoop, Tuple[AsyncGenerator, aiohttp.ClientSession]] = {}
+
+    @contextmanager
+    def slot(self, timeout: float = None):
+        """占用一个并发名额，超时未获得则抛出TimeoutError；产出排队等待秒数"""
+        queued_at = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"等待Ollama并发名额超时: {self.base_url}")
+        queued_seconds = self._enter_slot(queued_at)
+        try:
+            yield queued_seconds
+        finally:
+            self._exit_slot()
+
+    @asynccontextmanager
+    async def aslot(self, timeout: float = None):
+        """
+        slot 的异步版本，与同步调用共用并发名额
+
+        名额被占满时以递增间隔轮询并让出事件循环，不占用线程；任务在等待中被取消时不会遗留名额
+        """
+        queued_at = time.perf_counter()
+        interval = 0.005
+        while not self._slots.acquire(blocking=False):
+            if timeout is not None and time.perf_counter() - queued_at >= timeout:
+                raise TimeoutError(f"等待Ollama并发名额超时: {self.base_url}")
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, 0.05)
+        queued_seconds = self._enter_slot(queued_at)
+        try:
+            yield queued_seconds
+        finally:
+            self._exit_slot()
+
+    def _enter_slot(self, queued_at: float) -> float:
+        """已获得名额：记录排队耗时并计入进行中请求数"""
+        queued_seconds = time.perf_counter() - queued_at
+        self.latency.record("queue", queued_seconds)
+        with self._lock:
+            self.in_flight += 1
+        return queued_seconds
+
+    def _exit_slot(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def post(self, path: str, payload: Dict[str, Any], timeout: float, metric: str = None) -> Dict[str, Any]:
+        """
+        发送JSON请求并返回JSON结果
+
+        Args:
+            path: 接口路径，如 /api/generate
+            payload: 请求体
+            timeout: 总超时（秒），包含排队等待
+            metric: 耗时统计名称
+        """
+        client_config = Config.OLLAMA_CLIENT_CONFIG
+        started = time.perf_counter()
+
+        with self.slot(timeout=timeout):
+            remaining = max(timeout - (time.perf_counter() - started), 0.001)
+            response = self.session.post(
+                f"{self.base_url}{path}",
+                json=payload,
+                timeout=(client_config["connect_timeout"], remaining)
+            )
+            response.raise_for_status()
+            result = response.json()
+
+        self.latency.record(metric or path, time.perf_counter() - started)
+        return result
+
+    def stream_post(self, path: str, payload: Dict[str, Any], timeout: float, metric: str = None,
+                    span=None) -> Iterator[Dict[str, Any]]:
+        """
+        发送流式请求，逐行产出JSON结果（Ollama NDJSON格式）
+
+        Args:
+            path: 接口路径
+            payload: 请求体
+            timeout: 总超时（秒），包含排队等待与流式读取；每收到一行数据检查一次，超出时抛出 requests.Timeout
+            metric: 耗时统计名称，首个数据到达时间记录为 <metric>.first_token
+            span: 追踪span，记录排队与首token耗时
+        """
+        client_config = Config.OLLAMA_CLIENT_CONFIG
+        metric = metric or path
+        started = time.perf_counter()
+        first_received = False
+
+        with self.slot(timeout=timeout) as queued_seconds:
+            if span:
+                span.set(queue_ms=round(queued_seconds * 1000, 3))
+            # 读取超时取排队后的剩余时间，服务端停止输出时也不会超过总超时太久
+            remaining = max(timeout - (time.perf_counter() - started), 0.001)
+            response = self.session.post(
+                f"{self.base_url}{path}",
+                json=payload,
+                stream=True,
+                timeout=(client_config["connect_timeout"], remaining)
+            )
+            try:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if time.perf_counter() - started > timeout:
+                        raise requests.Timeout(f"流式请求超过总超时 {timeout} 秒: {path}")
+                    if not line:
+                        continue
+                    if not first_received:
+                        first_received = True
+                        self._record_first_token(metric, started, span)
+                    yield json.loads(line)
+            finally:
+                response.close()
+
+        self.latency.record(metric, time.perf_counter() - started)
+
+    async def astream_post(self, path: str, payload: Dict[str, Any], timeout: float,
+                           metric: str = None, span=None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        stream_post 的异步版本
+
+        总超时（含排队等待与流式读取）由aiohttp的total超时保证，超出时抛出 asyncio.TimeoutError；
+        任务被取消时连接随之关闭，Ollama会停止该次生成
+        """
+        client_config = Config.OLLAMA_CLIENT_CONFIG
+        metric = metric or path
+        started = time.perf_counter()
+        first_received = False
+        session = await self._async_session()
+
+        async with self.aslot(timeout=timeout) as queued_seconds:
+            if span:
+                span.set(queue_ms=round(queued_seconds * 1000, 3))
+            remaining = max(timeout - (time.perf_counter() - started), 0.001)
+            async with session.post(
+                f"{self.base_url}{path}",
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=remaining, sock_connect=client_config["connect_timeout"])
+            ) as response:
+                response.raise_for_status()
+                async for line in response.content:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    if not first_received:
+                        first_received = True
+                        self._record_first_token(metric, started, span)
+                    yield json.loads(line)
+
+        self.latency.record(metric, time.perf_counter() - started)
+
+    def _record_first_token(self, metric: str, started: float, span):
+        first_token_seconds = time.perf_counter() - started
+        self.latency.record(f"{metric}.first_token", first_token_seconds)
+        if span:
+            span.set(first_token_ms=round(first_token_seconds * 1000, 3))
+
+    async def _async_session(self) -> aiohttp.ClientSession:
+        """当前事件循环的aiohttp会话（aiohttp会话绑定事件循环，每个循环一个）"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_sessions.get(loop)
+        if entry is None:
+            lifetime = self._session_lifetime(loop)
+            entry = (lifetime, await lifetime.__anext__())
+            with self._lock:
+                self._async_sessions[loop] = entry
+        return entry[1]
+
+    async def _session_lifetime(self, loop: asyncio.AbstractEventLoop) -> AsyncGenerator[aiohttp.ClientSession, None]:
+        """
+        持有事件循环的aiohttp会话直至循环结束
+
+        事件循环在关闭前（如asyncio.run收尾时）会关闭其中未结束的异步生成器，
+        借此在循环关闭时关闭会话，无需调用方显式清理
+        """
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        try:
+            yield session
+        finally:
+            with self._lock:
+                self._async_sessions.pop(loop, None)
+            await session.close()
+
+    async def aclose(self):
+        """关闭当前事件循环中的aiohttp会话"""
+        with self._lock:
+            entry = self._async_sessions.get(asyncio.get_running_loop())
+        if entry is not None:
+            await entry[0].aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        return {
+            "base_url": self.base_url,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "latency": self.latency.snapshot()
+        }
+
+
+_pools: Dict[str, OllamaConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_ollama_pool(base_url: str, max_in_flight: Optional[int] = None) -> OllamaConnectionPool:
+    """
+    获取（或创建）指定服务地址的共享连接池
+
+    Args:
+        base_url: Ollama服务地址
+        max_in_flight: 指定时以此并发上限创建连接池（需在该地址的首次请求前调用），
+            不指定时使用 OLLAMA_CLIENT_CONFIG 中的配置
+    """
+    key = base_url.rstrip("/")
+    with _pools_lock:
+        if key not in _pools:
+            client_config = Config.OLLAMA_CLIENT_CONFIG
+            if max_in_flight is None:
+                max_in_flight = client_config["max_in_flight_per_host"].get(key, client_config["max_in_flight"])
+            _pools[key] = OllamaConnectionPool(
+                key,
+                pool_size=client_config["pool_size"],
+                max_in_flight=max_in_flight
+            )
+        elif max_in_flight is not None and _pools[key].max_in_flight != max_in_flight:
+            raise ValueError(f"连接池已按并发上限 {_pools[key].max_in_flight} 创建: {key}")
+        return _pools[key]
+
+
+async def aclose_ollama_pools():
+    """提前关闭当前事件循环中所有连接池的aiohttp会话（循环结束时也会自动关闭）"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        await pool.aclose()
+
+
+def get_ollama_pool_stats() -> List[Dict[str, Any]]:
+    """获取所有连接池的统计信息"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.get_stats() for pool in pools]
+
+
+# 测量模式下最近的单次调用耗时拆分
+_generation_measurements: Deque[Dict[str, Any]] = deque(maxlen=200)
+
+
+def record_generation_stats(base_url: str, model: str, data: Dict[str, Any], prompt_chars: int):
+    """
+    记录Ollama返回的耗时拆分（模型加载、prompt评估、token生成）
+
+    prompt_eval_count 只统计实际评估的token，命中前缀缓存的部分不计入
+    """
+    latency = get_ollama_pool(base_url).latency
+    metric = f"generate.{model}"
+    for stage, key in [("load", "load_duration"), ("prompt_eval", "prompt_eval_duration"), ("eval", "eval_duration")]:
+        if data.get(key) is not None:
+            latency.record(f"{metric}.{stage}", data[key] / 1e9)
+    # 单token生成耗时，模型路由据此按生成预算估算各模型的耗时
+    if data.get("eval_duration") is not None and data.get("eval_count"):
+        latency.record(f"{metric}.eval_per_token", data["eval_duration"] / 1e9 / data["eval_count"])
+
+    if not Config.OLLAMA_CLIENT_CONFIG["measure_generation"]:
+        return
+
+    measurement = {
+        "model": model,
+        "prompt_chars": prompt_chars,
+        "prompt_eval_count": data.get("prompt_eval_count", 0),
+        "prompt_eval_ms": round(data.get("prompt_eval_duration", 0) / 1e6, 1),
+        "eval_count": data.get("eval_count", 0),
+        "eval_ms": round(data.get("eval_duration", 0) / 1e6, 1),
+        "load_ms": round(data.get("load_duration", 0) / 1e6, 1),
+        "total_ms": round(data.get("total_duration", 0) / 1e6, 1)
+    }
+    _generation_measurements.append(measurement)
+    print(f"[测量] {model} prompt评估 {measurement['prompt_eval_count']} tokens / {measurement['prompt_eval_ms']}ms，"
+          f"生成 {measurement['eval_count']} tokens / {measurement['eval_ms']}ms，加载 {measurement['load_ms']}ms")
+
+
+def get_generation_measurements() -> List[Dict[str, Any]]:
+    """获取测量模式下记录的单次调用耗时拆分"""
+    return list(_generation_measurements)
+
+
+class PooledOllamaLLM(LLM):
+    """通过共享连接池调用Ollama的LangChain LLM"""
+
+    model: str
+    base_url: str = "http://localhost:11434"
+    temperature: float = 0.7
+    timeout: float = 120.0
+    keep_alive: Optional[str] = None
+    num_ctx: Optional[int] = None
+    generation_budgets: Dict[str, Dict[str, Any]] = {}  # 按任务的生成预算，未显式传入num_predict时使用"agent"预算
+
+    @property
+    def _llm_type(self) -> str:
+        return "pooled_ollama"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "base_url": self.base_url, "temperature": self.temperature, "num_ctx": self.num_ctx}
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        """调用 /api/generate 并返回完整生成文本（内部按流式读取，回调可逐token收到结果）"""
+        return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        """流式调用 /api/generate，逐token产出，并记录LLM调用span"""
+        span = start_span("llm.generate", kind="llm", model=self.model, prompt_chars=len(prompt))
+        completion_chars = 0
+        try:
+            for chunk in self._stream_chunks(prompt, stop, run_manager, span, **kwargs):
+                completion_chars += len(chunk.text)
+                yield chunk
+        except BaseException as e:
+            span.set(completion_chars=completion_chars)
+            span.end(e)
+            raise
+        span.set(completion_chars=completion_chars)
+        span.end()
+
+    def _stream_chunks(self, prompt: str, stop: Optional[List[str]], run_manager, span,
+                       **kwargs: Any) -> Iterator[GenerationChunk]:
+        """
+        流式调用 /api/generate，逐token产出
+
+        启用响应缓存时命中结果一次性产出；传入 use_cache=False 或处于 bypass_llm_cache()
+        上下文时跳过缓存读取，生成结果仍写回缓存
+        """
+        cache, cache_key, cached = self._lookup_cache(prompt, stop, kwargs)
+        span.set(cached=cached is not None)
+        if cached is not None:
+            chunk = GenerationChunk(text=cached, generation_info={"cached": True})
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            return
+
+        texts = []
+        monitor = get_health_monitor(self.base_url)
+        if not monitor.acquire_request():
+            raise ConnectionError(f"Ollama服务熔断中: {self.base_url}")
+        recorded = False
+        try:
+            # 处于请求时间预算内时，以剩余时间作为排队和读取超时，并在每个数据块后检查截止时间
+            for data in get_ollama_pool(self.base_url).stream_post(
+                "/api/generate",
+                self._build_payload(prompt, stop, kwargs),
+                timeout=deadline_timeout(kwargs.get("timeout", self.timeout)),
+                metric=f"generate.{self.model}",
+                span=span
+            ):
+                check_deadline()
+                chunk = self._to_chunk(data, prompt, span)
+                texts.append(chunk.text)
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            monitor.record_success()
+            recorded = True
+        except DeadlineExceeded:
+            raise
+        except (requests.ConnectionError, requests.Timeout, TimeoutError) as e:
+            # 因时间预算收紧超时导致的失败不计入服务健康状态
+            if deadline_exceeded():
+                raise DeadlineExceeded("请求超出时间预算") from e
+            monitor.record_failure(str(e))
+            recorded = True
+            raise
+        finally:
+            # 超出时间预算或调用方提前停止读取时没有结果，释放可能占用的试探名额
+            if not recorded:
+                monitor.release_trial()
+
+        if cache:
+            cache.set(cache_key, "".join(texts), model=self.model)
+
+    def _to_chunk(self, data: Dict[str, Any], prompt: str, span) -> GenerationChunk:
+        """把一行流式结果转换为GenerationChunk；最后一行记录耗时拆分和token数"""
+        if not data.get("done"):
+            return GenerationChunk(text=data.get("response", ""))
+        record_generation_stats(self.base_url, self.model, data, len(prompt))
+        span.set(prompt_tokens=data.get("prompt_eval_count"), completion_tokens=data.get("eval_count"),
+                 prompt_eval_ms=round(data.get("prompt_eval_duration", 0) / 1e6, 1),
+                 eval_ms=round(data.get("eval_duration", 0) / 1e6, 1))
+        return GenerationChunk(
+            text=data.get("response", ""),
+            generation_info={key: value for key, value in data.items() if key != "response"}
+        )
+
+    def _build_payload(self, prompt: str, stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """构建 /api/generate 请求体；num_ctx 与 keep_alive 各次调用保持一致，避免模型重新加载"""
+        options = {"temperature": self.temperature}
+        if self.num_ctx:
+            options["num_ctx"] = self.num_ctx
+        if stop:
+            options["stop"] = stop
+        num_predict = self._num_predict(kwargs)
+        if num_predict:
+            options["num_predict"] = num_predict
+
+        payload = {"model": self.model, "prompt": prompt, "stream": True, "options": options}
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _num_predict(self, kwargs: Dict[str, Any]) -> Optional[int]:
+        """本次调用的最大生成token数：显式传入优先，否则使用默认生成预算"""
+        return kwargs.get("num_predict") or self.generation_budgets.get("agent", {}).get("num_predict")
+
+    def warm_up(self, prompt_prefix: str = "") -> threading.Thread:
+        """
+        后台加载模型并预热prompt前缀的KV缓存
+
+        Ollama会复用与上一次请求相同的prompt前缀，预热后Agent首次调用无需重新评估静态前缀
+        """
+        def run():
+            try:
+                payload = {**self._build_payload(prompt_prefix, None, {"num_predict": 1}), "stream": False}
+                result = get_ollama_pool(self.base_url).post(
+                    "/api/generate", payload, timeout=self.timeout, metric=f"warmup.{self.model}"
+                )
+                record_generation_stats(self.base_url, self.model, result, len(prompt_prefix))
+            except Exception as e:
+                print(f"Ollama预热失败: {e}")
+
+        thread = threading.Thread(target=run, name=f"ollama-warmup-{self.model}", daemon=True)
+        thread.start()
+        return thread
+
+    def _lookup_cache(self, prompt: str, stop: Optional[List[str]], kwargs: Dict[str, Any]):
+        """
+        查询响应缓存
+
+        Returns:
+            (缓存实例, 缓存键, 命中结果)，未启用缓存时缓存实例为None，未命中时结果为None
+        """
+        cache = get_llm_cache()
+        if cache is None:
+            return None, None, None
+
+        cache_key = make_cache_key(self.model, self.temperature, prompt, stop, self._num_predict(kwargs))
+        if not kwargs.get("use_cache", True) or is_cache_bypassed():
+            return cache, cache_key, None
+        return cache, cache_key, cache.get(cache_key)
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        """异步调用 /api/generate 并返回完整生成文本"""
+        chunks = []
+        async for chunk in self._astream(prompt, stop, run_manager, **kwargs):
+            chunks.append(chunk.text)
+        return "".join(chunks)
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        """异步流式调用 /api/generate，逐token产出，并记录LLM调用span"""
+        span = start_span("llm.generate", kind="llm", model=self.model, prompt_chars=len(prompt))
+        completion_chars = 0
+        try:
+            async for chunk in self._astream_chunks(prompt, stop, run_manager, span, **kwargs):
+                completion_chars += len(chunk.text)
+                yield chunk
+        except BaseException as e:
+            span.set(completion_chars=completion_chars)
+            span.end(e)
+            raise
+        span.set(completion_chars=completion_chars)
+        span.end()
+
+    async def _astream_chunks(self, prompt: str, stop: Optional[List[str]], run_manager, span,
+                              **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        """异步流式调用 /api/generate，逐token产出，缓存规则与 _stream 相同"""
+        cache, cache_key, cached = self._lookup_cache(prompt, stop, kwargs)
+        span.set(cached=cached is not None)
+        if cached is not None:
+            chunk = GenerationChunk(text=cached, generation_info={"cached": True})
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            return
+
+        texts = []
+        monitor = get_health_monitor(self.base_url)
+        if not monitor.acquire_request():
+            raise ConnectionError(f"Ollama服务熔断中: {self.base_url}")
+        recorded = False
+        try:
+            async for data in get_ollama_pool(self.base_url).astream_post(
+                "/api/generate",
+                self._build_payload(prompt, stop, kwargs),
+                timeout=deadline_timeout(kwargs.get("timeout", self.timeout)),
+                metric=f"generate.{self.model}",
+                span=span
+            ):
+                check_deadline()
+                chunk = self._to_chunk(data, prompt, span)
+                texts.append(chunk.text)
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            monitor.record_success()
+            recorded = True
+        except DeadlineExceeded:
+            raise
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError, TimeoutError) as e:
+            if deadline_exceeded():
+                raise DeadlineExceeded("请求超出时间预算") from e
+            monitor.record_failure(str(e))
+            recorded = True
+            raise
+        finally:
+            # 超出时间预算或调用方提前停止读取时没有结果，释放可能占用的试探名额
+            if not recorded:
+                monitor.release_trial()
+
+        if cache:
+            cache.set(cache_key, "".join(texts), model=self.model)
+
+
+def create_ollama_llm(llm_config: Dict[str, Any]) -> PooledOllamaLLM:
+    """根据LLM_CONFIGS中的ollama配置创建LLM实例"""
+    return PooledOllamaLLM(
+        model=llm_config["model_name"],
+        base_url=llm_config["base_url"],
+        temperature=llm_config.get("temperature", 0.7),
+        timeout=llm_config.get("timeout", Config.OLLAMA_CLIENT_CONFIG["request_timeout"]),
+        keep_alive=llm_config.get("keep_alive"),
+        num_ctx=llm_config.get("num_ctx"),
+        generation_budgets=Config.get_generation_budgets(llm_config)
+    )
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+LLM健康监测模块
+后台线程定期探测Ollama存活接口，按服务地址在进程内共享结果，
+并通过熔断器在服务不可用时让工具回退到规则引擎；
+熔断器的关闭只取决于真实的生成调用，存活探测成功只能在冷却期满后把熔断推进到试探恢复
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+
+class OllamaHealthMonitor:
+    """Ollama服务健康监测与熔断器"""
+
+    CLOSED = "closed"        # 正常，请求直接发往LLM
+    OPEN = "open"            # 熔断，请求回退到规则引擎
+    HALF_OPEN = "half_open"  # 试探恢复，同一时间只放行一个试探请求，成功则关闭、失败则重新熔断
+
+    def __init__(self, base_url: str, check_interval: float = 15, probe_timeout: float = 2,
+                 failure_threshold: int = 3, recovery_timeout: float = 30):
+        """
+        初始化健康监测
+
+        Args:
+            base_url: Ollama服务地址
+            check_interval: 后台探测间隔（秒）
+            probe_timeout: 单次探测超时（秒）
+            failure_threshold: 连续失败多少次后熔断
+            recovery_timeout: 熔断后多久进入试探恢复（秒）；试探请求超过该时间没有结果时放行新的试探
+        """
+        self.base_url = base_url.rstrip("/")
+        self.check_interval = check_interval
+        self.probe_timeout = probe_timeout
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = None  # 试探恢复中进行中的试探请求的开始时间
+        self.last_check_at = None
+        self.last_check_ok = None
+        self.last_probe_latency = None
+        self.last_error = ""
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动后台探测线程（不阻塞调用方）"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name=f"ollama-health-{self.base_url}", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """停止后台探测线程"""
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.check()
+            self._stop_event.wait(self.check_interval)
+
+    def check(self) -> bool:
+        """
+        探测存活接口（/api/version 不触发模型加载或生成）
+
+        探测失败计入连续失败；探测成功不清零真实调用的失败计数，也不直接关闭熔断：
+        服务过载时存活接口仍可能正常响应，而生成请求持续超时
+        """
+        started = time.perf_counter()
+        try:
+            response = requests.get(f"{self.base_url}/api/version", timeout=self.probe_timeout)
+            response.raise_for_status()
+            ok = True
+            error = ""
+        except Exception as e:
+            ok = False
+            error = str(e)
+
+        with self._lock:
+            self.last_check_at = time.time()
+            self.last_check_ok = ok
+            self.last_probe_latency = time.perf_counter() - started
+            self.last_error = error
+
+        if ok:
+            self._record_probe_success()
+        else:
+            self.record_failure(error)
+        return ok
+
+    def _record_probe_success(self):
+        """存活探测成功：熔断冷却期满后进入试探恢复，由下一次真实调用决定是否关闭"""
+        with self._lock:
+            self._enter_half_open_if_cooled()
+
+    def _enter_half_open_if_cooled(self):
+        """熔断冷却期满时进入试探恢复（调用方持有 _lock）"""
+        if self.state == self.OPEN and time.time() - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self.trial_started_at = None
+
+    def record_success(self):
+        """记录一次成功的生成调用，关闭熔断"""
+        with self._lock:
+            self.consecutive_failures = 0
+            self.state = self.CLOSED
+            self.trial_started_at = None
+
+    def record_failure(self, error: str = ""):
+        """记录一次失败调用，达到阈值或试探失败时熔断"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if error:
+                self.last_error = error
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"⚠️ Ollama服务不可用，已熔断并回退到规则引擎: {self.base_url}")
+                self.state = self.OPEN
+                self.opened_at = time.time()
+                self.trial_started_at = None
+
+    def _trial_in_flight(self, now: float) -> bool:
+        """是否有未超时的试探请求（调用方持有 _lock）"""
+        return self.trial_started_at is not None and now - self.trial_started_at < self.recovery_timeout
+
+    def allow_request(self) -> bool:
+        """
+        当前是否允许请求发往LLM（只判断可用性，不占用试探名额）
+
+        试探恢复中已有试探请求在途时返回False，使其余请求回退到规则引擎
+        """
+        with self._lock:
+            self._enter_half_open_if_cooled()
+            if self.state == self.HALF_OPEN:
+                return not self._trial_in_flight(time.time())
+            return self.state == self.CLOSED
+
+    def acquire_request(self) -> bool:
+        """
+        实际发出请求前调用，返回是否放行
+
+        试探恢复中同一时间只放行一个试探请求，直到它记录成功或失败（或调用 release_trial）；
+        试探请求超过 recovery_timeout 仍无结果时放行新的试探，避免名额被永久占用
+        """
+        with self._lock:
+            self._enter_half_open_if_cooled()
+            if self.state != self.HALF_OPEN:
+                return self.state == self.CLOSED
+            now = time.time()
+            if self._trial_in_flight(now):
+                return False
+            self.trial_started_at = now
+            return True
+
+    def release_trial(self):
+        """试探请求未记录结果就结束（如超出时间预算）时释放试探名额"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.trial_started_at = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取健康状态"""
+        with self._lock:
+            return {
+                "base_url": self.base_url,
+                "state": self.state,
+                "healthy": self.state != self.OPEN,
+                "consecutive_failures": self.consecutive_failures,
+                "last_check_at": self.last_check_at,
+                "last_check_ok": self.last_check_ok,
+                "last_probe_latency_ms": round(self.last_probe_latency * 1000, 1) if self.last_probe_latency else None,
+                "last_error": self.last_error
+            }
+
+
+_monitors: Dict[str, OllamaHealthMonitor] = {}
+_monitors_lock = threading.Lock()
+
+
+def get_health_monitor(base_url: str) -> OllamaHealthMonitor:
+    """获取（或创建并启动）指定服务地址的健康监测"""
+    key = base_url.rstrip("/")
+    with _monitors_lock:
+        if key not in _monitors:
+            _monitors[key] = OllamaHealthMonitor(key, **Config.OLLAMA_HEALTH_CONFIG)
+        monitor = _monitors[key]
+    monitor.start()
+    return monitor
+
+
+def is_llm_healthy(llm) -> bool:
+    """判断LLM当前是否可用；非Ollama的LLM视为始终可用"""
+    base_url = getattr(llm, "base_url", None)
+    if not base_url:
+        return True
+    return get_health_monitor(base_url).allow_request()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+纯函数结果缓存模块
+为商品信息预处理、受众画像、标题质量评估、CTR预估等确定性计算提供有界LRU缓存；
+这些函数只依赖入参，进程内共享一份缓存即可覆盖同一请求内各工具之间
+以及同一商品被反复调整时的重复计算
+"""
+
+import os
+import sys
+import copy
+import json
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from metrics import CacheStats
+
+
+class MemoCache:
+    """单个函数的有界LRU结果缓存"""
+
+    def __init__(self, name: str, max_entries: int = 512):
+        """
+        Args:
+            name: 缓存名称（函数名）
+            max_entries: 最多保留的结果数，超出时淘汰最久未使用的条目
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """命中时返回缓存结果的副本，否则计算并写入"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats.hit()
+                return copy.deepcopy(self._entries[key])
+
+        # 计算在锁外进行，并发的相同调用可能各算一次，结果一致
+        result = compute()
+        with self._lock:
+            self.stats.miss()
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats.reset()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        return {"entries": entries, "max_entries": self.max_entries, **self.stats.to_dict()}
+
+
+_memo_caches: Dict[str, MemoCache] = {}
+
+
+def memoize(name: str = None):
+    """
+    缓存纯函数结果的装饰器
+
+    参数按函数签名规范化后作为键（位置参数与关键字参数等价），
+    返回值以深拷贝形式存取，调用方修改结果不会影响缓存
+    """
+    def decorator(fn):
+        cache_name = name or fn.__name__
+        cache = _memo_caches.setdefault(cache_name, MemoCache(cache_name, Config.MEMO_CONFIG["max_entries"]))
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not Config.MEMO_CONFIG["enabled"]:
+                return fn(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = json.dumps(bound.arguments, ensure_ascii=False, sort_keys=True, default=str)
+            return cache.get_or_compute(key, lambda: fn(*args, **kwargs))
+
+        wrapper.memo_cache = cache
+        return wrapper
+
+    return decorator
+
+
+def get_memo_stats() -> Dict[str, Dict[str, Any]]:
+    """获取各函数缓存的命中统计"""
+    return {name: cache.get_stats() for name, cache in _memo_caches.items()}
+
+
+def clear_memo_caches():
+    """清空全部函数缓存"""
+    for cache in _memo_caches.values():
+        cache.clear()
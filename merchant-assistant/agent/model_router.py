@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+模型路由模块
+按生成任务（标题、标题优化、营销策略、竞品分析、ReAct推理）选择模型：固定策略直接映射到
+LLM_CONFIGS中的模型，auto策略在质量分达标的模型中选择估算耗时最短的一个；
+路由结果记录在当前span上
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from tracing import annotate_span
+from .llm_client import PooledOllamaLLM, create_ollama_llm, get_ollama_pool
+from .llm_health import is_llm_healthy
+
+
+def _is_routable(llm_type: str) -> bool:
+    """只有Ollama类型的模型参与路由"""
+    return Config.LLM_CONFIGS.get(llm_type, {}).get("type") == "ollama"
+
+
+def estimate_latency_ms(llm_type: str, task: str) -> Optional[float]:
+    """
+    按观测到的prompt评估耗时和单token生成耗时（中位数），估算该模型完成一次任务的耗时
+
+    Returns:
+        估算耗时（毫秒），该模型还没有观测数据时返回None
+    """
+    llm_config = Config.get_llm_config(llm_type)
+    latency = get_ollama_pool(llm_config["base_url"]).latency
+    metric = f"generate.{llm_config['model_name']}"
+    per_token = latency.summary(f"{metric}.eval_per_token")
+    if not per_token["count"]:
+        return None
+
+    budgets = Config.get_generation_budgets(llm_config)
+    num_predict = (budgets.get(task) or budgets.get("agent", {})).get("num_predict", 0)
+    return latency.summary(f"{metric}.prompt_eval")["p50_ms"] + per_token["p50_ms"] * num_predict
+
+
+class ModelRouter:
+    """按任务选择LLM，各模型的LLM实例在进程内共享"""
+
+    def __init__(self, routing_config: Dict[str, Any] = None):
+        """
+        Args:
+            routing_config: 路由配置，为空时使用 Config.MODEL_ROUTING_CONFIG
+        """
+        self.config = routing_config or Config.MODEL_ROUTING_CONFIG
+        self._llms: Dict[str, PooledOllamaLLM] = {}
+        self._lock = threading.Lock()
+        self.decisions: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config["enabled"])
+
+    def get_llm(self, llm_type: str) -> PooledOllamaLLM:
+        """获取某个模型的LLM实例"""
+        with self._lock:
+            if llm_type not in self._llms:
+                self._llms[llm_type] = create_ollama_llm(Config.get_llm_config(llm_type))
+            return self._llms[llm_type]
+
+    def select(self, task: str) -> Tuple[Optional[str], str]:
+        """
+        选择任务使用的模型
+
+        Returns:
+            (LLM类型, 选择原因)，LLM类型为None表示使用会话LLM
+        """
+        if not self.enabled:
+            return None, "disabled"
+
+        policy = self.config["routes"].get(task)
+        if policy == "auto":
+            return self._select_auto(task)
+        if not policy or not _is_routable(policy):
+            return None, "default"
+        if not is_llm_healthy(self.get_llm(policy)):
+            return None, "unhealthy"
+        return policy, "fixed"
+
+    def _select_auto(self, task: str) -> Tuple[Optional[str], str]:
+        """在质量分达标且健康的候选模型中选择估算耗时最短的，没有观测数据的模型优先试用一次"""
+        auto_config = self.config["auto"]
+        candidates = [llm_type for llm_type in auto_config["candidates"] if _is_routable(llm_type)]
+        min_quality = auto_config["min_quality"].get(task, 0)
+        eligible = [
+            llm_type for llm_type in candidates
+            if Config.get_llm_config(llm_type).get("quality", 0) >= min_quality
+            and is_llm_healthy(self.get_llm(llm_type))
+        ]
+        if not eligible:
+            return None, "default"
+
+        estimates = {llm_type: estimate_latency_ms(llm_type, task) for llm_type in eligible}
+        unmeasured = [llm_type for llm_type in eligible if estimates[llm_type] is None]
+        if unmeasured:
+            return unmeasured[0], "auto_explore"
+        return min(eligible, key=estimates.get), "auto"
+
+    def route(self, task: str, default_llm):
+        """
+        返回任务应使用的LLM实例，并在当前span上记录路由结果
+
+        未启用路由或会话LLM不是Ollama模型（如开发模式的模拟LLM）时直接返回会话LLM
+        """
+        if not self.enabled or not isinstance(default_llm, PooledOllamaLLM):
+            return default_llm
+
+        llm_type, reason = self.select(task)
+        llm = self.get_llm(llm_type) if llm_type else default_llm
+        self.record_decision(task, llm.model, reason)
+        return llm
+
+    def record_decision(self, task: str, model: str, reason: str):
+        """记录一次路由结果（计数并写入当前span）"""
+        with self._lock:
+            self.decisions[(task, model)] += 1
+        annotate_span(route_task=task, route_model=model, route_reason=reason)
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """各任务的路由次数"""
+        with self._lock:
+            decisions = sorted(self.decisions.items())
+        return [
+            {"task": task, "model": model, "count": count}
+            for (task, model), count in decisions
+        ]
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """获取进程内共享的模型路由器"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+用户偏好状态模块
+每条新消息写入对话历史时提取一次偏好信号，按滑动窗口增量维护计数，
+读取偏好无需重新扫描历史；状态可序列化，随会话一起保存
+"""
+
+import threading
+from collections import Counter, deque
+from typing import Any, Dict, List
+
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import BaseMessage
+from pydantic import Field
+
+from .lexicon import PREFERENCE_STYLES, PREFERENCE_AUDIENCES, POSITIVE_MARKERS, NEGATIVE_MARKERS
+
+
+PREFERENCE_KEYS = ["preferred_styles", "target_audiences", "keywords_liked", "keywords_disliked",
+                   "price_ranges", "product_types"]
+
+
+def extract_message_signals(content: str) -> Dict[str, List[str]]:
+    """提取单条消息中的偏好信号"""
+    content = content.lower()
+    signals = {key: [] for key in PREFERENCE_KEYS}
+
+    # 提取偏好的风格
+    if any(marker in content for marker in POSITIVE_MARKERS):
+        signals["preferred_styles"] = [style for style in PREFERENCE_STYLES if style in content]
+
+    # 提取目标受众
+    signals["target_audiences"] = [audience for audience in PREFERENCE_AUDIENCES if audience in content]
+
+    # 提取负面反馈相关的词汇
+    if any(marker in content for marker in NEGATIVE_MARKERS):
+        words = content.split()
+        signals["keywords_disliked"] = [
+            words[i - 1] for i, word in enumerate(words) if word in NEGATIVE_MARKERS and i > 0
+        ]
+
+    return signals
+
+
+class PreferenceTracker:
+    """最近若干条消息的偏好统计，新消息到达时增量更新"""
+
+    def __init__(self, window: int = 10):
+        """
+        Args:
+            window: 参与统计的最近消息数
+        """
+        self.window = window
+        self._signals: deque = deque()
+        self._counters: Dict[str, Counter] = {key: Counter() for key in PREFERENCE_KEYS}
+        self._snapshot: Dict[str, List[str]] = None
+        self._lock = threading.Lock()
+
+    def update(self, content: str):
+        """记录一条新消息"""
+        self._add_signals(extract_message_signals(content))
+
+    def _add_signals(self, signals: Dict[str, List[str]]):
+        with self._lock:
+            self._signals.append(signals)
+            self._apply(signals, 1)
+            while len(self._signals) > self.window:
+                self._apply(self._signals.popleft(), -1)
+            self._snapshot = None
+
+    def _apply(self, signals: Dict[str, List[str]], delta: int):
+        """按信号增减计数，计数归零的条目删除，保持同频次时按首次出现排序（调用方持有锁）"""
+        for key, items in signals.items():
+            counter = self._counters[key]
+            for item in items:
+                counter[item] += delta
+                if counter[item] <= 0:
+                    del counter[item]
+
+    def get(self) -> Dict[str, List[str]]:
+        """获取各类偏好中频次最高的前3项"""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = {
+                    key: [item for item, count in counter.most_common(3)]
+                    for key, counter in self._counters.items()
+                }
+            return {key: list(items) for key, items in self._snapshot.items()}
+
+    def clear(self):
+        with self._lock:
+            self._signals.clear()
+            for counter in self._counters.values():
+                counter.clear()
+            self._snapshot = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出可序列化的状态"""
+        with self._lock:
+            return {"window": self.window, "signals": list(self._signals)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PreferenceTracker":
+        """从 to_dict 的结果恢复"""
+        tracker = cls(window=data.get("window", 10))
+        for signals in data.get("signals", []):
+            tracker._add_signals({key: list(signals.get(key, [])) for key in PREFERENCE_KEYS})
+        return tracker
+
+
+class PreferenceTrackingHistory(InMemoryChatMessageHistory):
+    """新消息写入时同步更新偏好状态的对话历史"""
+
+    tracker: Any = Field(default=None, exclude=True)
+
+    def add_message(self, message: BaseMessage) -> None:
+        super().add_message(message)
+        if self.tracker is not None:
+            self.tracker.update(str(message.content))
+
+    def clear(self) -> None:
+        super().clear()
+        if self.tracker is not None:
+            self.tracker.clear()
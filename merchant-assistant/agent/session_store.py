@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+会话持久化模块
+按商家会话ID保存对话记忆（最近消息与摘要）和用户偏好：每个会话一行紧凑JSON，
+重新连接时按需加载，每轮对话后由后台线程异步写入，同一会话排队中的旧状态会被新状态覆盖
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+
+class SessionStore:
+    """基于SQLite的会话状态存储"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite文件路径（WAL模式，可供同一台机器上的多个worker进程共享）
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, state TEXT, updated_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+        self._conn.commit()
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="merchant-session-store")
+        self.writes = 0
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """加载会话状态，不存在时返回None；尚未落盘的最新状态优先"""
+        with self._lock:
+            if session_id in self._pending:
+                return self._pending[session_id]
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_async(self, session_id: str, state: Dict[str, Any]):
+        """异步保存会话状态，调用方不等待写入完成"""
+        with self._lock:
+            already_queued = session_id in self._pending
+            self._pending[session_id] = state
+        if not already_queued:
+            self._executor.submit(self._write, session_id)
+
+    def _write(self, session_id: str):
+        """后台线程：写入该会话最新的待保存状态"""
+        with self._lock:
+            state = self._pending.pop(session_id, None)
+            if state is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(state, ensure_ascii=False), time.time())
+                )
+                self._conn.commit()
+                self.writes += 1
+            except sqlite3.Error as e:
+                print(f"会话状态保存失败 {session_id}: {e}")
+
+    def delete(self, session_id: str):
+        """删除会话状态"""
+        with self._lock:
+            self._pending.pop(session_id, None)
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def flush(self, timeout: float = None) -> bool:
+        """等待已排队的写入完成（用于测试和进程退出前），返回是否已完成"""
+        event = threading.Event()
+        self._executor.submit(event.set)
+        return event.wait(timeout)
+
+    def list_sessions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """最近更新的会话"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, updated_at, length(state) FROM sessions ORDER BY updated_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [{"session_id": row[0], "updated_at": row[1], "state_bytes": row[2]} for row in rows]
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """获取进程内共享的会话存储（首次调用时创建SQLite文件）；未启用时返回None"""
+    global _store
+    store_config = Config.SESSION_STORE_CONFIG
+    if not store_config["enabled"]:
+        return None
+
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore(Config.resolve_path(store_config["path"]))
+        return _store
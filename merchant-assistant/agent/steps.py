@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+同步/异步共用的执行流程
+工具和Agent的处理流程写成生成器，流程只写一份：
+需要调用LLM、工具或Agent执行器时产出 Call（或并发执行的 Parallel），并在产出处接收调用结果，
+调用抛出的异常也在产出处抛出；run_steps 以 invoke 在当前线程执行，arun_steps 以 ainvoke 在事件循环中执行
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Generator, List, NamedTuple, Optional
+
+from .deadline import DeadlineExceeded, remaining_time
+
+
+class Call(NamedTuple):
+    """一次调用：runnable.invoke(input, **kwargs) 或 await runnable.ainvoke(input, **kwargs)"""
+    runnable: Any
+    input: Any
+    kwargs: Dict[str, Any] = {}
+
+
+class Parallel(NamedTuple):
+    """
+    并发执行的一组调用，最多等待到当前请求的截止时间
+
+    产出处接收与calls一一对应的结果列表，未完成或因超出时间预算（DeadlineExceeded）失败的调用结果为None；
+    已完成的调用中有其他异常时，按calls顺序在产出处抛出第一个异常
+    """
+    calls: List[Call]
+    max_concurrency: int
+
+
+Steps = Generator[Any, Any, Any]
+
+
+def run_steps(steps: Steps) -> Any:
+    """同步执行流程，返回流程的返回值"""
+    value, error = None, None
+    while True:
+        try:
+            request = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            value, error = _run_request(request), None
+        except BaseException as e:
+            value, error = None, e
+
+
+async def arun_steps(steps: Steps) -> Any:
+    """异步执行流程，返回流程的返回值；任务被取消时CancelledError在流程的产出处抛出"""
+    value, error = None, None
+    while True:
+        try:
+            request = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            value, error = await _arun_request(request), None
+        except BaseException as e:
+            value, error = None, e
+
+
+def _run_request(request):
+    if isinstance(request, Parallel):
+        return _run_parallel(request)
+    return request.runnable.invoke(request.input, **request.kwargs)
+
+
+async def _arun_request(request):
+    if isinstance(request, Parallel):
+        return await _arun_parallel(request)
+    return await request.runnable.ainvoke(request.input, **request.kwargs)
+
+
+def _run_parallel(request: Parallel) -> List[Any]:
+    """在线程池中并发执行，只等待到截止时间；未完成的调用在截止时间后自行中止"""
+    executor = ThreadPoolExecutor(max_workers=request.max_concurrency, thread_name_prefix="merchant-parallel")
+    try:
+        # 各任务沿用当前上下文变量（会话LLM、时间预算、追踪span等）
+        futures = [
+            executor.submit(contextvars.copy_context().run, call.runnable.invoke, call.input, **call.kwargs)
+            for call in request.calls
+        ]
+        wait(futures, timeout=remaining_time())
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return _collect(futures)
+
+
+async def _arun_parallel(request: Parallel) -> List[Any]:
+    """以协程并发执行，超出截止时间时取消未完成的任务"""
+    limiter = asyncio.Semaphore(request.max_concurrency)
+
+    async def run(call: Call):
+        async with limiter:
+            return await call.runnable.ainvoke(call.input, **call.kwargs)
+
+    tasks = [asyncio.create_task(run(call)) for call in request.calls]
+    try:
+        await asyncio.wait(tasks, timeout=remaining_time())
+    finally:
+        for task in tasks:
+            task.cancel()
+    return _collect(tasks)
+
+
+def _collect(futures: List[Any]) -> List[Optional[Any]]:
+    """
+    已完成的任务取结果（任务异常时抛出）；未完成、已取消或超出时间预算的为None，
+    这样截止时间前后结束的任务得到相同的结果，不取决于与wait超时的先后
+    """
+    results = []
+    for future in futures:
+        if not future.done() or future.cancelled() or isinstance(future.exception(), DeadlineExceeded):
+            results.append(None)
+        else:
+            results.append(future.result())
+    return results
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Agent流式输出模块
+将ReAct执行过程中的工具调用和最终回答token转换为事件
+"""
+
+import queue
+from typing import Any, Dict
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class StreamingEventHandler(BaseCallbackHandler):
+    """收集工具调用事件和 Final Answer 之后的token，写入事件队列"""
+
+    FINAL_ANSWER_MARKER = "Final Answer:"
+
+    def __init__(self, events: queue.Queue):
+        self.events = events
+        self._buffers: Dict[Any, str] = {}
+        self._emitted: Dict[Any, int] = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._buffers[run_id] = ""
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        """只转发 Final Answer 标记之后的内容，工具内部的LLM调用不会出现该标记"""
+        buffer = self._buffers.get(run_id, "") + token
+        self._buffers[run_id] = buffer
+
+        marker_position = buffer.find(self.FINAL_ANSWER_MARKER)
+        if marker_position < 0:
+            return
+
+        answer_start = marker_position + len(self.FINAL_ANSWER_MARKER)
+        emitted = self._emitted.get(run_id, answer_start)
+        text = buffer[emitted:]
+        if emitted == answer_start:
+            text = text.lstrip()
+            if not text:
+                return
+
+        self._emitted[run_id] = len(buffer)
+        self.events.put({"type": "token", "text": text})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._buffers.pop(run_id, None)
+        self._emitted.pop(run_id, None)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._buffers.pop(run_id, None)
+        self._emitted.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str: str, **kwargs):
+        self.events.put({
+            "type": "tool_start",
+            "tool": (serialized or {}).get("name") or kwargs.get("name", ""),
+            "input": input_str
+        })
+
+    def on_tool_end(self, output, **kwargs):
+        self.events.put({
+            "type": "tool_end",
+            "tool": kwargs.get("name", ""),
+            "output": str(output)
+        })
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+摘要式对话记忆模块
+按token预算保留最近几轮原文，较早的对话折叠进滚动摘要；
+摘要由后台线程调用LLM生成，不阻塞当前请求，LLM不可用时使用规则摘要
+"""
+
+import re
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import (
+    BaseMessage, SystemMessage, get_buffer_string, messages_from_dict, messages_to_dict
+)
+from pydantic import PrivateAttr
+
+from .tools.merchant_tools import is_llm_available, generation_options
+
+
+CJK_PATTERN = re.compile(r'[\u4e00-\u9fff\u3000-\u303f\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本token数
+
+    中文字符和全角标点按每字1个token，其余字符按每4个字符1个token
+    """
+    cjk_count = len(CJK_PATTERN.findall(text))
+    return cjk_count + math.ceil((len(text) - cjk_count) / 4)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """按token预算截断文本"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        piece = text[-middle:] if keep_end else text[:middle]
+        if estimate_tokens(piece) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[-low:] if keep_end and low else text[:low]
+
+
+class SummarizingTokenBufferMemory(BaseChatMemory):
+    """有token上限的对话记忆：最近轮次保留原文，较早轮次折叠为摘要"""
+
+    llm: Any = None
+    memory_key: str = "chat_history"
+    max_token_limit: int = 2000  # 摘要与最近对话合计的token上限
+    summary_token_limit: int = 500  # 摘要部分的token上限
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    summary: str = ""
+
+    _pending: List[BaseMessage] = PrivateAttr(default_factory=list)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _executor: Any = PrivateAttr(default=None)
+    _summarizing: bool = PrivateAttr(default=False)
+    _summary_count: int = PrivateAttr(default=0)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def _summary_text(self) -> str:
+        """当前摘要；后台摘要尚未完成的轮次先以规则摘要补上（调用方持有锁）"""
+        summary = self.summary
+        if self._pending:
+            summary = "\n".join(filter(None, [summary, self._rule_summary(self._pending)]))
+        return _truncate_to_tokens(summary, self.summary_token_limit, keep_end=True)
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """返回摘要加最近对话，总长度不超过max_token_limit"""
+        with self._lock:
+            summary = self._summary_text()
+            messages = list(self.chat_memory.messages)
+
+        if self.return_messages:
+            if summary:
+                messages = [SystemMessage(content=f"对话摘要：{summary}")] + messages
+            return {self.memory_key: messages}
+
+        buffer = get_buffer_string(messages, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)
+        if summary:
+            buffer = f"对话摘要：{summary}\n{buffer}" if buffer else f"对话摘要：{summary}"
+        return {self.memory_key: buffer}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """保存本轮对话，超出预算的早期轮次移入待摘要队列"""
+        super().save_context(inputs, outputs)
+        self._fold_overflow()
+
+    def _fold_overflow(self):
+        recent_limit = self.max_token_limit - self.summary_token_limit
+        with self._lock:
+            messages = self.chat_memory.messages
+            tokens = [estimate_tokens(message.content) for message in messages]
+            overflow = 0
+            # 按整轮（用户+助手）移出，至少保留最近一轮
+            while sum(tokens[overflow:]) > recent_limit and len(messages) - overflow > 2:
+                overflow += 2
+
+            # 单轮本身超出预算时截断原文
+            self.chat_memory.messages = [
+                message.model_copy(update={"content": _truncate_to_tokens(message.content, recent_limit // 2)})
+                if token_count > recent_limit // 2 else message
+                for message, token_count in zip(messages[overflow:], tokens[overflow:])
+            ]
+            if not overflow:
+                return
+            self._pending.extend(messages[:overflow])
+
+            if self._summarizing:
+                return
+            self._summarizing = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="merchant-memory-summary")
+        self._executor.submit(self._summarize_pending)
+
+    def _summarize_pending(self):
+        """后台线程：把待摘要队列折叠进摘要，直到队列为空"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._summarizing = False
+                    return
+                batch = list(self._pending)
+                previous_summary = self.summary
+
+            new_summary = self._summarize(previous_summary, batch)
+
+            with self._lock:
+                # 摘要期间可能调用过clear()，此时丢弃结果
+                if self._pending[:len(batch)] == batch:
+                    del self._pending[:len(batch)]
+                    self.summary = _truncate_to_tokens(new_summary, self.summary_token_limit, keep_end=True)
+                    self._summary_count += 1
+
+    def _summarize(self, previous_summary: str, messages: List[BaseMessage]) -> str:
+        """生成新摘要，LLM不可用或调用失败时使用规则摘要"""
+        if is_llm_available(self.llm):
+            conversation = get_buffer_string(messages, human_prefix="用户", ai_prefix="助手")
+            prompt = f"""请将以下电商运营咨询对话合并进已有摘要，保留商品信息、目标受众、预算、用户偏好的风格和已给出的关键结论。
+摘要不超过{self.summary_token_limit // 2}字，只输出摘要内容。
+
+已有摘要：
+{previous_summary or "无"}
+
+新增对话：
+{conversation}
+
+更新后的摘要："""
+            try:
+                return self.llm.invoke(prompt, **generation_options(self.llm, "summary")).strip()
+            except Exception as e:
+                print(f"对话摘要生成失败，使用规则摘要: {e}")
+
+        return "\n".join(filter(None, [previous_summary, self._rule_summary(messages)]))
+
+    def _rule_summary(self, messages: List[BaseMessage]) -> str:
+        """规则摘要：每条消息保留开头部分"""
+        lines = []
+        for message in messages:
+            role = "用户" if message.type == "human" else "助手"
+            content = re.sub(r'\s+', ' ', message.content).strip()
+            lines.append(f"{role}：{_truncate_to_tokens(content, 40)}")
+        return "\n".join(lines)
+
+    def wait_for_summary(self, timeout: float = None) -> bool:
+        """等待后台摘要完成（用于测试和关闭前落盘），返回是否已完成"""
+        event = threading.Event()
+        with self._lock:
+            if not self._summarizing:
+                return True
+            executor = self._executor
+        executor.submit(event.set)
+        return event.wait(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取记忆统计信息"""
+        with self._lock:
+            summary = self._summary_text()
+            return {
+                "recent_messages": len(self.chat_memory.messages),
+                "recent_tokens": sum(estimate_tokens(message.content) for message in self.chat_memory.messages),
+                "summary_tokens": estimate_tokens(summary),
+                "pending_messages": len(self._pending),
+                "summary_count": self._summary_count,
+                "max_token_limit": self.max_token_limit
+            }
+
+    def export_state(self) -> Dict[str, Any]:
+        """导出摘要与最近对话（用于会话持久化），尚未完成后台摘要的轮次以规则摘要并入"""
+        with self._lock:
+            return {"summary": self._summary_text(), "messages": messages_to_dict(self.chat_memory.messages)}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """恢复 export_state 导出的状态；直接替换消息列表，不作为新消息处理"""
+        with self._lock:
+            self.summary = state.get("summary", "")
+            self._pending.clear()
+            self.chat_memory.messages = messages_from_dict(state.get("messages", []))
+
+    def clear(self) -> None:
+        """清空对话与摘要"""
+        with self._lock:
+            super().clear()
+            self.summary = ""
+            self._pending.clear()
@@ -5,25 +5,80 @@
 """
 
 from typing import List, Dict, Any
+import os
+import sys
 import re
+import json
 import jieba
 import random
+import contextvars
+from contextlib import contextmanager
 from langchain.tools import tool
 
-<<<<<<< HEAD
-# 全局LLM实例，由MerchantAssistantAgent设置
-_current_llm = None
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config import Config
+from tracing import traced, annotate_span, trace_span
+from ..llm_health import is_llm_healthy
+from ..memo import memoize
+from ..deadline import DeadlineExceeded, check_deadline, deadline_exceeded
+from ..model_router import get_model_router
+from ..lexicon import (
+    PRODUCT_TYPES, COLORS, SEASONS, FEATURES, TITLE_AUDIENCE_WORDS, ATTRACTIVE_WORDS, EMOTION_SYMBOLS, URGENT_WORDS
+)
+from ..steps import Call, Steps, run_steps, arun_steps
+
+# 当前请求使用的LLM实例，由Agent在每次请求中通过use_llm设置；
+# 上下文变量随线程池任务（copy_context）和协程传递，不同会话/模型的请求可在同一进程内并发
+_current_llm: contextvars.ContextVar = contextvars.ContextVar("merchant_current_llm", default=None)
+
+# 进程默认LLM：没有请求级LLM时使用（脚本中先创建Agent再直接调用工具的场景）
+_default_llm = None
+
+@contextmanager
+def use_llm(llm):
+    """在该上下文内让工具使用指定的LLM实例"""
+    token = _current_llm.set(llm)
+    try:
+        yield llm
+    finally:
+        _current_llm.reset(token)
 
 def set_llm_instance(llm):
-    """设置当前LLM实例"""
-    global _current_llm
-    _current_llm = llm
+    """设置进程默认LLM实例（请求级LLM优先）"""
+    global _default_llm
+    _default_llm = llm
 
 def get_llm_instance():
-    """获取当前LLM实例"""
-    return _current_llm
+    """获取当前LLM实例：优先使用请求级LLM，其次为进程默认值"""
+    llm = _current_llm.get()
+    return llm if llm is not None else _default_llm
+
+def get_task_llm(task: str):
+    """某类生成任务使用的LLM：当前LLM按模型路由策略（MODEL_ROUTING_CONFIG）替换"""
+    return get_model_router().route(task, get_llm_instance())
+
+def is_llm_available(llm) -> bool:
+    """是否可以调用真实LLM（非模拟、未熔断且请求未超出时间预算），否则走规则引擎"""
+    return bool(llm) and llm.__class__.__name__ != 'MockLLM' and is_llm_healthy(llm) and not deadline_exceeded()
 
+def generation_budget(llm, task: str) -> Dict[str, Any]:
+    """该LLM某类生成任务的预算（按模型配置覆盖后的 Config.GENERATION_BUDGETS）"""
+    budgets = getattr(llm, "generation_budgets", None) or Config.GENERATION_BUDGETS
+    return budgets.get(task) or Config.GENERATION_BUDGETS.get(task, {})
 
+def generation_options(llm, task: str) -> Dict[str, Any]:
+    """某类生成任务调用LLM时传入的参数（最大生成token数与停止序列）"""
+    budget = generation_budget(llm, task)
+    options = {}
+    if budget.get("num_predict"):
+        options["num_predict"] = budget["num_predict"]
+    if budget.get("stop"):
+        options["stop"] = list(budget["stop"])
+    return options
+
+
+@memoize()
+@traced(attributes=lambda product_info: {"input_chars": len(product_info)})
 def preprocess_product_info(product_info: str) -> dict:
     """预处理商品信息，提取关键要素"""
     import re
@@ -40,25 +95,15 @@ def preprocess_product_info(product_info: str) -> dict:
     }
     
     # 提取商品类型
-    product_types = ["连衣裙", "T恤", "衬衫", "裤子", "裙子", "外套", "鞋子", "包包", "手机", "电脑", "耳机", "口红", "面膜", "护肤品"]
-    for ptype in product_types:
-        if ptype in product_info:
-            processed["product_type"] = ptype
-            break
+    processed["product_type"] = next((ptype for ptype in PRODUCT_TYPES if ptype in product_info), "")
     
-    # 提取颜色
-    colors = ["粉色", "红色", "蓝色", "黑色", "白色", "灰色", "绿色", "黄色", "紫色", "橙色"]
-    for color in colors:
-        if color in product_info or color[:-1] in product_info:
-            processed["color"] = color
-            break
+    # 提取颜色（完整颜色词或去掉“色”字的简称）
+    processed["color"] = next(
+        (color for color in COLORS if color in product_info or color[:-1] in product_info), ""
+    )
     
     # 提取季节
-    seasons = ["春季", "夏季", "秋季", "冬季", "春", "夏", "秋", "冬"]
-    for season in seasons:
-        if season in product_info:
-            processed["season"] = season
-            break
+    processed["season"] = next((season for season in SEASONS if season in product_info), "")
     
     # 提取价格
     price_match = re.search(r'(\d+)元', product_info)
@@ -77,10 +122,7 @@ def preprocess_product_info(product_info: str) -> dict:
             processed["price_range"] = "高端价位"
     
     # 提取关键特征
-    features = ["新款", "热销", "限量", "进口", "纯棉", "真丝", "防水", "透气", "显瘦", "百搭", "时尚", "经典"]
-    for feature in features:
-        if feature in product_info:
-            processed["key_features"].append(feature)
+    processed["key_features"] = [feature for feature in FEATURES if feature in product_info]
     
     # 使用jieba提取关键词
     keywords = list(jieba.cut(product_info))
@@ -88,6 +130,7 @@ def preprocess_product_info(product_info: str) -> dict:
     
     return processed
 
+@memoize()
 def evaluate_title_quality(title: str, product_info: str, target_audience: str) -> dict:
     """评估标题质量，用于决定是否需要二次优化"""
     score = 0
@@ -119,14 +162,7 @@ def evaluate_title_quality(title: str, product_info: str, target_audience: str)
         score += 15
     
     # 3. 受众匹配度检查 (权重: 25分)
-    audience_keywords = {
-        "年轻女性": ["少女心", "甜美", "仙女", "小清新", "网红", "种草", "心动", "爱了", "可爱", "萌"],
-        "中年女性": ["优雅", "知性", "舒适", "百搭", "经典", "品质", "气质", "精致", "温柔"],
-        "年轻男性": ["潮流", "酷炫", "科技", "个性", "性能", "专业", "给力", "帅气"],
-        "学生": ["学生", "性价比", "实用", "省钱", "必备", "超值", "便宜", "划算"]
-    }
-    
-    target_words = audience_keywords.get(target_audience, [])
+    target_words = TITLE_AUDIENCE_WORDS.get(target_audience, [])
     found_keywords = sum(1 for word in target_words if word in title)
     if found_keywords >= 1:
         score += 25
@@ -151,11 +187,8 @@ def evaluate_title_quality(title: str, product_info: str, target_audience: str)
         recommendations.append("增加商品核心特征描述")
     
     # 5. 吸引力检查 (权重: 20分)
-    attractive_words = ["限时", "特惠", "新款", "热销", "爆款", "必入", "推荐", "精选", "优选", "抢购"]
-    emotion_symbols = ["【", "】", "🔥", "💕", "✨", "🌸", "⭐", "👑", "💎"]
-    
-    attractive_count = sum(1 for word in attractive_words if word in title)
-    symbol_count = sum(1 for symbol in emotion_symbols if symbol in title)
+    attractive_count = sum(1 for word in ATTRACTIVE_WORDS if word in title)
+    symbol_count = sum(1 for symbol in EMOTION_SYMBOLS if symbol in title)
     
     if attractive_count >= 1 or symbol_count >= 1:
         score += 20
@@ -175,15 +208,12 @@ def evaluate_title_quality(title: str, product_info: str, target_audience: str)
         "need_optimization": final_score < 0.75
     }
 
-def optimize_title_with_feedback(original_title: str, evaluation: dict, product_info: str, style: str, target_audience: str) -> str:
-    """基于评估结果优化标题"""
-    llm = get_llm_instance()
+def _build_optimization_prompt(original_title: str, evaluation: dict, product_info: str, style: str, target_audience: str) -> str:
+    """构建标题二次优化prompt"""
+    processed_info = preprocess_product_info(product_info)
+    audience_profile = get_audience_profile(target_audience)
     
-    if llm and llm.__class__.__name__ != 'MockLLM':
-        processed_info = preprocess_product_info(product_info)
-        audience_profile = get_audience_profile(target_audience)
-        
-        optimization_prompt = f"""你是标题优化专家，需要根据质量评估结果优化电商标题。
+    return f"""你是标题优化专家，需要根据质量评估结果优化电商标题。
 
 【原标题】
 {original_title}
@@ -207,28 +237,48 @@ def optimize_title_with_feedback(original_title: str, evaluation: dict, product_
 5. 增强{target_audience}群体的吸引力
 
 请输出优化后的标题（只输出标题，不要解释）："""
+
+def _clean_optimized_title(optimized_title: str) -> str:
+    """清理二次优化的LLM输出"""
+    optimized_title = optimized_title.strip().replace('\n', ' ').replace('\r', '')
+    
+    # 移除可能的前缀
+    prefixes = ['优化后标题：', '标题：', '建议：', '答：']
+    for prefix in prefixes:
+        if optimized_title.startswith(prefix):
+            optimized_title = optimized_title[len(prefix):].strip()
+    
+    if (optimized_title.startswith('"') and optimized_title.endswith('"')):
+        optimized_title = optimized_title[1:-1]
+        
+    return optimized_title
+
+def _optimization_steps(original_title: str, evaluation: dict, product_info: str, style: str, target_audience: str) -> Steps:
+    """标题二次优化流程（同步与异步版本共用）"""
+    llm = get_task_llm("title_optimize")
+    
+    if is_llm_available(llm):
+        optimization_prompt = _build_optimization_prompt(original_title, evaluation, product_info, style, target_audience)
         
         try:
-            optimized_title = llm.invoke(optimization_prompt)
-            # 清理输出
-            optimized_title = optimized_title.strip().replace('\n', ' ').replace('\r', '')
-            
-            # 移除可能的前缀
-            prefixes = ['优化后标题：', '标题：', '建议：', '答：']
-            for prefix in prefixes:
-                if optimized_title.startswith(prefix):
-                    optimized_title = optimized_title[len(prefix):].strip()
-            
-            if (optimized_title.startswith('"') and optimized_title.endswith('"')):
-                optimized_title = optimized_title[1:-1]
-                
-            return optimized_title
+            return _clean_optimized_title((yield Call(llm, optimization_prompt, generation_options(llm, "title_optimize"))))
         except Exception as e:
             print(f"标题优化失败: {e}")
             return original_title
     
     return original_title
 
+@traced(record_output=True)
+def optimize_title_with_feedback(original_title: str, evaluation: dict, product_info: str, style: str, target_audience: str) -> str:
+    """基于评估结果优化标题"""
+    return run_steps(_optimization_steps(original_title, evaluation, product_info, style, target_audience))
+
+@traced("optimize_title_with_feedback", record_output=True)
+async def aoptimize_title_with_feedback(original_title: str, evaluation: dict, product_info: str, style: str, target_audience: str) -> str:
+    """optimize_title_with_feedback 的异步版本"""
+    return await arun_steps(_optimization_steps(original_title, evaluation, product_info, style, target_audience))
+
+@memoize()
 def get_audience_profile(target_audience: str) -> dict:
     """获取目标受众画像"""
     profiles = {
@@ -275,39 +325,18 @@ def get_audience_profile(target_audience: str) -> dict:
     }
     return profiles.get(target_audience, profiles["通用"])
 
-@tool
-def generate_product_title(product_info: str, style: str = "爆款", target_audience: str = "通用") -> str:
-=======
-
-@tool
-def generate_product_title(product_info: str, style: str = "爆款") -> str:
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
-    """
-    根据商品信息生成推荐标题
-    
-    Args:
-        product_info: 商品信息，包含类目、属性、价格等
-        style: 文案风格，如"爆款"、"简约"、"高端"等
-<<<<<<< HEAD
-        target_audience: 目标受众，影响标题用词和表达方式
-=======
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
-        
-    Returns:
-        生成的商品标题
-    """
-    
-<<<<<<< HEAD
-    llm = get_llm_instance()
-    
-    # 预处理商品信息
-    processed_info = preprocess_product_info(product_info)
-    audience_profile = get_audience_profile(target_audience)
+def _build_title_prompt(processed_info: dict, audience_profile: dict, style: str, target_audience: str,
+                        candidates: int = 1) -> str:
+    """构建标题生成prompt，candidates大于1时要求以JSON数组输出多个候选标题"""
+    if candidates > 1:
+        output_instruction = (
+            f"请基于以上分析，从不同角度创作{candidates}个{style}风格的专业标题，"
+            f"以JSON数组输出（如[\"标题1\", \"标题2\"]），不要解释："
+        )
+    else:
+        output_instruction = f"请基于以上分析，创作一个{style}风格的专业标题："
     
-    # 如果有真实的LLM，使用LLM生成
-    if llm and llm.__class__.__name__ != 'MockLLM':
-        # 构建增强的prompt
-        prompt = f"""你是一位资深电商文案专家，拥有10年+的爆款标题创作经验。
+    return f"""你是一位资深电商文案专家，拥有10年+的爆款标题创作经验。
 
 【商品分析】
 - 商品类型：{processed_info['product_type'] or '未识别'}
@@ -337,51 +366,83 @@ def generate_product_title(product_info: str, style: str = "爆款") -> str:
 4. 确保标题具有点击冲动和购买欲望
 5. 符合电商平台标题规范
 
-请基于以上分析，创作一个{style}风格的专业标题："""
-        
+{output_instruction}"""
+
+def _clean_generated_title(title: str) -> str:
+    """清理标题生成的LLM输出"""
+    title = title.strip().replace('\n', ' ').replace('\r', '')
+    
+    # 移除可能的前缀
+    prefixes = ['标题：', '建议标题：', '推荐标题：', '标题:', '答:', '答：']
+    for prefix in prefixes:
+        if title.startswith(prefix):
+            title = title[len(prefix):].strip()
+    
+    # 移除引号
+    if (title.startswith('"') and title.endswith('"')) or (title.startswith('"') and title.endswith('"')):
+        title = title[1:-1]
+    
+    # 长度控制
+    if len(title) > 30:
+        title = title[:28] + "..."
+    
+    return title
+
+def _parse_title_candidates(output: str, candidates: int) -> List[str]:
+    """解析LLM输出的候选标题：优先按JSON数组解析，失败时按行拆分"""
+    if candidates <= 1:
+        return [_clean_generated_title(output)]
+    
+    items = []
+    match = re.search(r'\[.*\]', output, re.S)
+    if match:
         try:
-            title = llm.invoke(prompt)
-            # 清理输出
-            title = title.strip().replace('\n', ' ').replace('\r', '')
-            
-            # 移除可能的前缀
-            prefixes = ['标题：', '建议标题：', '推荐标题：', '标题:', '答:', '答：']
-            for prefix in prefixes:
-                if title.startswith(prefix):
-                    title = title[len(prefix):].strip()
-            
-            # 移除引号
-            if (title.startswith('"') and title.endswith('"')) or (title.startswith('"') and title.endswith('"')):
-                title = title[1:-1]
-            
-            # 长度控制
-            if len(title) > 30:
-                title = title[:28] + "..."
-            
-            # 质量评估和二次优化
-            evaluation = evaluate_title_quality(title, product_info, target_audience)
-            
-            if evaluation['need_optimization']:
-                print(f"标题质量评分: {evaluation['score']:.2f} ({evaluation['grade']}) - 进行二次优化")
-                optimized_title = optimize_title_with_feedback(title, evaluation, product_info, style, target_audience)
-                
-                # 验证优化效果
-                new_evaluation = evaluate_title_quality(optimized_title, product_info, target_audience)
-                if new_evaluation['score'] > evaluation['score']:
-                    print(f"优化成功: {evaluation['score']:.2f} -> {new_evaluation['score']:.2f}")
-                    return optimized_title
-                else:
-                    print("优化效果不佳，使用原标题")
-                    return title
-            else:
-                print(f"标题质量良好: {evaluation['score']:.2f} ({evaluation['grade']})")
-                return title
-                
-        except Exception as e:
-            print(f"LLM调用失败: {e}")
-            pass
+            parsed = json.loads(match.group())
+            items = [str(item) for item in parsed if isinstance(item, str)] if isinstance(parsed, list) else []
+        except ValueError:
+            items = []
+    if not items:
+        items = [re.sub(r'^\s*(\d+[\.、:：)）]|[-*•])\s*', '', line) for line in output.splitlines()]
+    
+    titles = []
+    for item in items:
+        title = _clean_generated_title(item.strip().strip('",，'))
+        if title and title not in titles:
+            titles.append(title)
+    return titles[:candidates]
+
+def _pick_title_candidate(output: str, product_info: str, target_audience: str) -> tuple:
+    """
+    对候选标题逐一本地评分，返回(最优标题, 评估结果)
     
-    # 回退到规则引擎模式
+    只有最优候选也需要优化（即全部候选不达标）时，调用方才进行二次优化
+    """
+    candidates = Config.TITLE_GENERATION_CONFIG["candidates"]
+    titles = _parse_title_candidates(output, candidates) or [_clean_generated_title(output)]
+    
+    ranked = sorted(
+        ((title, evaluate_title_quality(title, product_info, target_audience)) for title in titles),
+        key=lambda item: item[1]['score'],
+        reverse=True
+    )
+    title, evaluation = ranked[0]
+    annotate_span(candidates=len(ranked), best_score=round(evaluation['score'], 3))
+    if len(ranked) > 1:
+        print(f"候选标题 {len(ranked)} 个，最高评分: {evaluation['score']:.2f}")
+    return title, evaluation
+
+def _pick_better_title(title: str, evaluation: dict, optimized_title: str, product_info: str, target_audience: str) -> str:
+    """比较二次优化前后的评分，返回更优的标题"""
+    new_evaluation = evaluate_title_quality(optimized_title, product_info, target_audience)
+    if new_evaluation['score'] > evaluation['score']:
+        print(f"优化成功: {evaluation['score']:.2f} -> {new_evaluation['score']:.2f}")
+        return optimized_title
+    
+    print("优化效果不佳，使用原标题")
+    return title
+
+def _rule_based_title(product_info: str, style: str, target_audience: str) -> str:
+    """规则引擎生成标题（无可用LLM时的回退方案）"""
     # 根据目标受众定义词汇库
     audience_config = {
         "年轻女性": {
@@ -453,76 +514,84 @@ def generate_product_title(product_info: str, style: str = "爆款") -> str:
     
     # 清理标题
     title = re.sub(r'\s+', ' ', title).strip()
-=======
-    # 提取商品关键信息
-    keywords = list(jieba.cut(product_info))
-    keywords = [k for k in keywords if len(k) > 1]
-    
-    # 定义不同风格的标题模板
-    templates = {
-        "爆款": [
-            "【热销爆款】{product}，{feature}",
-            "🔥{product} 限时特惠，{feature}",
-            "【新品上市】{product}，{feature}，抢购中！"
-        ],
-        "简约": [
-            "{product} | {feature}",
-            "简约{product}，{feature}",
-            "{product} - {feature}"
-        ],
-        "高端": [
-            "精选{product}，{feature}",
-            "匠心{product}，{feature}",
-            "臻品{product}，{feature}"
-        ]
-    }
     
-    # 选择模板并填充
-    template = random.choice(templates.get(style, templates["爆款"]))
-    
-    # 简单的商品信息解析
-    product_name = keywords[0] if keywords else "商品"
-    features = "品质保证" if len(keywords) < 2 else keywords[-1]
+    return title
+
+
+def _title_steps(product_info: str, style: str, target_audience: str) -> Steps:
+    """
+    标题生成流程（同步与异步版本共用）
+
+    超出时间预算时抛出DeadlineExceeded，而不是以规则引擎的结果冒充按时完成
+    """
+    check_deadline()
+    llm = get_task_llm("title")
     
-    title = template.format(product=product_name, feature=features)
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
+    # 如果有真实的LLM，使用LLM生成
+    if is_llm_available(llm):
+        # 预处理商品信息并构建增强的prompt
+        candidates = Config.TITLE_GENERATION_CONFIG["candidates"]
+        prompt = _build_title_prompt(
+            preprocess_product_info(product_info), get_audience_profile(target_audience), style, target_audience,
+            candidates=candidates
+        )
+        options = generation_options(llm, "title_candidates" if candidates > 1 else "title")
+        
+        try:
+            # 一次调用生成多个候选并在本地评分，全部候选不达标时才二次优化
+            output = yield Call(llm, prompt, options)
+            title, evaluation = _pick_title_candidate(output, product_info, target_audience)
+            
+            if evaluation['need_optimization']:
+                print(f"标题质量评分: {evaluation['score']:.2f} ({evaluation['grade']}) - 进行二次优化")
+                with trace_span("optimize_title_with_feedback") as span:
+                    optimized_title = yield from _optimization_steps(title, evaluation, product_info, style, target_audience)
+                    span.set(output_chars=len(optimized_title))
+                return _pick_better_title(title, evaluation, optimized_title, product_info, target_audience)
+            else:
+                print(f"标题质量良好: {evaluation['score']:.2f} ({evaluation['grade']})")
+                return title
+                
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"LLM调用失败: {e}")
+            pass
     
-    return title
+    # 回退到规则引擎模式
+    return _rule_based_title(product_info, style, target_audience)
 
 
-@tool  
-<<<<<<< HEAD
-def suggest_strategy(product_type: str, target_audience: str = "通用", budget: str = "中等", product_info: str = "") -> str:
-=======
-def suggest_strategy(product_type: str, target_audience: str = "通用", budget: str = "中等") -> str:
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
+@tool
+def generate_product_title(product_info: str, style: str = "爆款", target_audience: str = "通用") -> str:
     """
-    根据商品类型和目标受众推荐营销策略
+    根据商品信息生成推荐标题
     
     Args:
-        product_type: 商品类型，如"服装"、"数码"、"美妆"等
-        target_audience: 目标受众，如"年轻女性"、"中年男性"、"学生"等
-        budget: 预算水平，如"低"、"中等"、"高"
-<<<<<<< HEAD
-        product_info: 商品详细信息，用于个性化建议
-=======
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
+        product_info: 商品信息，包含类目、属性、价格等
+        style: 文案风格，如"爆款"、"简约"、"高端"等
+        target_audience: 目标受众，影响标题用词和表达方式
         
     Returns:
-        推荐的营销策略
+        生成的商品标题
     """
+    return run_steps(_title_steps(product_info, style, target_audience))
+
+
+async def agenerate_product_title(product_info: str, style: str = "爆款", target_audience: str = "通用") -> str:
+    """generate_product_title 的异步版本"""
+    return await arun_steps(_title_steps(product_info, style, target_audience))
+
+
+def _build_strategy_prompt(product_type: str, target_audience: str, budget: str, product_info: str,
+                           length_target: int = 750) -> str:
+    """构建营销策略prompt，length_target为要求的总字数"""
+    # 预处理商品信息
+    processed_info = preprocess_product_info(product_info)
+    audience_profile = get_audience_profile(target_audience)
     
-<<<<<<< HEAD
-    llm = get_llm_instance()
-    
-    # 如果有真实的LLM，使用LLM生成详细策略
-    if llm and llm.__class__.__name__ != 'MockLLM':
-        # 预处理商品信息
-        processed_info = preprocess_product_info(product_info)
-        audience_profile = get_audience_profile(target_audience)
-        
-        # 构建增强的prompt
-        prompt = f"""你是一位拥有15年经验的电商营销战略专家，擅长为不同品类和受众制定精准营销策略。
+    # 构建增强的prompt
+    return f"""你是一位拥有15年经验的电商营销战略专家，擅长为不同品类和受众制定精准营销策略。
 
 【项目背景分析】
 商品详细信息：
@@ -579,21 +648,15 @@ def suggest_strategy(product_type: str, target_audience: str = "通用", budget:
    - 优化调整的判断标准
 
 【输出要求】
-- 总字数控制在750字左右
+- 总字数控制在{length_target}字左右
 - 每个维度都要具体可执行，避免空洞概念
 - 紧密结合商品特点和用户画像
 - 语言专业但易懂，逻辑清晰
 
 请基于以上分析框架，输出完整的营销策略方案："""
-        
-        try:
-            strategy = llm.invoke(prompt)
-            return strategy.strip()
-        except Exception as e:
-            print(f"营销策略LLM调用失败: {e}")
-            pass
-    
-    # 回退到简化的策略建议
+
+def _rule_based_strategy(product_type: str, target_audience: str, budget: str) -> str:
+    """规则引擎生成简化策略建议（无可用LLM时的回退方案）"""
     basic_strategies = {
         "服装": {
             "年轻女性": "建议在小红书和抖音投放，重点展示穿搭效果，配合时尚博主合作",
@@ -640,74 +703,71 @@ def suggest_strategy(product_type: str, target_audience: str = "通用", budget:
 注：使用真实LLM模式可获得更详细的个性化策略方案。"""
 
 
-@tool
-def estimate_ctr(title: str, keywords: List[str] = None) -> Dict[str, Any]:
-=======
-    # 基础策略库
-    strategies = {
-        "服装": {
-            "年轻女性": "建议参与抖音话题挑战，使用时尚穿搭、OOTD等标签，配合KOL合作",
-            "中年女性": "主打品质和实用性，在小红书投放，强调舒适和百搭",
-            "通用": "季节性促销，配合节日活动，强调性价比"
-        },
-        "数码": {
-            "年轻男性": "B站、知乎投放技术测评内容，强调性能参数和性价比对比",
-            "学生": "教育优惠政策，学习效率提升，分期付款选项",
-            "通用": "新品首发优惠，以旧换新活动，技术创新点突出"
-        },
-        "美妆": {
-            "年轻女性": "小红书种草，美妆博主试色，限量款营销",
-            "中年女性": "抗老功效宣传，温和配方，品牌信誉背书",
-            "通用": "节日礼盒装，买赠活动，会员专享折扣"
-        }
-    }
+def _strategy_steps(product_type: str, target_audience: str, budget: str, product_info: str) -> Steps:
+    """营销策略流程（同步与异步版本共用），超出时间预算时抛出DeadlineExceeded"""
+    check_deadline()
+    llm = get_task_llm("strategy")
     
-    # 获取策略
-    category_strategies = strategies.get(product_type, strategies["服装"])
-    strategy = category_strategies.get(target_audience, category_strategies["通用"])
-    
-    # 根据预算调整策略
-    budget_adjustments = {
-        "低": "建议采用有机流量策略，重点优化商品详情页和用户评价",
-        "中等": "适当投放信息流广告，配合达人合作进行推广",
-        "高": "全渠道投放，品牌代言人合作，线下活动配合"
-    }
+    # 如果有真实的LLM，使用LLM生成详细策略
+    if is_llm_available(llm):
+        strategy_budget = generation_budget(llm, "strategy")
+        prompt = _build_strategy_prompt(product_type, target_audience, budget, product_info,
+                                        length_target=strategy_budget.get("length_target", 750))
+        
+        try:
+            strategy = yield Call(llm, prompt, generation_options(llm, "strategy"))
+            return strategy.strip()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"营销策略LLM调用失败: {e}")
+            pass
     
-    budget_advice = budget_adjustments.get(budget, budget_adjustments["中等"])
+    # 回退到简化的策略建议
+    return _rule_based_strategy(product_type, target_audience, budget)
+
+
+@tool  
+def suggest_strategy(product_type: str, target_audience: str = "通用", budget: str = "中等", product_info: str = "") -> str:
+    """
+    根据商品类型和目标受众推荐营销策略
     
-    return f"策略建议：{strategy}。预算策略：{budget_advice}"
+    Args:
+        product_type: 商品类型，如"服装"、"数码"、"美妆"等
+        target_audience: 目标受众，如"年轻女性"、"中年男性"、"学生"等
+        budget: 预算水平，如"低"、"中等"、"高"
+        product_info: 商品详细信息，用于个性化建议
+        
+    Returns:
+        推荐的营销策略
+    """
+    return run_steps(_strategy_steps(product_type, target_audience, budget, product_info))
+
+
+async def asuggest_strategy(product_type: str, target_audience: str = "通用", budget: str = "中等", product_info: str = "") -> str:
+    """suggest_strategy 的异步版本"""
+    return await arun_steps(_strategy_steps(product_type, target_audience, budget, product_info))
 
 
 @tool
-def estimate_ctr(title: str, keywords: List[str], target_keywords: List[str] = None) -> Dict[str, Any]:
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
+def estimate_ctr(title: str, keywords: List[str] = None) -> Dict[str, Any]:
     """
     估算标题点击率得分，基于关键词覆盖率和标题质量
     
     Args:
         title: 商品标题
-<<<<<<< HEAD
         keywords: 核心关键词列表（可选，如果未提供则从标题中自动提取）
-=======
-        keywords: 核心关键词列表
-        target_keywords: 目标关键词列表（可选）
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
         
     Returns:
         包含CTR预估分数和详细分析的字典
     """
     
-<<<<<<< HEAD
     # 如果没有提供关键词，从标题中自动提取
     if keywords is None or len(keywords) == 0:
         import jieba
         keywords = [k for k in jieba.cut(title) if len(k) > 1 and k not in ['，', '。', '、', '的', '是', '和', '与', '适合']][:5]
     
     target_keywords = keywords
-=======
-    if target_keywords is None:
-        target_keywords = keywords
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
         
     # 1. 关键词覆盖率计算
     title_lower = title.lower()
@@ -742,8 +802,7 @@ def estimate_ctr(title: str, keywords: List[str], target_keywords: List[str] = N
     symbol_score = min(symbol_score, 1.0)
     
     # 4. 紧急词汇评分
-    urgent_words = ['限时', '抢购', '特惠', '新品', '爆款', '热销']
-    urgent_count = sum(1 for word in urgent_words if word in title)
+    urgent_count = sum(1 for word in URGENT_WORDS if word in title)
     urgent_score = min(urgent_count * 0.2, 0.6)
     
     # 5. 综合CTR评分
@@ -804,61 +863,45 @@ def get_optimization_suggestions(coverage_rate: float, length_score: float,
     return suggestions
 
 
-@tool
-<<<<<<< HEAD
-def analyze_competitor_title(competitor_title: str, our_keywords: List[str] = None) -> Dict[str, Any]:
-=======
-def analyze_competitor_title(competitor_title: str, our_keywords: List[str]) -> Dict[str, Any]:
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
-    """
-    分析竞品标题，提供差异化建议
-    
-    Args:
-        competitor_title: 竞品标题
-<<<<<<< HEAD
-        our_keywords: 我们的核心关键词（可选，如果未提供则从竞品标题中推断）
-=======
-        our_keywords: 我们的核心关键词
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
-        
-    Returns:
-        竞品分析结果和差异化建议
-    """
-    
+def _compare_competitor_keywords(competitor_title: str, our_keywords: List[str] = None) -> Dict[str, Any]:
+    """对比竞品与我们的关键词，并评估竞品标题CTR"""
     # 分析竞品标题的关键词
     competitor_keywords = list(jieba.cut(competitor_title))
     competitor_keywords = [k for k in competitor_keywords if len(k) > 1]
     
-<<<<<<< HEAD
     # 如果没有提供我们的关键词，从竞品标题中推断相关关键词
     if our_keywords is None or len(our_keywords) == 0:
         # 基于竞品标题推断可能的关键词
         our_keywords = competitor_keywords[:3]  # 使用竞品标题的前3个关键词作为参考
     
-=======
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
-    # 找出共同关键词和差异关键词
-    common_keywords = list(set(our_keywords) & set(competitor_keywords))
-    unique_to_competitor = list(set(competitor_keywords) - set(our_keywords))
-    unique_to_us = list(set(our_keywords) - set(competitor_keywords))
-    
     # 获取竞品标题CTR评估
     competitor_ctr = estimate_ctr.invoke({
         "title": competitor_title,
         "keywords": competitor_keywords
     })
     
-<<<<<<< HEAD
-    # 获取LLM实例进行详细分析
-    llm = get_llm_instance()
-    
-    # 生成差异化建议
-    differentiation_suggestions = []
-    detailed_analysis = ""
-    
-    # 如果有真实的LLM，使用LLM进行深度分析
-    if llm and llm.__class__.__name__ != 'MockLLM':
-        analysis_prompt = f"""你是一位资深的电商竞品分析专家，拥有10年+的行业经验。
+    # 找出共同关键词和差异关键词
+    return {
+        "competitor_title": competitor_title,
+        "competitor_keywords": competitor_keywords,
+        "our_keywords": our_keywords,
+        "common_keywords": list(set(our_keywords) & set(competitor_keywords)),
+        "unique_to_competitor": list(set(competitor_keywords) - set(our_keywords)),
+        "unique_to_us": list(set(our_keywords) - set(competitor_keywords)),
+        "competitor_ctr": competitor_ctr
+    }
+
+def _build_competitor_prompt(comparison: Dict[str, Any], length_target: int = 650) -> str:
+    """构建竞品深度分析prompt，length_target为要求的总字数"""
+    competitor_title = comparison["competitor_title"]
+    competitor_ctr = comparison["competitor_ctr"]
+    competitor_keywords = comparison["competitor_keywords"]
+    our_keywords = comparison["our_keywords"]
+    common_keywords = comparison["common_keywords"]
+    unique_to_competitor = comparison["unique_to_competitor"]
+    unique_to_us = comparison["unique_to_us"]
+    
+    return f"""你是一位资深的电商竞品分析专家，拥有10年+的行业经验。
 
 【竞品标题分析】
 - 竞品标题：{competitor_title}
@@ -905,26 +948,25 @@ def analyze_competitor_title(competitor_title: str, our_keywords: List[str]) ->
    - 优先级排序和时间安排
 
 【输出要求】
-- 总字数控制在650字左右
+- 总字数控制在{length_target}字左右
 - 每个维度都要具体可执行，避免空洞概念
 - 紧密结合竞品数据和关键词分析
 - 语言专业但易懂，逻辑清晰
 
 请基于以上分析框架，输出完整的竞品分析报告："""
-        
-        try:
-            detailed_analysis = llm.invoke(analysis_prompt).strip()
-            
-            # 从详细分析中提取关键建议
-            if "差异化突破点" in detailed_analysis:
-                # 简化提取主要建议
-                differentiation_suggestions.append("基于LLM深度分析，详见完整分析报告")
-            else:
-                differentiation_suggestions.append("使用了LLM进行专业分析，请查看详细报告")
-                
-        except Exception as e:
-            print(f"竞品分析LLM调用失败: {e}")
-            detailed_analysis = "未能生成详细分析，请查看LLM连接状态"
+
+def _summarize_llm_analysis(detailed_analysis: str) -> List[str]:
+    """从LLM详细分析中提取关键建议"""
+    if "差异化突破点" in detailed_analysis:
+        # 简化提取主要建议
+        return ["基于LLM深度分析，详见完整分析报告"]
+    return ["使用了LLM进行专业分析，请查看详细报告"]
+
+def _build_competitor_result(comparison: Dict[str, Any], differentiation_suggestions: List[str], detailed_analysis: str) -> Dict[str, Any]:
+    """组装竞品分析结果，没有LLM分析时使用基础分析"""
+    unique_to_competitor = comparison["unique_to_competitor"]
+    unique_to_us = comparison["unique_to_us"]
+    competitor_ctr = comparison["competitor_ctr"]
     
     # 回退到基础分析（如果没有LLM或LLM失败）
     if not detailed_analysis:
@@ -938,32 +980,82 @@ def analyze_competitor_title(competitor_title: str, our_keywords: List[str]) ->
             differentiation_suggestions.append("竞品标题质量较高，建议学习其标题结构但要突出差异化")
         else:
             differentiation_suggestions.append("竞品标题有优化空间，我们可以在此基础上提升")
-=======
-    # 生成差异化建议
-    differentiation_suggestions = []
-    
-    if unique_to_competitor:
-        differentiation_suggestions.append(f"竞品强调了：{', '.join(unique_to_competitor[:3])}，我们可以考虑突出其他卖点")
-    
-    if unique_to_us:
-        differentiation_suggestions.append(f"我们的优势关键词：{', '.join(unique_to_us[:3])}，应该重点突出")
-    
-    if competitor_ctr["ctr_score"] > 0.7:
-        differentiation_suggestions.append("竞品标题质量较高，建议学习其标题结构但要突出差异化")
-    else:
-        differentiation_suggestions.append("竞品标题有优化空间，我们可以在此基础上提升")
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
     
     return {
-        "competitor_title": competitor_title,
+        "competitor_title": comparison["competitor_title"],
         "competitor_ctr_analysis": competitor_ctr,
-        "common_keywords": common_keywords,
+        "common_keywords": comparison["common_keywords"],
         "competitor_unique_keywords": unique_to_competitor,
         "our_unique_keywords": unique_to_us,
-<<<<<<< HEAD
         "differentiation_suggestions": differentiation_suggestions,
         "detailed_analysis": detailed_analysis  # 新增详细分析
-=======
-        "differentiation_suggestions": differentiation_suggestions
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
-    }
\ No newline at end of file
+    }
+
+def _competitor_steps(competitor_title: str, our_keywords: List[str] = None) -> Steps:
+    """竞品分析流程（同步与异步版本共用），超出时间预算时抛出DeadlineExceeded"""
+    check_deadline()
+    comparison = _compare_competitor_keywords(competitor_title, our_keywords)
+    
+    # 获取LLM实例进行详细分析
+    llm = get_task_llm("competitor")
+    
+    # 生成差异化建议
+    differentiation_suggestions = []
+    detailed_analysis = ""
+    
+    # 如果有真实的LLM，使用LLM进行深度分析
+    if is_llm_available(llm):
+        prompt = _build_competitor_prompt(comparison, generation_budget(llm, "competitor").get("length_target", 650))
+        try:
+            detailed_analysis = (yield Call(llm, prompt, generation_options(llm, "competitor"))).strip()
+            differentiation_suggestions = _summarize_llm_analysis(detailed_analysis)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"竞品分析LLM调用失败: {e}")
+            detailed_analysis = "未能生成详细分析，请查看LLM连接状态"
+    
+    return _build_competitor_result(comparison, differentiation_suggestions, detailed_analysis)
+
+
+@tool
+def analyze_competitor_title(competitor_title: str, our_keywords: List[str] = None) -> Dict[str, Any]:
+    """
+    分析竞品标题，提供差异化建议
+    
+    Args:
+        competitor_title: 竞品标题
+        our_keywords: 我们的核心关键词（可选，如果未提供则从竞品标题中推断）
+        
+    Returns:
+        竞品分析结果和差异化建议
+    """
+    return run_steps(_competitor_steps(competitor_title, our_keywords))
+
+
+async def aanalyze_competitor_title(competitor_title: str, our_keywords: List[str] = None) -> Dict[str, Any]:
+    """analyze_competitor_title 的异步版本"""
+    return await arun_steps(_competitor_steps(competitor_title, our_keywords))
+
+
+# 为工具挂载原生异步实现，tool.ainvoke 将直接调用协程而不是占用线程
+generate_product_title.coroutine = agenerate_product_title
+suggest_strategy.coroutine = asuggest_strategy
+analyze_competitor_title.coroutine = aanalyze_competitor_title
+
+
+# CTR预估只依赖标题和关键词，一站式方案中同一标题会被多次评估，缓存工具函数的计算结果
+estimate_ctr.func = memoize("estimate_ctr")(estimate_ctr.func)
+
+
+def _tool_span_attributes(*args, **kwargs) -> Dict[str, Any]:
+    return {"input_chars": len(json.dumps([args, kwargs], ensure_ascii=False, default=str))}
+
+
+# 记录每次工具调用的span（Agent、快速路由和一站式方案都经由 func/coroutine 执行工具）
+for _traced_tool in (generate_product_title, suggest_strategy, estimate_ctr, analyze_competitor_title):
+    _traced_tool.func = traced(f"tool.{_traced_tool.name}", kind="tool", record_output=True,
+                               attributes=_tool_span_attributes)(_traced_tool.func)
+    if _traced_tool.coroutine:
+        _traced_tool.coroutine = traced(f"tool.{_traced_tool.name}", kind="tool", record_output=True,
+                                        attributes=_tool_span_attributes)(_traced_tool.coroutine)
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+商品目录批量处理脚本
+读取CSV/Parquet商品表，通过工作线程池批量生成完整解决方案（标题、CTR、策略），
+结果逐条写入JSONL输出文件；输出文件同时作为检查点，中断后重新运行会跳过已完成的SKU，
+重新处理失败项时为同一SKU追加新记录，读取时以最后一条记录为准
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Set
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+
+
+PRODUCT_FIELDS = ["sku", "product_info", "competitor_title", "target_audience", "budget"]
+
+
+def load_products(input_path: str, column_map: Dict[str, str] = None) -> List[Dict[str, str]]:
+    """
+    读取商品表
+
+    Args:
+        input_path: CSV或Parquet文件路径
+        column_map: 字段名到文件列名的映射，未指定的字段使用同名列
+
+    Returns:
+        商品列表，每项包含 PRODUCT_FIELDS 中的字段（缺失列为空字符串）
+    """
+    column_map = column_map or {}
+
+    if input_path.lower().endswith(".parquet"):
+        # Parquet读取依赖pandas与pyarrow，仅在需要时导入
+        import pandas as pd
+        rows = pd.read_parquet(input_path).fillna("").astype(str).to_dict("records")
+    else:
+        with open(input_path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    products = []
+    seen = set()
+    for row in rows:
+        product = {field: str(row.get(column_map.get(field, field)) or "").strip() for field in PRODUCT_FIELDS}
+        if not product["sku"] or not product["product_info"]:
+            continue
+        if product["sku"] in seen:
+            print(f"⚠️ 重复SKU已跳过: {product['sku']}")
+            continue
+        seen.add(product["sku"])
+        products.append(product)
+
+    return products
+
+
+def load_latest_records(output_path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    读取输出文件中每个SKU的最新记录
+
+    --retry-failed 重新处理时会为同一SKU追加新记录，同一SKU以文件中最后一条记录为准。
+    进程崩溃时最后一行可能写了一半，此处会截掉不完整的行，保证后续追加写入的文件有效；
+    其余无法解析的行跳过并打印提示
+
+    Args:
+        output_path: JSONL输出文件路径
+
+    Returns:
+        SKU到其最新记录的映射
+    """
+    latest = {}
+    if not os.path.exists(output_path):
+        return latest
+
+    with open(output_path, "rb+") as f:
+        content = f.read()
+        valid_length = content.rfind(b"\n") + 1
+        if valid_length < len(content):
+            f.truncate(valid_length)
+
+    lines = content[:valid_length].decode("utf-8", errors="replace").splitlines()
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            sku = record["sku"]
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"⚠️ 跳过无法解析的记录（第{line_number}行）: {e}")
+            continue
+        latest[sku] = record
+
+    return latest
+
+
+def load_completed_skus(output_path: str, retry_failed: bool = False) -> Set[str]:
+    """
+    从输出文件恢复已完成的SKU（同一SKU以最后一条记录为准）
+
+    Args:
+        output_path: JSONL输出文件路径
+        retry_failed: 为True时最新记录为失败的SKU不视为已完成，会被重新处理
+    """
+    return {
+        sku for sku, record in load_latest_records(output_path).items()
+        if record.get("success") or not retry_failed
+    }
+
+
+def summarize_solution(product: Dict[str, str], solution: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+    """将完整解决方案压缩为一条输出记录"""
+    record = {
+        "sku": product["sku"],
+        "success": bool(solution.get("success")),
+        "elapsed_seconds": round(elapsed, 3)
+    }
+
+    if record["success"]:
+        recommended = solution["recommended_title"]
+        record.update({
+            "recommended_title": recommended["title"],
+            "recommended_style": recommended["style"],
+            "ctr_score": recommended["ctr_analysis"]["ctr_score"],
+            "titles": [
+                {
+                    "style": evaluation["style"],
+                    "title": evaluation["title"],
+                    "ctr_score": evaluation["ctr_analysis"]["ctr_score"]
+                }
+                for evaluation in solution["ctr_evaluations"]
+            ],
+            "strategy_suggestion": solution["strategy_suggestion"]
+        })
+        if "competitor_analysis" in solution:
+            record["differentiation_suggestions"] = solution["competitor_analysis"]["differentiation_suggestions"]
+        # 超出时间预算的部分结果记为失败，--retry-failed 时重新处理
+        missing = [name for name, status in solution.get("sections", {}).items() if status != "done"]
+        if missing:
+            record["success"] = False
+            record["error"] = f"超出时间预算，未完成: {', '.join(missing)}"
+    else:
+        record["error"] = solution.get("error", "未知错误")
+
+    return record
+
+
+class ProgressReporter:
+    """统计吞吐量并估算剩余时间"""
+
+    def __init__(self, total: int, interval: float = 10):
+        """
+        Args:
+            total: 本次运行待处理的数量
+            interval: 进度输出间隔（秒）
+        """
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def update(self, success: bool):
+        """记录一条完成结果，到达输出间隔时打印进度"""
+        self.done += 1
+        if not success:
+            self.failed += 1
+
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval or self.done == self.total:
+            self._last_report = now
+            print(self.format())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取当前进度"""
+        elapsed = time.perf_counter() - self.started
+        throughput = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        return {
+            "done": self.done,
+            "total": self.total,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 1),
+            "throughput_per_minute": round(throughput * 60, 1),
+            "eta_seconds": round(remaining / throughput, 1) if throughput > 0 else None
+        }
+
+    def format(self) -> str:
+        """格式化进度信息"""
+        progress = self.snapshot()
+        eta = progress["eta_seconds"]
+        eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta is not None else "--:--:--"
+        return (f"  进度 {progress['done']}/{progress['total']} "
+                f"(失败 {progress['failed']}) | 吞吐 {progress['throughput_per_minute']} 个/分钟 | "
+                f"已用 {progress['elapsed_seconds']}s | 预计剩余 {eta_text}")
+
+
+def run_batch(products: Iterable[Dict[str, str]], solve: Callable[..., Dict[str, Any]], output_path: str,
+              workers: int = 4, retry_failed: bool = False, progress_interval: float = 10) -> Dict[str, Any]:
+    """
+    批量处理商品，结果逐条追加写入输出文件
+
+    Args:
+        products: 商品列表
+        solve: 生成解决方案的函数，参数同 generate_complete_solution
+        output_path: JSONL输出文件（同时作为检查点）
+        workers: 并行处理的商品数
+        retry_failed: 是否重新处理上次失败的SKU
+        progress_interval: 进度输出间隔（秒）
+
+    Returns:
+        本次运行的进度统计
+    """
+    completed = load_completed_skus(output_path, retry_failed)
+    pending = [product for product in products if product["sku"] not in completed]
+    print(f"已完成 {len(completed)} 个SKU，本次待处理 {len(pending)} 个")
+
+    reporter = ProgressReporter(len(pending), progress_interval)
+    if not pending:
+        return reporter.snapshot()
+
+    def process(product: Dict[str, str]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            solution = solve(
+                product_info=product["product_info"],
+                competitor_title=product["competitor_title"] or None,
+                target_audience=product["target_audience"] or "通用",
+                budget=product["budget"] or "中等"
+            )
+        except Exception as e:
+            solution = {"success": False, "error": str(e)}
+        return summarize_solution(product, solution, time.perf_counter() - started)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    queue_iter = iter(pending)
+
+    with open(output_path, "a", encoding="utf-8") as output, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="merchant-batch") as executor:
+        # 只保持有限数量的任务在队列中，中断时不会丢失大量已提交但未开始的任务
+        in_flight = set()
+        try:
+            while True:
+                while len(in_flight) < workers * 2:
+                    product = next(queue_iter, None)
+                    if product is None:
+                        break
+                    in_flight.add(executor.submit(process, product))
+                if not in_flight:
+                    break
+
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+                    reporter.update(record["success"])
+        except KeyboardInterrupt:
+            for future in in_flight:
+                future.cancel()
+            print("\n⚠️ 已中断，重新运行相同命令即可从检查点继续")
+            raise
+
+    return reporter.snapshot()
+
+
+def main():
+    """主函数"""
+    batch_config = Config.BATCH_CONFIG
+    parser = argparse.ArgumentParser(description="商品目录批量生成解决方案")
+    parser.add_argument("input", help="商品表路径（.csv 或 .parquet）")
+    parser.add_argument("--output", default="batch_results/solutions.jsonl", help="JSONL输出文件，同时作为检查点")
+    parser.add_argument("--workers", type=int, default=batch_config["workers"], help="并行处理的商品数")
+    parser.add_argument("--llm-concurrency", type=int, default=Config.OLLAMA_CLIENT_CONFIG["max_in_flight"],
+                        help="同时发往Ollama的最大请求数")
+    parser.add_argument("--llm-type", default=Config.DEFAULT_LLM, choices=list(Config.LLM_CONFIGS.keys()))
+    parser.add_argument("--retry-failed", action="store_true", help="重新处理上次失败的SKU")
+    parser.add_argument("--time-budget", type=float, default=batch_config["time_budget"],
+                        help="每个商品的时间预算（秒），超时的部分结果记为失败，0表示不限时")
+    parser.add_argument("--progress-interval", type=float, default=batch_config["progress_interval"],
+                        help="进度输出间隔（秒）")
+    for field in PRODUCT_FIELDS:
+        parser.add_argument(f"--{field.replace('_', '-')}-column", dest=f"{field}_column", default=field,
+                            help=f"{field} 对应的列名")
+    args = parser.parse_args()
+
+    print("开始批量处理商品目录")
+    print("=" * 50)
+
+    products = load_products(args.input, {field: getattr(args, f"{field}_column") for field in PRODUCT_FIELDS})
+    print(f"读取商品 {len(products)} 个: {args.input}")
+
+    # 在初始化Agent前以指定并发上限创建该服务地址的连接池，不修改全局配置
+    llm_config = Config.get_llm_config(args.llm_type)
+    if llm_config.get("base_url"):
+        from agent.llm_client import get_ollama_pool
+        get_ollama_pool(llm_config["base_url"], max_in_flight=args.llm_concurrency)
+
+    from agent.agent_executor import MerchantAssistantAgent
+    agent = MerchantAssistantAgent(llm_type=args.llm_type)
+
+    solve = functools.partial(agent.generate_complete_solution, time_budget=args.time_budget)
+    progress = run_batch(products, solve, args.output,
+                         workers=args.workers, retry_failed=args.retry_failed,
+                         progress_interval=args.progress_interval)
+
+    print("\n" + "=" * 50)
+    print(f"批量处理完成: 成功 {progress['done'] - progress['failed']} 个，失败 {progress['failed']} 个，"
+          f"吞吐 {progress['throughput_per_minute']} 个/分钟")
+    print(f"结果已保存至: {args.output}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+词表匹配微基准测试
+合成商品标题和商品描述，对比逐词 `word in text` 查找（当前实现）与“每类词表一个正则交替式预筛、命中后再逐词查找”的耗时：
+一是按目录批量评分时每行实际需要的查找，二是按文本长度和词表规模查找全部词表；
+同时校验两种方式的命中结果一致，词表扩充后可据此重新评估是否需要换用预筛
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from typing import Any, Dict, List, Pattern, Sequence, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.lexicon import (
+    LEXICONS, PRODUCT_TYPES, COLORS, SEASONS, FEATURES, TITLE_AUDIENCE_WORDS,
+    ATTRACTIVE_WORDS, EMOTION_SYMBOLS, URGENT_WORDS
+)
+
+
+FILLERS = ["的", "女", "款", "式", "宽松", "高腰", "修身", "舒服", "质感", "上衣", "，", " ", "包邮", "2024", "元"]
+
+# 商品信息预处理、标题质量评估和CTR预估对一行目录数据查找的词表
+ROW_LEXICONS = {
+    "product_info": {"product_type": PRODUCT_TYPES, "feature": FEATURES, "season": SEASONS, "color": COLORS,
+                     "color_stem": [color[:-1] for color in COLORS]},
+    "title": {"audience": TITLE_AUDIENCE_WORDS["年轻女性"], "attractive": ATTRACTIVE_WORDS,
+              "emotion_symbol": EMOTION_SYMBOLS, "product_type": PRODUCT_TYPES, "color": COLORS,
+              "season": SEASONS, "urgent": URGENT_WORDS}
+}
+
+
+def compile_patterns(lexicons: Dict[str, Sequence[str]]) -> Dict[str, Pattern]:
+    """每类词表编译为一个正则交替式"""
+    return {category: re.compile("|".join(map(re.escape, words))) for category, words in lexicons.items()}
+
+
+ROW_PATTERNS = {field: compile_patterns(lexicons) for field, lexicons in ROW_LEXICONS.items()}
+
+
+def substring_scan(lexicons: Dict[str, Sequence[str]], text: str) -> Dict[str, Tuple[str, ...]]:
+    """逐词查找：对每个词表逐词做子串查找"""
+    hits = {}
+    for category, words in lexicons.items():
+        found = tuple(word for word in words if word in text)
+        if found:
+            hits[category] = found
+    return hits
+
+
+def regex_scan(lexicons: Dict[str, Sequence[str]], patterns: Dict[str, Pattern], text: str) -> Dict[str, Tuple[str, ...]]:
+    """正则预筛：该类词表的正则有命中时再逐词查找（正则不返回重叠的词，不能单独替代逐词查找）"""
+    hits = {}
+    for category, words in lexicons.items():
+        if patterns[category].search(text):
+            hits[category] = tuple(word for word in words if word in text)
+    return hits
+
+
+def row_substring_scans(title: str, product_info: str) -> int:
+    """商品信息预处理、标题质量评估和CTR预估对一行目录数据做的逐词查找"""
+    found = sum(1 for word in PRODUCT_TYPES + FEATURES + SEASONS if word in product_info)
+    found += sum(1 for color in COLORS if color in product_info or color[:-1] in product_info)
+    found += sum(1 for word in TITLE_AUDIENCE_WORDS["年轻女性"] + ATTRACTIVE_WORDS + EMOTION_SYMBOLS if word in title)
+    found += sum(1 for word in PRODUCT_TYPES + COLORS + SEASONS + URGENT_WORDS if word in title)
+    return found
+
+
+def row_regex_scans(title: str, product_info: str) -> int:
+    """同样的查找改为正则预筛"""
+    return sum(
+        len(regex_scan(ROW_LEXICONS[field], ROW_PATTERNS[field], text))
+        for field, text in [("title", title), ("product_info", product_info)]
+    )
+
+
+def scaled_lexicons(scale: int, seed: int) -> Dict[str, List[str]]:
+    """在现有词表基础上补充随机的2-4字词，使每类词表扩大到scale倍"""
+    rng = random.Random(seed)
+    lexicons = {}
+    for category, words in LEXICONS.items():
+        extra = [
+            "".join(chr(rng.randint(0x4e00, 0x9fa5)) for _ in range(rng.randint(2, 4)))
+            for _ in range(len(words) * (scale - 1))
+        ]
+        lexicons[category] = list(words) + extra
+    return lexicons
+
+
+def synthesize_texts(lexicons: Dict[str, Sequence[str]], count: int, length: int, seed: int) -> List[str]:
+    """由词表词和填充词随机拼接，生成约指定字数的文本"""
+    rng = random.Random(seed)
+    vocabulary = sorted({word for words in lexicons.values() for word in words})
+    texts = []
+    for _ in range(count):
+        parts = []
+        while sum(len(part) for part in parts) < length:
+            parts.append(rng.choice(vocabulary) if rng.random() < 0.3 else rng.choice(FILLERS))
+        texts.append("".join(parts))
+    return texts
+
+
+def measure(scan, items: List[Any], repeat: int) -> float:
+    """多轮执行取最快一轮，返回单条的平均耗时（微秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            scan(item)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items) * 1e6
+
+
+def _result(name: str, scales: str, count: int, substring_us: float, regex_us: float, mismatches) -> Dict[str, Any]:
+    return {
+        "case": name,
+        "lexicon": scales,
+        "texts": count,
+        "substring_us": round(substring_us, 2),
+        "regex_us": round(regex_us, 2),
+        "speedup": round(substring_us / regex_us, 2),
+        "mismatches": mismatches
+    }
+
+
+def run_benchmark(lengths: List[int], scales: List[int], count: int, repeat: int, seed: int) -> List[Dict[str, Any]]:
+    results = []
+
+    # 1. 目录批量评分：每行一个约25字的标题和一段商品信息
+    word_count = sum(len(words) for words in LEXICONS.values())
+    for length in lengths:
+        rows = list(zip(synthesize_texts(LEXICONS, count, 25, seed + 1),
+                        synthesize_texts(LEXICONS, count, length, seed)))
+        result = _result(f"目录行（标题25字 + 商品信息{length}字）", f"{word_count}词", count,
+                         measure(lambda row: row_substring_scans(*row), rows, repeat),
+                         measure(lambda row: row_regex_scans(*row), rows, repeat), "-")
+        results.append(result)
+        print(f"目录行（商品信息{length}字）: 逐词查找 {result['substring_us']}µs，"
+              f"正则预筛 {result['regex_us']}µs，加速 {result['speedup']}x")
+
+    # 2. 全部词表：逐词查找的耗时随词数增长
+    for scale in scales:
+        lexicons = LEXICONS if scale == 1 else scaled_lexicons(scale, seed)
+        patterns = compile_patterns(lexicons)
+        word_count = sum(len(words) for words in lexicons.values())
+        for length in lengths:
+            texts = synthesize_texts(lexicons, count, length, seed)
+            mismatches = sum(1 for text in texts
+                             if regex_scan(lexicons, patterns, text) != substring_scan(lexicons, text))
+            result = _result(f"{length}字文本（全部词表）", f"{word_count}词", count,
+                             measure(lambda text: substring_scan(lexicons, text), texts, repeat),
+                             measure(lambda text: regex_scan(lexicons, patterns, text), texts, repeat), mismatches)
+            results.append(result)
+            print(f"{word_count}词 / {length}字文本: 逐词查找 {result['substring_us']}µs，"
+                  f"正则预筛 {result['regex_us']}µs，加速 {result['speedup']}x，结果不一致 {mismatches} 条")
+
+    return results
+
+
+def write_report(results: List[Dict[str, Any]], output_dir: str) -> str:
+    """输出JSON结果与Markdown对比报告"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    with open(os.path.join(output_dir, "lexicon_benchmark.json"), "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    lines = [
+        "# 词表匹配微基准测试报告",
+        "",
+        f"- 词表: {len(LEXICONS)} 类",
+        "- 逐词查找: 每个词一次 `word in text`（当前实现）；正则预筛: 每类词表一个正则交替式，命中后再逐词查找",
+        "- 目录行: 商品信息预处理、标题质量评估和CTR预估对一行数据做的查找",
+        "- N字文本: 全部词表（按倍数补充随机词）",
+        "- 耗时为单条的平均值（多轮取最快），加速比 = 逐词查找 / 正则预筛",
+        "",
+        "| 场景 | 词表规模 | 条数 | 逐词查找(µs) | 正则预筛(µs) | 加速比 | 结果不一致 |",
+        "|---|---|---|---|---|---|---|"
+    ]
+    for result in results:
+        lines.append(
+            f"| {result['case']} | {result['lexicon']} | {result['texts']} | {result['substring_us']} | "
+            f"{result['regex_us']} | {result['speedup']} | {result['mismatches']} |"
+        )
+
+    report_path = os.path.join(output_dir, "lexicon_benchmark.md")
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    return report_path
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="词表匹配微基准测试")
+    parser.add_argument("--lengths", nargs="+", type=int, default=[25, 100, 400],
+                        help="合成文本的字数，如标题约25字、商品描述100-400字")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 8],
+                        help="词表规模倍数，1为现有词表")
+    parser.add_argument("--count", type=int, default=2000, help="每种场景的文本数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复轮数")
+    parser.add_argument("--output-dir", default="benchmark_results")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print("开始词表匹配微基准测试")
+    print("=" * 50)
+
+    results = run_benchmark(args.lengths, args.scales, args.count, args.repeat, args.seed)
+    report_path = write_report(results, args.output_dir)
+
+    print("\n" + "=" * 50)
+    print(f"基准测试完成，报告已保存至: {report_path}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
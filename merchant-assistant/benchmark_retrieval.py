@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+知识库检索质量与延迟基准测试脚本
+基于knowledge/*.md的标题和章节构造带标注的查询集，按目标规模合成干扰文本块，
+对每种embedding与向量存储格式组合测量recall@k、MRR、QPS和延迟分位数，并输出对比报告
+"""
+
+import os
+import sys
+import re
+import glob
+import json
+import time
+import random
+import argparse
+from typing import List, Dict, Any, Tuple
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from metrics import LatencyTracker
+from knowledge.vector_store import (
+    MerchantKnowledgeBase,
+    VECTOR_STORAGE_TYPES,
+    create_vector_index,
+    estimate_index_memory
+)
+
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*$')
+
+
+def load_labelled_sections(knowledge_dir: str) -> List[Dict[str, Any]]:
+    """
+    按Markdown标题切分知识文档，每个章节作为一个标注单元
+
+    Returns:
+        章节列表，包含标注ID、标题路径和正文
+    """
+    sections = []
+
+    for file in sorted(glob.glob(os.path.join(knowledge_dir, "*.md"))):
+        source = os.path.basename(file)
+        heading_path = []
+        body_lines = []
+
+        def flush():
+            body = "\n".join(body_lines).strip()
+            if heading_path and body:
+                sections.append({
+                    "id": f"{source}#{' > '.join(heading_path)}",
+                    "source": source,
+                    "heading_path": list(heading_path),
+                    "text": body
+                })
+
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                match = HEADING_PATTERN.match(line.rstrip("\n"))
+                if match:
+                    flush()
+                    body_lines = []
+                    level = len(match.group(1))
+                    heading_path = heading_path[:level - 1] + [match.group(2)]
+                else:
+                    body_lines.append(line.rstrip("\n"))
+        flush()
+
+    return sections
+
+
+def build_labelled_corpus(sections: List[Dict[str, Any]], text_splitter) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    构造文本块与查询集
+
+    Returns:
+        (文本块列表[(内容, 章节ID)], 查询列表[(查询, 章节ID)])
+    """
+    chunks = []
+    queries = []
+
+    for section in sections:
+        for piece in text_splitter.split_text(section["text"]):
+            chunks.append((piece, section["id"]))
+
+        # 查询使用最近两级标题，贴近商家的提问粒度
+        queries.append((" ".join(section["heading_path"][-2:]), section["id"]))
+
+    return chunks, queries
+
+
+def synthesize_chunks(chunks: List[Tuple[str, str]], target_size: int, seed: int = 42) -> List[Tuple[str, str]]:
+    """
+    将语料合成扩充到目标规模
+
+    合成块由随机抽取的不同章节句子拼接而成，标注为无关(None)，作为检索干扰项
+    """
+    if target_size <= len(chunks):
+        return list(chunks)
+
+    rng = random.Random(seed)
+    sentences = [
+        sentence.strip()
+        for text, _ in chunks
+        for sentence in re.split(r'[。！？\n]', text)
+        if len(sentence.strip()) > 4
+    ]
+
+    synthetic = list(chunks)
+    while len(synthetic) < target_size:
+        synthetic.append(("。".join(rng.sample(sentences, min(4, len(sentences)))), None))
+
+    return synthetic
+
+
+def embed_texts(embeddings, texts: List[str], batch_size: int = 256) -> np.ndarray:
+    """分批向量化文本"""
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(texts[start:start + batch_size]))
+        if len(texts) > batch_size * 10 and (start // batch_size) % 50 == 0:
+            print(f"    向量化进度: {min(start + batch_size, len(texts))}/{len(texts)}")
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def ranking_metrics(ranked_ids: List[List[int]], query_labels: List[str], chunk_labels: List[str],
+                    k: int) -> Dict[str, float]:
+    """
+    按检索结果计算recall@k与MRR@k
+
+    Args:
+        ranked_ids: 每条查询按相关度排序的文本块ID（FAISS以-1填充不足k个的结果）
+        query_labels: 每条查询的标注章节ID
+        chunk_labels: 每个文本块的章节ID，合成干扰块为None
+        k: 只看前k个结果
+    """
+    hits = 0
+    reciprocal_ranks = []
+
+    for ids, label in zip(ranked_ids, query_labels):
+        rank = next((position for position, chunk_id in enumerate(ids[:k], 1)
+                     if chunk_id >= 0 and chunk_labels[chunk_id] == label), None)
+        if rank is not None:
+            hits += 1
+            reciprocal_ranks.append(1.0 / rank)
+        else:
+            reciprocal_ranks.append(0.0)
+
+    query_count = len(query_labels)
+    return {
+        f"recall@{k}": round(hits / query_count, 4) if query_count else 0.0,
+        f"mrr@{k}": round(sum(reciprocal_ranks) / query_count, 4) if query_count else 0.0
+    }
+
+
+def evaluate_index(index, query_vectors: np.ndarray, query_labels: List[str], chunk_labels: List[str],
+                   k: int, embed_seconds: List[float]) -> Dict[str, Any]:
+    """测量单个索引的检索质量与延迟"""
+    tracker = LatencyTracker(window_size=len(query_labels))
+    ranked_ids = []
+
+    for query_vector, query_embed_seconds in zip(query_vectors, embed_seconds):
+        start = time.perf_counter()
+        _, ids = index.search(query_vector.reshape(1, -1), k)
+        index_seconds = time.perf_counter() - start
+
+        tracker.record("embed", query_embed_seconds)
+        tracker.record("index", index_seconds)
+        tracker.record("total", query_embed_seconds + index_seconds)
+        ranked_ids.append(ids[0].tolist())
+
+    # 批量检索吞吐
+    start = time.perf_counter()
+    index.search(query_vectors, k)
+    batch_seconds = time.perf_counter() - start
+
+    total_latency = tracker.summary("total")
+    query_count = len(query_labels)
+
+    return {
+        **ranking_metrics(ranked_ids, query_labels, chunk_labels, k),
+        "qps": round(1000 / total_latency["mean_ms"], 1) if total_latency["mean_ms"] else 0.0,
+        "batch_qps": round(query_count / batch_seconds, 1) if batch_seconds else 0.0,
+        "latency_ms": {
+            "embed": tracker.summary("embed"),
+            "index": tracker.summary("index"),
+            "total": total_latency
+        }
+    }
+
+
+def run_benchmark(embedding_types: List[str], storages: List[str], scales: List[int], k: int,
+                  knowledge_dir: str, seed: int = 42) -> List[Dict[str, Any]]:
+    """对所有配置组合运行基准测试"""
+    results = []
+
+    for embedding_type in embedding_types:
+        print(f"\n[{embedding_type}] 初始化embedding模型...")
+        # 指向不存在的路径，避免加载现有向量库
+        kb = MerchantKnowledgeBase(
+            knowledge_dir=knowledge_dir,
+            vector_store_path=os.path.join(knowledge_dir, "_benchmark_unused"),
+            embedding_type=embedding_type
+        )
+
+        sections = load_labelled_sections(knowledge_dir)
+        base_chunks, queries = build_labelled_corpus(sections, kb.text_splitter)
+        print(f"  标注章节 {len(sections)} 个，原始文本块 {len(base_chunks)} 个，查询 {len(queries)} 条")
+
+        query_vectors = []
+        embed_seconds = []
+        for query, _ in queries:
+            start = time.perf_counter()
+            query_vectors.append(kb.embeddings.embed_query(query))
+            embed_seconds.append(time.perf_counter() - start)
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        query_labels = [label for _, label in queries]
+
+        for scale in scales:
+            chunks = synthesize_chunks(base_chunks, scale, seed)
+            print(f"  规模 {len(chunks)}: 向量化文本块...")
+            chunk_vectors = embed_texts(kb.embeddings, [text for text, _ in chunks])
+            chunk_labels = [label for _, label in chunks]
+
+            for storage in storages:
+                start = time.perf_counter()
+                index = create_vector_index(chunk_vectors.shape[1], storage)
+                index.train(chunk_vectors)
+                index.add(chunk_vectors)
+                build_seconds = time.perf_counter() - start
+
+                metrics = evaluate_index(index, query_vectors, query_labels, chunk_labels, k, embed_seconds)
+                result = {
+                    "embedding": embedding_type,
+                    "storage": storage,
+                    "index_type": type(index).__name__,
+                    "chunks": len(chunks),
+                    "dimension": int(chunk_vectors.shape[1]),
+                    "index_memory_bytes": estimate_index_memory(index),
+                    "index_build_seconds": round(build_seconds, 4),
+                    **metrics
+                }
+                results.append(result)
+                print(f"    {storage:8s} recall@{k}={result[f'recall@{k}']:.3f} "
+                      f"mrr@{k}={result[f'mrr@{k}']:.3f} qps={result['qps']} "
+                      f"p95={result['latency_ms']['total']['p95_ms']}ms")
+
+    return results
+
+
+def write_report(results: List[Dict[str, Any]], output_dir: str, k: int) -> str:
+    """输出JSON结果与Markdown对比报告"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    with open(os.path.join(output_dir, "retrieval_benchmark.json"), "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    lines = [
+        "# 知识库检索基准测试报告",
+        "",
+        f"- recall@{k}: 查询的标注章节出现在前{k}个结果中的比例",
+        f"- mrr@{k}: 首个相关结果排名倒数的均值",
+        "- qps: 单条查询（向量化+检索）端到端吞吐；batch_qps: 批量检索吞吐",
+        "- mock embedding 为随机向量，其质量指标仅用于验证流程",
+        "",
+        f"| Embedding | 存储格式 | 文本块数 | 索引内存(MB) | recall@{k} | mrr@{k} | QPS | 批量QPS | p50(ms) | p95(ms) | p99(ms) |",
+        "|---|---|---|---|---|---|---|---|---|---|---|"
+    ]
+    for result in results:
+        total = result["latency_ms"]["total"]
+        lines.append(
+            f"| {result['embedding']} | {result['storage']} | {result['chunks']} | "
+            f"{result['index_memory_bytes'] / 1024 / 1024:.2f} | {result[f'recall@{k}']:.3f} | "
+            f"{result[f'mrr@{k}']:.3f} | {result['qps']} | {result['batch_qps']} | "
+            f"{total['p50_ms']} | {total['p95_ms']} | {total['p99_ms']} |"
+        )
+
+    report_path = os.path.join(output_dir, "retrieval_benchmark.md")
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    return report_path
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="知识库检索质量与延迟基准测试")
+    parser.add_argument("--embeddings", nargs="+", default=[Config.DEFAULT_EMBEDDING],
+                        choices=list(Config.EMBEDDING_CONFIGS.keys()), help="参与测试的embedding配置")
+    parser.add_argument("--storages", nargs="+", default=VECTOR_STORAGE_TYPES,
+                        choices=VECTOR_STORAGE_TYPES, help="参与测试的向量存储格式")
+    parser.add_argument("--scales", nargs="+", type=int, default=[10000],
+                        help="合成语料规模（文本块数），如 10000 100000 1000000")
+    parser.add_argument("--k", type=int, default=Config.KNOWLEDGE_BASE_CONFIG["top_k"], help="评估的top-k")
+    parser.add_argument("--knowledge-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge"))
+    parser.add_argument("--output-dir", default="benchmark_results", help="报告输出目录，相对路径按项目目录解析")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print("开始知识库检索基准测试")
+    print("=" * 50)
+
+    results = run_benchmark(args.embeddings, args.storages, args.scales, args.k, args.knowledge_dir, args.seed)
+    report_path = write_report(results, Config.resolve_path(args.output_dir), args.k)
+
+    print("\n" + "=" * 50)
+    print(f"基准测试完成，报告已保存至: {report_path}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
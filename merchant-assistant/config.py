@@ -14,6 +14,9 @@ class Config:
     PROJECT_NAME = "商家智能助手"
     VERSION = "1.0.0"
     
+    # 项目目录：缓存、追踪、会话等数据文件的相对路径相对于此目录，与启动时的工作目录无关
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    
     # LLM配置
     LLM_CONFIGS = {
         "mock": {
@@ -25,6 +28,10 @@ class Config:
             "model_name": "qwen2.5:7b",
             "base_url": "http://localhost:11434",
             "temperature": 0.7,
+            "keep_alive": "30m",  # 模型常驻显存/内存的时长，避免重复加载
+            "num_ctx": 4096,  # 上下文长度，各次调用保持一致，变化会导致模型重新加载
+            "generation_budgets": {},  # 按生成任务覆盖 GENERATION_BUDGETS，如 {"strategy": {"num_predict": 800}}
+            "quality": 0.8,  # 相对质量分，模型路由auto策略据此过滤不满足任务质量要求的模型
             "description": "Ollama本地部署的Qwen2.5模型"
         },
         "ollama_qwen_large": {
@@ -32,10 +39,122 @@ class Config:
             "model_name": "qwen2.5:14b",
             "base_url": "http://localhost:11434",
             "temperature": 0.7,
+            "keep_alive": "30m",  # 模型常驻显存/内存的时长，避免重复加载
+            "num_ctx": 4096,  # 上下文长度，各次调用保持一致，变化会导致模型重新加载
+            "generation_budgets": {},  # 按生成任务覆盖 GENERATION_BUDGETS，如 {"strategy": {"num_predict": 800}}
+            "quality": 0.9,  # 相对质量分，模型路由auto策略据此过滤不满足任务质量要求的模型
             "description": "Ollama本地部署的Qwen2.5大模型"
         }
     }
     
+    # 各类生成任务的默认预算，每次LLM调用都会带上（可在LLM_CONFIGS中按模型用generation_budgets覆盖）
+    # num_predict：最大生成token数；stop：停止序列；length_target：prompt中要求的字数
+    GENERATION_BUDGETS = {
+        "agent": {"num_predict": 1024},  # Agent推理步骤及其他未指定任务的调用
+        "title": {"num_predict": 48, "stop": ["\n\n"]},  # 单标题生成
+        "title_candidates": {"num_predict": 200},  # 多候选标题（JSON数组）一次生成
+        "title_optimize": {"num_predict": 48, "stop": ["\n\n"]},  # 标题二次优化
+        "strategy": {"num_predict": 900, "length_target": 750},  # 营销策略
+        "competitor": {"num_predict": 800, "length_target": 650},  # 竞品分析
+        "summary": {"num_predict": 300}  # 对话滚动摘要
+    }
+    
+    # 模型路由配置：按生成任务选择模型，短文本生成走小模型，为长文本任务腾出大模型（默认关闭，全部使用会话LLM）
+    MODEL_ROUTING_CONFIG = {
+        "enabled": False,
+        # 任务 -> LLM类型（LLM_CONFIGS中的键）或"auto"；未列出的任务使用会话LLM，"agent"为ReAct推理
+        "routes": {
+            "title": "ollama_qwen",
+            "title_optimize": "ollama_qwen",
+            "strategy": "ollama_qwen_large",
+            "competitor": "auto",
+            "agent": "ollama_qwen_large"
+        },
+        # auto策略：在质量分达到任务要求的候选模型中，选择按观测速度和生成预算估算耗时最短的一个
+        "auto": {
+            "candidates": ["ollama_qwen", "ollama_qwen_large"],
+            "min_quality": {"title": 0.7, "title_optimize": 0.7, "strategy": 0.85, "competitor": 0.8, "agent": 0.85}
+        }
+    }
+    
+    # Ollama客户端配置（所有ollama类型的LLM共享，按服务地址建立连接池）
+    OLLAMA_CLIENT_CONFIG = {
+        "pool_size": 10,  # 每个服务地址的keep-alive连接数
+        "max_in_flight": 4,  # 每个服务地址同时进行中的最大请求数
+        "max_in_flight_per_host": {},  # 按服务地址覆盖，如 {"http://localhost:11434": 2}
+        "connect_timeout": 5,  # 建立连接超时（秒）
+        "request_timeout": 120,  # 单次请求总超时（秒），含排队等待与流式读取
+        "warm_prompt_prefix": True,  # Agent初始化后在后台预热静态prompt前缀的KV缓存
+        "measure_generation": False  # 测量模式：逐次记录并打印prompt评估耗时与生成耗时
+    }
+    
+    # Ollama健康监测与熔断配置
+    OLLAMA_HEALTH_CONFIG = {
+        "check_interval": 15,  # 后台探测间隔（秒）
+        "probe_timeout": 2,  # 单次探测超时（秒）
+        "failure_threshold": 3,  # 连续失败多少次后熔断
+        "recovery_timeout": 30  # 熔断后多久试探恢复（秒）
+    }
+    
+    # LLM响应缓存配置（相同模型、温度和prompt直接复用结果，默认关闭）
+    LLM_CACHE_CONFIG = {
+        "enabled": False,
+        "path": "cache/llm_cache.sqlite",  # SQLite缓存文件（相对路径相对于项目目录）
+        "memory_entries": 256,  # 内存LRU容量
+        "max_entries": 10000,  # 磁盘缓存条目上限，超出约10%后批量淘汰最久未访问的条目
+        "ttl_seconds": 7 * 24 * 3600  # 缓存有效期（秒），0表示永不过期
+    }
+    
+    # 纯函数结果缓存配置（商品信息预处理、受众画像、标题质量评估、CTR预估）
+    MEMO_CONFIG = {
+        "enabled": True,
+        "max_entries": 512  # 每个函数保留的结果数上限
+    }
+    
+    # Agent执行配置
+    AGENT_CONFIG = {
+        "solution_concurrency": 5,  # 一站式方案中并发执行的生成步骤数上限
+        "max_execution_time": 300,  # ReAct执行器的最长执行时间（秒）
+        "request_time_budget": 0,  # 对话请求的时间预算（秒），LLM调用以剩余时间为超时，0表示不限时；交互场景可设为30等较小值
+        "solution_time_budget": 0,  # 一站式方案的默认时间预算（秒），0表示不限时；批量处理使用 BATCH_CONFIG.time_budget
+        "intent_fast_path": True  # 意图明确的单工具请求跳过ReAct循环直接调用工具
+    }
+    
+    # 标题生成配置
+    TITLE_GENERATION_CONFIG = {
+        "candidates": 4  # 单次调用生成的候选标题数，本地评分后取最优；设为1时恢复单标题+二次优化模式
+    }
+    
+    # 请求链路追踪配置
+    TRACING_CONFIG = {
+        "enabled": False,  # 默认关闭，排查性能问题时开启
+        "sample_rate": 1.0,  # 开启后按请求采样的比例（0~1），同一请求的span要么全部记录要么全部跳过
+        "export_path": "traces/traces.jsonl",  # 按span逐行导出的JSON Lines文件（相对路径相对于项目目录），为空时不导出
+        "max_export_bytes": 50 * 1024 * 1024,  # 导出文件超过该大小时轮转为 .1、.2 …，0表示不轮转
+        "export_backups": 3,  # 保留的轮转文件数
+        "max_traces": 50  # 内存中保留的最近trace数（分析页瀑布图）
+    }
+    
+    # 对话记忆配置
+    MEMORY_CONFIG = {
+        "max_token_limit": 2000,  # 摘要与最近对话合计的token上限
+        "summary_token_limit": 500,  # 滚动摘要的token上限
+        "preference_window": 10  # 用户偏好统计的最近消息数
+    }
+    
+    # 会话存储配置（按商家会话ID持久化对话记忆与用户偏好）
+    SESSION_STORE_CONFIG = {
+        "enabled": True,
+        "path": "sessions/sessions.sqlite"  # SQLite文件（相对路径相对于项目目录），仅在有会话ID时创建；WAL模式下可供同机多个worker共享
+    }
+    
+    # 商品目录批量处理配置
+    BATCH_CONFIG = {
+        "workers": 8,  # 并行处理的商品数（LLM并发仍受连接池max_in_flight限制）
+        "progress_interval": 10,  # 进度输出间隔（秒）
+        "time_budget": 0  # 每个商品的时间预算（秒），0表示不限时
+    }
+    
     # Embedding配置
     EMBEDDING_CONFIGS = {
         "mock": {
@@ -66,7 +185,11 @@ class Config:
         "documents_path": "knowledge/documents",
         "chunk_size": 500,
         "chunk_overlap": 50,
-        "top_k": 5
+        "top_k": 5,
+        "vector_storage": "float32",  # 向量存储格式: float32, fp16, sq8（8-bit标量量化）
+        "query_embedding_cache_size": 256,  # 查询向量LRU缓存条数，0表示关闭
+        "semantic_cache_size": 128,  # 语义查询缓存条数，0表示关闭
+        "semantic_cache_threshold": 0.95  # 余弦相似度达到该值视为同一问题
     }
     
     # Web界面配置
@@ -77,12 +200,28 @@ class Config:
         "initial_sidebar_state": "expanded"
     }
     
+    @classmethod
+    def resolve_path(cls, path: str) -> str:
+        """将配置中的相对路径解析为项目目录下的绝对路径；空值和绝对路径原样返回"""
+        if not path or os.path.isabs(path):
+            return path
+        return os.path.join(cls.BASE_DIR, path)
+    
     @classmethod
     def get_llm_config(cls, llm_type: str = None) -> Dict[str, Any]:
         """获取LLM配置"""
         llm_type = llm_type or cls.DEFAULT_LLM
         return cls.LLM_CONFIGS.get(llm_type, cls.LLM_CONFIGS["mock"])
     
+    @classmethod
+    def get_generation_budgets(cls, llm_config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """获取某个LLM配置的生成预算：默认预算按任务合并模型级覆盖"""
+        overrides = llm_config.get("generation_budgets", {})
+        return {
+            task: {**cls.GENERATION_BUDGETS.get(task, {}), **overrides.get(task, {})}
+            for task in {**cls.GENERATION_BUDGETS, **overrides}
+        }
+    
     @classmethod
     def get_embedding_config(cls, embedding_type: str = None) -> Dict[str, Any]:
         """获取Embedding配置"""
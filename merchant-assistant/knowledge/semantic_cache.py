@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+语义查询缓存模块
+按查询向量的余弦相似度复用近似问题的检索结果
+"""
+
+import os
+import sys
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+import numpy as np
+
+# 添加项目根目录到path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import CacheStats
+
+
+class SemanticQueryCache:
+    """语义查询缓存，相似度超过阈值的查询直接复用缓存结果"""
+
+    def __init__(self, max_size: int = 128, threshold: float = 0.95):
+        """
+        初始化语义缓存
+
+        Args:
+            max_size: 最大缓存条数，超出后淘汰最久未使用的条目
+            threshold: 余弦相似度阈值，达到该值视为同一问题
+        """
+        self.max_size = max_size
+        self.threshold = threshold
+        self.stats = CacheStats()
+        self._entries = OrderedDict()  # entry_id -> (单位向量, 附加键, 缓存值)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def lookup(self, vector: List[float], key: Hashable = None) -> Optional[Any]:
+        """
+        查找与查询向量足够相似的缓存结果
+
+        Args:
+            vector: 查询向量
+            key: 附加匹配键（如上下文长度），必须完全相同才会命中
+
+        Returns:
+            命中时返回缓存值，否则返回None
+        """
+        query = _normalize(vector)
+
+        with self._lock:
+            candidates = [(entry_id, entry) for entry_id, entry in self._entries.items() if entry[1] == key]
+            if query is not None and candidates:
+                matrix = np.stack([entry[0] for _, entry in candidates])
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id, entry = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.stats.hit()
+                    return entry[2]
+
+        self.stats.miss()
+        return None
+
+    def store(self, vector: List[float], value: Any, key: Hashable = None):
+        """写入缓存"""
+        query = _normalize(vector)
+        if query is None or self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[next(self._ids)] = (query, key, value)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空缓存（索引内容变化时调用）"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _normalize(vector: List[float]) -> Optional[np.ndarray]:
+    """归一化为单位向量，零向量返回None"""
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    if norm == 0:
+        return None
+    return array / norm
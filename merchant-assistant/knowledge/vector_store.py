@@ -6,8 +6,13 @@
 
 import os
 import glob
+import json
 import sys
+import time
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
+import numpy as np
 from langchain.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.vectorstores import FAISS
@@ -18,12 +23,23 @@ from langchain.schema import Document
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
 from knowledge.embedding_models import create_embedding_model
+from knowledge.semantic_cache import SemanticQueryCache
+from metrics import LatencyTracker, CacheStats
+from tracing import traced, annotate_span
+
+
+# 支持的向量存储格式
+VECTOR_STORAGE_TYPES = ["float32", "fp16", "sq8"]
+
+# 与FAISS索引保存在同一目录的构建统计（各阶段耗时、量化报告），加载已有向量库时恢复
+BUILD_STATS_FILE = "build_stats.json"
 
 
 class MerchantKnowledgeBase:
     """商家知识库类"""
     
-    def __init__(self, knowledge_dir: str = None, vector_store_path: str = None, embedding_type: str = None):
+    def __init__(self, knowledge_dir: str = None, vector_store_path: str = None, embedding_type: str = None,
+                 vector_storage: str = None):
         """
         初始化知识库
         
@@ -31,6 +47,7 @@ class MerchantKnowledgeBase:
             knowledge_dir: 知识文档目录
             vector_store_path: 向量库存储路径
             embedding_type: embedding模型类型
+            vector_storage: 向量存储格式 (float32, fp16, sq8)
         """
         self.knowledge_dir = knowledge_dir or os.path.join(os.path.dirname(__file__))
         self.vector_store_path = vector_store_path or os.path.join(self.knowledge_dir, "vector_store")
@@ -38,6 +55,13 @@ class MerchantKnowledgeBase:
         
         # 初始化文本分割器
         kb_config = Config.KNOWLEDGE_BASE_CONFIG
+        
+        # 向量存储格式，标量量化可将索引内存降至1/2(fp16)或1/4(sq8)
+        self.vector_storage = vector_storage or kb_config.get("vector_storage", "float32")
+        if self.vector_storage not in VECTOR_STORAGE_TYPES:
+            print(f"未知向量存储格式: {self.vector_storage}，使用float32")
+            self.vector_storage = "float32"
+        self.last_quantization_report: Dict[str, Any] = {}
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=kb_config["chunk_size"],
             chunk_overlap=kb_config["chunk_overlap"],
@@ -51,6 +75,20 @@ class MerchantKnowledgeBase:
         # 向量库
         self.vector_store = None
         
+        # 检索指标：构建各阶段耗时、检索延迟、缓存命中
+        self.last_build_timings: Dict[str, float] = {}
+        self.latency = LatencyTracker()
+        self._query_embedding_cache = OrderedDict()
+        self._query_embedding_cache_size = kb_config.get("query_embedding_cache_size", 256)
+        self._query_embedding_lock = threading.Lock()  # 实例经st.cache_resource和线程池跨会话共享
+        self.query_embedding_cache_stats = CacheStats()
+        
+        # 语义查询缓存：近似问题复用get_relevant_context结果
+        self.semantic_cache = SemanticQueryCache(
+            max_size=kb_config.get("semantic_cache_size", 128),
+            threshold=kb_config.get("semantic_cache_threshold", 0.95)
+        )
+        
         # 尝试加载已存在的向量库
         self._load_existing_vector_store()
     
@@ -73,7 +111,14 @@ class MerchantKnowledgeBase:
                     self.embeddings,
                     allow_dangerous_deserialization=True
                 )
+                self.semantic_cache.clear()
+                self._load_build_stats()
                 print(f"成功加载已存在的向量库: {self.vector_store_path}")
+                
+                persisted_storage = _detect_vector_storage(self.vector_store.index)
+                if persisted_storage != self.vector_storage:
+                    print(f"Warning: 已存在向量库的存储格式为{persisted_storage}，"
+                          f"与配置的{self.vector_storage}不一致，重建后生效")
             except Exception as e:
                 print(f"Warning: 加载向量库失败: {e}")
     
@@ -159,9 +204,12 @@ class MerchantKnowledgeBase:
             return
         
         print("开始构建向量库...")
+        timings = {}
         
         # 加载文档
+        stage_start = time.perf_counter()
         documents = self.load_documents()
+        timings["load"] = time.perf_counter() - stage_start
         
         if not documents:
             print("❌ 没有找到可加载的文档")
@@ -169,23 +217,95 @@ class MerchantKnowledgeBase:
         
         # 分割文档
         print(f"正在分割 {len(documents)} 个文档...")
+        stage_start = time.perf_counter()
         texts = self.text_splitter.split_documents(documents)
+        timings["split"] = time.perf_counter() - stage_start
         print(f"文档分割完成，共 {len(texts)} 个文本块")
         
-        # 构建向量库
+        # 构建向量库（向量化与建索引分开计时）
         print("正在构建向量库...")
         try:
-            self.vector_store = FAISS.from_documents(texts, self.embeddings)
+            contents = [text.page_content for text in texts]
+            
+            stage_start = time.perf_counter()
+            vectors = self.embeddings.embed_documents(contents)
+            timings["embed"] = time.perf_counter() - stage_start
+            
+            stage_start = time.perf_counter()
+            self.vector_store = FAISS.from_embeddings(
+                list(zip(contents, vectors)),
+                self.embeddings,
+                metadatas=[text.metadata for text in texts]
+            )
+            if self.vector_storage != "float32":
+                self._quantize_vector_store(np.asarray(vectors, dtype=np.float32))
+            timings["index"] = time.perf_counter() - stage_start
             
             # 保存向量库
+            stage_start = time.perf_counter()
             os.makedirs(os.path.dirname(self.vector_store_path), exist_ok=True)
             self.vector_store.save_local(self.vector_store_path)
+            timings["save"] = time.perf_counter() - stage_start
             
+            self.last_build_timings = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+            if self.vector_storage == "float32":
+                self.last_quantization_report = {}
+            self._save_build_stats()
+            self.semantic_cache.clear()
             print(f"向量库构建成功，保存至: {self.vector_store_path}")
+            print(f"各阶段耗时(秒): {self.last_build_timings}")
             
         except Exception as e:
             print(f"向量库构建失败: {e}")
     
+    def _save_build_stats(self):
+        """将构建耗时与量化报告保存到向量库目录，加载该向量库的实例和界面可直接展示"""
+        stats_path = os.path.join(self.vector_store_path, BUILD_STATS_FILE)
+        try:
+            with open(stats_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "build_timings": self.last_build_timings,
+                    "quantization_report": self.last_quantization_report
+                }, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"Warning: 保存构建统计失败: {e}")
+    
+    def _load_build_stats(self):
+        """恢复向量库目录中保存的构建耗时与量化报告（旧版本构建的向量库没有该文件）"""
+        stats_path = os.path.join(self.vector_store_path, BUILD_STATS_FILE)
+        if not os.path.exists(stats_path):
+            return
+        try:
+            with open(stats_path, "r", encoding="utf-8") as f:
+                build_stats = json.load(f)
+            self.last_build_timings = dict(build_stats.get("build_timings") or {})
+            self.last_quantization_report = dict(build_stats.get("quantization_report") or {})
+        except (OSError, ValueError) as e:
+            print(f"Warning: 读取构建统计失败: {e}")
+    
+    def _quantize_vector_store(self, vectors: np.ndarray):
+        """将float32索引替换为标量量化索引，并评估相对float32的召回率"""
+        flat_index = self.vector_store.index
+        quantized_index = create_vector_index(flat_index.d, self.vector_storage, flat_index.metric_type)
+        quantized_index.train(vectors)
+        quantized_index.add(vectors)
+        
+        # 索引顺序与docstore映射一致，可直接替换
+        self.vector_store.index = quantized_index
+        
+        k = Config.KNOWLEDGE_BASE_CONFIG["top_k"]
+        recall = measure_recall(flat_index, quantized_index, vectors, k)
+        self.last_quantization_report = {
+            "storage": self.vector_storage,
+            "k": k,
+            "recall_vs_float32": round(recall, 4),
+            "recall_delta": round(recall - 1.0, 4),
+            "float32_memory_bytes": estimate_index_memory(flat_index),
+            "memory_bytes": estimate_index_memory(quantized_index)
+        }
+        print(f"向量量化({self.vector_storage})完成: recall@{k}相对float32为 {recall:.2%}")
+    
+    @traced("kb.search", kind="retrieval", attributes=lambda self, query, k=5: {"query_chars": len(query), "k": k})
     def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """
         语义搜索
@@ -201,24 +321,64 @@ class MerchantKnowledgeBase:
             return []
         
         try:
-            # 执行相似度搜索
-            results = self.vector_store.similarity_search_with_score(query, k=k)
-            
-            # 格式化结果
-            formatted_results = []
-            for doc, score in results:
-                formatted_results.append({
-                    "content": doc.page_content,
-                    "metadata": doc.metadata,
-                    "similarity_score": float(score)
-                })
+            embed_start = time.perf_counter()
+            query_vector = self._embed_query(query)
+            embed_seconds = time.perf_counter() - embed_start
             
-            return formatted_results
+            return self._search_by_vector(query_vector, k, embed_seconds)
             
         except Exception as e:
             print(f"搜索失败: {e}")
             return []
     
+    def _search_by_vector(self, query_vector: List[float], k: int, embed_seconds: float) -> List[Dict[str, Any]]:
+        """按查询向量检索并记录延迟（查询向量化与索引检索分开计时）"""
+        index_start = time.perf_counter()
+        results = self.vector_store.similarity_search_with_score_by_vector(query_vector, k=k)
+        index_seconds = time.perf_counter() - index_start
+        
+        self.latency.record("search.embed", embed_seconds)
+        self.latency.record("search.index", index_seconds)
+        self.latency.record("search.total", embed_seconds + index_seconds)
+        annotate_span(embed_ms=round(embed_seconds * 1000, 3), index_ms=round(index_seconds * 1000, 3),
+                      results=len(results))
+        
+        # 格式化结果
+        formatted_results = []
+        for doc, score in results:
+            formatted_results.append({
+                "content": doc.page_content,
+                "metadata": doc.metadata,
+                "similarity_score": float(score)
+            })
+        
+        return formatted_results
+    
+    def _embed_query(self, query: str) -> List[float]:
+        """查询向量化，相同查询复用LRU缓存中的向量"""
+        with self._query_embedding_lock:
+            cached = self._query_embedding_cache.get(query)
+            if cached is not None:
+                self._query_embedding_cache.move_to_end(query)
+        if cached is not None:
+            self.query_embedding_cache_stats.hit()
+            return cached
+        
+        # 向量化在锁外执行，避免慢查询阻塞其他线程的缓存读取
+        self.query_embedding_cache_stats.miss()
+        vector = self.embeddings.embed_query(query)
+        
+        if self._query_embedding_cache_size > 0:
+            with self._query_embedding_lock:
+                self._query_embedding_cache[query] = vector
+                self._query_embedding_cache.move_to_end(query)
+                while len(self._query_embedding_cache) > self._query_embedding_cache_size:
+                    self._query_embedding_cache.popitem(last=False)
+        
+        return vector
+    
+    @traced("kb.get_relevant_context", kind="retrieval", record_output=True,
+            attributes=lambda self, query, max_length=1000: {"query_chars": len(query), "max_length": max_length})
     def get_relevant_context(self, query: str, max_length: int = 1000) -> str:
         """
         获取相关上下文信息
@@ -230,7 +390,24 @@ class MerchantKnowledgeBase:
         Returns:
             相关上下文字符串
         """
-        results = self.search(query, k=3)
+        if not self.vector_store:
+            return "未找到相关信息。"
+        
+        try:
+            embed_start = time.perf_counter()
+            query_vector = self._embed_query(query)
+            embed_seconds = time.perf_counter() - embed_start
+            
+            # 近似问题直接复用已组装的上下文
+            cached_context = self.semantic_cache.lookup(query_vector, key=max_length)
+            annotate_span(semantic_cache_hit=cached_context is not None)
+            if cached_context is not None:
+                return cached_context
+            
+            results = self._search_by_vector(query_vector, 3, embed_seconds)
+        except Exception as e:
+            print(f"搜索失败: {e}")
+            return "未找到相关信息。"
         
         if not results:
             return "未找到相关信息。"
@@ -250,7 +427,10 @@ class MerchantKnowledgeBase:
             else:
                 break
         
-        return "\n".join(context_parts)
+        context = "\n".join(context_parts)
+        self.semantic_cache.store(query_vector, context, key=max_length)
+        
+        return context
     
     def add_document(self, content: str, metadata: Dict[str, Any] = None):
         """
@@ -276,6 +456,7 @@ class MerchantKnowledgeBase:
         # 添加到向量库
         try:
             self.vector_store.add_documents(texts)
+            self.semantic_cache.clear()
             # 保存更新后的向量库
             self.vector_store.save_local(self.vector_store_path)
             print("文档添加成功")
@@ -297,8 +478,35 @@ class MerchantKnowledgeBase:
                 stats["document_count"] = self.vector_store.index.ntotal
             except:
                 stats["document_count"] = "未知"
+            
+            index = self.vector_store.index
+            stats["index_type"] = type(index).__name__
+            stats["vector_storage"] = _detect_vector_storage(index)
+            stats["embedding_dimension"] = getattr(index, "d", None)
+            stats["index_memory_bytes"] = estimate_index_memory(index)
         else:
             stats["document_count"] = 0
+            stats["index_type"] = None
+            stats["vector_storage"] = self.vector_storage
+            stats["embedding_dimension"] = None
+            stats["index_memory_bytes"] = 0
+        
+        # 构建耗时与检索延迟
+        stats["last_build_timings"] = dict(self.last_build_timings)
+        stats["quantization_report"] = dict(self.last_quantization_report)
+        stats["search_latency"] = {
+            "embed": self.latency.summary("search.embed"),
+            "index": self.latency.summary("search.index"),
+            "total": self.latency.summary("search.total")
+        }
+        stats["cache"] = {
+            "query_embedding": self.query_embedding_cache_stats.to_dict(),
+            "semantic_context": {
+                **self.semantic_cache.stats.to_dict(),
+                "size": len(self.semantic_cache),
+                "threshold": self.semantic_cache.threshold
+            }
+        }
         
         # 统计知识文档文件
         file_count = 0
@@ -311,6 +519,79 @@ class MerchantKnowledgeBase:
         return stats
 
 
+def estimate_index_memory(index) -> int:
+    """估算FAISS索引占用内存（字节）"""
+    try:
+        import faiss
+        return int(faiss.serialize_index(index).nbytes)
+    except Exception:
+        try:
+            return int(index.ntotal * index.d * 4)
+        except Exception:
+            return 0
+
+
+def create_vector_index(dimension: int, storage: str = "float32", metric_type: int = None):
+    """
+    按存储格式创建FAISS索引
+    
+    Args:
+        dimension: 向量维度
+        storage: 存储格式 (float32, fp16, sq8)
+        metric_type: 距离度量，默认L2
+        
+    Returns:
+        未添加向量的FAISS索引（sq8/fp16需先train）
+    """
+    import faiss
+    
+    if metric_type is None:
+        metric_type = faiss.METRIC_L2
+    
+    if storage == "float32":
+        return faiss.IndexFlat(dimension, metric_type)
+    
+    quantizer_types = {
+        "fp16": faiss.ScalarQuantizer.QT_fp16,
+        "sq8": faiss.ScalarQuantizer.QT_8bit
+    }
+    return faiss.IndexScalarQuantizer(dimension, quantizer_types[storage], metric_type)
+
+
+def _detect_vector_storage(index) -> str:
+    """根据索引类型判断向量存储格式"""
+    try:
+        import faiss
+        if isinstance(index, faiss.IndexScalarQuantizer):
+            if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16:
+                return "fp16"
+            if index.sq.qtype == faiss.ScalarQuantizer.QT_8bit:
+                return "sq8"
+            return "sq"
+    except Exception:
+        pass
+    return "float32"
+
+
+def measure_recall(reference_index, candidate_index, vectors: np.ndarray, k: int, sample_size: int = 200) -> float:
+    """以float32索引结果为基准，计算候选索引的平均recall@k"""
+    if len(vectors) == 0:
+        return 1.0
+    
+    k = min(k, len(vectors))
+    step = max(1, len(vectors) // sample_size)
+    queries = vectors[::step][:sample_size]
+    
+    _, reference_ids = reference_index.search(queries, k)
+    _, candidate_ids = candidate_index.search(queries, k)
+    
+    overlaps = [
+        len(set(reference_row) & set(candidate_row)) / k
+        for reference_row, candidate_row in zip(reference_ids.tolist(), candidate_ids.tolist())
+    ]
+    return sum(overlaps) / len(overlaps)
+
+
 class LangChainEmbeddingWrapper:
     """将我们的embedding模型包装为LangChain兼容接口"""
     
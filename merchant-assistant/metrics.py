@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+运行指标统计模块
+提供滚动窗口延迟分位数和缓存命中率统计
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Any, List
+
+
+class LatencyTracker:
+    """滚动窗口延迟统计，按指标名称分别记录"""
+
+    def __init__(self, window_size: int = 1000):
+        """
+        初始化延迟统计
+
+        Args:
+            window_size: 每个指标保留的最近样本数
+        """
+        self.window_size = window_size
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        """记录一次耗时（秒）"""
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.window_size)
+            self._samples[name].append(seconds)
+
+    def summary(self, name: str) -> Dict[str, Any]:
+        """获取单个指标的统计摘要（毫秒）"""
+        with self._lock:
+            samples = sorted(self._samples.get(name, []))
+
+        if not samples:
+            return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+
+        return {
+            "count": len(samples),
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+            "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+            "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+            "p99_ms": round(_percentile(samples, 99) * 1000, 3)
+        }
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """获取全部指标的统计摘要"""
+        with self._lock:
+            names = list(self._samples.keys())
+        return {name: self.summary(name) for name in names}
+
+    def reset(self):
+        """清空所有样本"""
+        with self._lock:
+            self._samples.clear()
+
+
+class CacheStats:
+    """缓存命中统计"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def _percentile(sorted_samples: List[float], percent: float) -> float:
+    """最近秩法计算分位数，输入需已排序"""
+    if not sorted_samples:
+        return 0.0
+    rank = int(round(percent / 100 * (len(sorted_samples) - 1)))
+    return sorted_samples[max(0, min(rank, len(sorted_samples) - 1))]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+批量处理测试
+验证商品表读取、检查点恢复（含写了一半的行和损坏的行）、同一SKU以最后一条记录为准和断点续跑
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from batch_process import load_products, load_latest_records, load_completed_skus, run_batch
+
+
+def fake_solution(product_info, competitor_title=None, target_audience="通用", budget="中等"):
+    """按规则构造的解决方案，用于验证批量流程本身"""
+    if "失败" in product_info:
+        return {"success": False, "error": "生成失败"}
+    evaluation = {"style": "爆款", "title": f"{product_info} 爆款", "ctr_analysis": {"ctr_score": 0.8}}
+    return {
+        "success": True,
+        "recommended_title": evaluation,
+        "ctr_evaluations": [evaluation],
+        "strategy_suggestion": f"{target_audience} {budget}"
+    }
+
+
+def test_load_products():
+    """测试CSV读取、列名映射与重复SKU过滤"""
+    print("=" * 50)
+    print("测试商品表读取")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "products.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("id,描述,budget\nA1,粉色连衣裙,高\nA2,蓝牙耳机,\nA1,重复商品,低\nA3,,低\n")
+
+        products = load_products(path, {"sku": "id", "product_info": "描述"})
+        print(f"读取结果: {products}")
+        assert [product["sku"] for product in products] == ["A1", "A2"]
+        assert products[0]["budget"] == "高"
+        assert products[1]["target_audience"] == ""
+    print("✅ 商品表读取测试通过")
+
+
+def test_checkpoint_resume():
+    """测试检查点恢复与断点续跑"""
+    print("=" * 50)
+    print("测试检查点恢复")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "solutions.jsonl")
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"sku": "A1", "success": True}) + "\n")
+            f.write(json.dumps({"sku": "A2", "success": False}) + "\n")
+            f.write("not json\n")  # 损坏的行跳过
+            f.write(json.dumps({"success": True}) + "\n")  # 缺少SKU的行跳过
+            f.write('{"sku": "A3", "succ')  # 模拟崩溃时写了一半的行
+
+        assert load_completed_skus(output_path) == {"A1", "A2"}
+        assert load_completed_skus(output_path, retry_failed=True) == {"A1"}
+
+        products = [
+            {"sku": sku, "product_info": info, "competitor_title": "", "target_audience": "", "budget": ""}
+            for sku, info in [("A1", "连衣裙"), ("A2", "耳机"), ("A3", "面膜"), ("A4", "失败商品")]
+        ]
+        progress = run_batch(products, fake_solution, output_path, workers=2, retry_failed=True)
+        print(f"运行统计: {progress}")
+        assert progress["done"] == 3
+        assert progress["failed"] == 1
+
+        # 重试的A2追加了新记录，读取时以最后一条为准
+        latest = load_latest_records(output_path)
+        assert set(latest) == {"A1", "A2", "A3", "A4"}
+        with open(output_path, encoding="utf-8") as f:
+            assert sum('"A2"' in line for line in f) == 2
+        assert latest["A2"]["success"] and latest["A2"]["strategy_suggestion"] == "通用 中等"
+        assert latest["A4"]["error"] == "生成失败"
+
+        # 再次运行不会重复处理已成功的SKU
+        progress = run_batch(products, fake_solution, output_path, workers=2)
+        assert progress["done"] == 0
+    print("✅ 检查点恢复测试通过")
+
+
+if __name__ == "__main__":
+    test_load_products()
+    test_checkpoint_resume()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+检索基准测试工具函数测试
+验证按Markdown标题构造标注章节、文本块与查询集、干扰块合成，以及recall@k与MRR的计算
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_retrieval import load_labelled_sections, build_labelled_corpus, synthesize_chunks, ranking_metrics
+
+
+class ParagraphSplitter:
+    """按空行切分的文本分割器"""
+
+    def split_text(self, text):
+        return [piece.strip() for piece in text.split("\n\n") if piece.strip()]
+
+
+def test_labelled_corpus():
+    """测试章节按标题路径标注，查询取最近两级标题"""
+    print("=" * 50)
+    print("测试标注章节与查询集构造")
+    print("=" * 50)
+
+    knowledge_dir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(knowledge_dir, "guide.md"), "w", encoding="utf-8") as f:
+            f.write("# 运营指南\n\n"
+                    "## 标题优化\n标题包含核心关键词。\n\n突出卖点和季节。\n"
+                    "### 长度控制\n标题控制在30字以内。\n"
+                    "## 空章节\n"
+                    "## 活动策划\n大促前一周预热。\n")
+        with open(os.path.join(knowledge_dir, "notes.txt"), "w", encoding="utf-8") as f:
+            f.write("# 非Markdown文件不参与标注\n内容\n")
+
+        sections = load_labelled_sections(knowledge_dir)
+        print(f"标注章节: {[section['id'] for section in sections]}")
+        # 没有正文的标题（运营指南、空章节）不单独成为章节
+        assert [section["id"] for section in sections] == [
+            "guide.md#运营指南 > 标题优化",
+            "guide.md#运营指南 > 标题优化 > 长度控制",
+            "guide.md#运营指南 > 活动策划"
+        ]
+        assert sections[0]["source"] == "guide.md"
+        assert sections[0]["text"] == "标题包含核心关键词。\n\n突出卖点和季节。"
+
+        chunks, queries = build_labelled_corpus(sections, ParagraphSplitter())
+        assert chunks[:2] == [("标题包含核心关键词。", sections[0]["id"]), ("突出卖点和季节。", sections[0]["id"])]
+        assert len(chunks) == 4
+        assert queries == [
+            ("运营指南 标题优化", sections[0]["id"]),
+            ("标题优化 长度控制", sections[1]["id"]),
+            ("运营指南 活动策划", sections[2]["id"])
+        ]
+    finally:
+        shutil.rmtree(knowledge_dir, ignore_errors=True)
+    print("✅ 标注章节与查询集构造测试通过")
+
+
+def test_synthesize_chunks():
+    """测试干扰块扩充到目标规模且标注为None，结果可复现"""
+    print("=" * 50)
+    print("测试干扰块合成")
+    print("=" * 50)
+
+    chunks = [("标题包含核心关键词。突出卖点和季节。", "a"), ("大促前一周预热。提前准备库存。", "b")]
+    assert synthesize_chunks(chunks, 1) == chunks
+
+    synthetic = synthesize_chunks(chunks, 10, seed=7)
+    assert len(synthetic) == 10
+    assert synthetic[:2] == chunks
+    assert all(label is None for _, label in synthetic[2:])
+    assert synthesize_chunks(chunks, 10, seed=7) == synthetic
+    print("✅ 干扰块合成测试通过")
+
+
+def test_ranking_metrics():
+    """测试recall@k与MRR@k：只看前k个结果，跳过-1填充和干扰块"""
+    print("=" * 50)
+    print("测试recall@k与MRR计算")
+    print("=" * 50)
+
+    chunk_labels = ["a", "a", "b", None, "c"]
+    query_labels = ["a", "b", "c", "d"]
+    ranked_ids = [
+        [0, 3, 2],    # a 排第1
+        [3, 1, 2],    # b 排第3
+        [3, -1, -1],  # c 未检索到，-1为填充
+        [4, 2, 0]     # d 没有对应文本块
+    ]
+
+    metrics = ranking_metrics(ranked_ids, query_labels, chunk_labels, k=3)
+    print(f"k=3: {metrics}")
+    assert metrics == {"recall@3": 0.5, "mrr@3": round((1 + 1 / 3) / 4, 4)}
+
+    # k=2时b的相关结果在第3位，不计入
+    metrics = ranking_metrics(ranked_ids, query_labels, chunk_labels, k=2)
+    print(f"k=2: {metrics}")
+    assert metrics == {"recall@2": 0.25, "mrr@2": 0.25}
+
+    assert ranking_metrics([], [], chunk_labels, k=3) == {"recall@3": 0.0, "mrr@3": 0.0}
+    print("✅ recall@k与MRR计算测试通过")
+
+
+if __name__ == "__main__":
+    test_labelled_corpus()
+    test_synthesize_chunks()
+    test_ranking_metrics()
+    print("\n🎉 所有测试通过！")
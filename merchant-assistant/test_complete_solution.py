@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+一站式方案并发执行测试
+用可控耗时的模拟工具，验证并发执行与逐个执行的结果一致，以及超出时间预算的步骤标记为 partial / missing
+（包括LLM调用在截止时间前已因超时失败的步骤）
+"""
+
+import sys
+import os
+import time
+import asyncio
+import functools
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.tools import StructuredTool
+
+import agent.agent_executor as agent_executor
+import agent.tools.merchant_tools as merchant_tools
+from agent.agent_executor import MerchantAssistantAgent
+from agent.deadline import DeadlineExceeded, request_deadline
+from agent.steps import run_steps
+
+
+PRODUCT_INFO = "夏季新款粉色连衣裙，纯棉材质，显瘦百搭，价格199元"
+COMPETITOR_TITLE = "【热销】韩版粉色连衣裙女夏季新款"
+
+
+def make_tool(name: str, result, delays: dict = None, default_delay: float = 0.2):
+    """
+    创建同时支持 invoke 与 ainvoke 的模拟工具
+
+    Args:
+        name: 工具名称
+        result: 根据工具参数返回结果的函数
+        delays: 按 style 参数指定的耗时（秒），未指定时使用 default_delay
+    """
+    delays = delays or {}
+
+    def delay_for(kwargs):
+        return delays.get(kwargs.get("style"), default_delay)
+
+    # 保留result的签名，工具参数结构据此推断
+    @functools.wraps(result)
+    def run(**kwargs):
+        time.sleep(delay_for(kwargs))
+        return result(**kwargs)
+
+    @functools.wraps(result)
+    async def arun(**kwargs):
+        await asyncio.sleep(delay_for(kwargs))
+        return result(**kwargs)
+
+    return StructuredTool.from_function(func=run, coroutine=arun, name=name, description=f"模拟{name}")
+
+
+def stub_tools(title_delays: dict = None, strategy_delay: float = 0.2):
+    return {
+        "generate_product_title": make_tool(
+            "generate_product_title",
+            lambda product_info, style="爆款", target_audience="通用": f"【{style}】夏季新款粉色连衣裙显瘦百搭",
+            delays=title_delays
+        ),
+        "suggest_strategy": make_tool(
+            "suggest_strategy",
+            lambda product_type, target_audience="通用", budget="中等", product_info="": f"{product_type}·{budget}预算投放策略",
+            default_delay=strategy_delay
+        ),
+        "analyze_competitor_title": make_tool(
+            "analyze_competitor_title",
+            lambda competitor_title, our_keywords=None: {"competitor_title": competitor_title, "keyword_overlap": 0.5}
+        )
+    }
+
+
+class patched_tools:
+    """临时替换一站式方案使用的工具"""
+
+    def __init__(self, tools: dict):
+        self.tools = tools
+        self.originals = {}
+
+    def __enter__(self):
+        for name, tool in self.tools.items():
+            self.originals[name] = getattr(agent_executor, name)
+            setattr(agent_executor, name, tool)
+        return self.tools
+
+    def __exit__(self, *exc_info):
+        for name, tool in self.originals.items():
+            setattr(agent_executor, name, tool)
+
+
+def sequential_solution(agent: MerchantAssistantAgent, tools: dict) -> dict:
+    """按并发改造前的方式逐个调用工具生成方案，作为对照"""
+    solution = agent._start_solution(PRODUCT_INFO, "年轻女性", "中等")
+    plan = agent._plan_solution_tasks(solution, COMPETITOR_TITLE)
+    titles = [tools["generate_product_title"].invoke(title_input) for title_input in plan["title_inputs"]]
+    strategy = tools["suggest_strategy"].invoke(plan["strategy_input"])
+    competitor = tools["analyze_competitor_title"].invoke(plan["competitor_input"])
+    agent._finish_solution(solution, plan, titles, strategy, competitor)
+    return solution
+
+
+def assert_same_solution(actual: dict, expected: dict):
+    for key in ["generated_titles", "strategy_suggestion", "ctr_evaluations", "competitor_analysis",
+                "recommended_title", "sections", "partial", "success"]:
+        assert actual[key] == expected[key], f"{key}: {actual[key]} != {expected[key]}"
+
+
+def test_concurrent_matches_sequential():
+    """测试并发版本（同步与异步）与逐个执行的结果一致，且耗时接近最慢的单个步骤"""
+    print("=" * 50)
+    print("测试并发结果与逐个执行一致")
+    print("=" * 50)
+
+    agent = MerchantAssistantAgent(llm_type="mock", embedding_type="mock")
+    with patched_tools(stub_tools()) as tools:
+        expected = sequential_solution(agent, tools)
+
+        started = time.perf_counter()
+        concurrent = agent.generate_complete_solution(PRODUCT_INFO, COMPETITOR_TITLE, "年轻女性", "中等", time_budget=0)
+        concurrent_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        async_result = asyncio.run(agent.agenerate_complete_solution(
+            PRODUCT_INFO, COMPETITOR_TITLE, "年轻女性", "中等", time_budget=0
+        ))
+        async_seconds = time.perf_counter() - started
+
+    print(f"各部分状态: {concurrent['sections']}")
+    print(f"耗时: 同步并发 {concurrent_seconds:.3f}s，异步并发 {async_seconds:.3f}s（5个步骤各0.2s）")
+    assert expected["sections"] == {
+        "generated_titles": "done", "strategy_suggestion": "done", "ctr_evaluations": "done",
+        "competitor_analysis": "done", "recommended_title": "done"
+    }
+    assert_same_solution(concurrent, expected)
+    assert_same_solution(async_result, expected)
+    assert concurrent_seconds < 0.8
+    assert async_seconds < 0.8
+    print("✅ 并发结果一致性测试通过")
+
+
+def test_timed_out_steps_are_reported():
+    """测试超出时间预算的步骤标记为partial/missing，已完成的部分照常返回"""
+    print("=" * 50)
+    print("测试超时步骤标记")
+    print("=" * 50)
+
+    agent = MerchantAssistantAgent(llm_type="mock", embedding_type="mock")
+    tools = stub_tools(title_delays={"高端": 3}, strategy_delay=3)
+    with patched_tools(tools):
+        for name, run in [
+            ("同步", lambda: agent.generate_complete_solution(PRODUCT_INFO, COMPETITOR_TITLE, "年轻女性", "中等", time_budget=0.6)),
+            ("异步", lambda: asyncio.run(agent.agenerate_complete_solution(
+                PRODUCT_INFO, COMPETITOR_TITLE, "年轻女性", "中等", time_budget=0.6
+            )))
+        ]:
+            started = time.perf_counter()
+            solution = run()
+            elapsed = time.perf_counter() - started
+            print(f"{name}: 耗时 {elapsed:.3f}s，各部分状态: {solution['sections']}")
+
+            assert elapsed < 2
+            assert solution["success"] is True
+            assert solution["partial"] is True
+            assert solution["sections"]["generated_titles"] == "partial"
+            assert solution["sections"]["ctr_evaluations"] == "partial"
+            assert solution["sections"]["strategy_suggestion"] == "missing"
+            assert solution["sections"]["competitor_analysis"] == "done"
+            assert solution["sections"]["recommended_title"] == "done"
+            assert solution["strategy_suggestion"] is None
+            assert sorted(title["style"] for title in solution["generated_titles"]) == ["爆款", "简约"]
+    print("✅ 超时步骤标记测试通过")
+
+
+class TimeoutLLM:
+    """调用时因超出时间预算失败的模拟LLM"""
+
+    def invoke(self, prompt, **kwargs):
+        raise DeadlineExceeded("请求超出时间预算")
+
+    async def ainvoke(self, prompt, **kwargs):
+        raise DeadlineExceeded("请求超出时间预算")
+
+
+def test_llm_timeout_marks_section_missing():
+    """测试工具内LLM调用超时不回退为规则引擎结果：工具抛出DeadlineExceeded，对应部分标记为missing而不是done"""
+    print("=" * 50)
+    print("测试LLM超时的步骤标记")
+    print("=" * 50)
+
+    originals = merchant_tools.get_task_llm, merchant_tools.is_llm_available
+    merchant_tools.get_task_llm = lambda task: TimeoutLLM()
+    merchant_tools.is_llm_available = lambda llm: True
+    try:
+        # 工具流程直接抛出DeadlineExceeded
+        try:
+            run_steps(merchant_tools._strategy_steps("服装", "年轻女性", "中等", PRODUCT_INFO))
+            assert False, "应抛出DeadlineExceeded"
+        except DeadlineExceeded:
+            pass
+
+        # 截止时间已过时不再调用LLM，也不返回规则引擎结果
+        with request_deadline(0.01):
+            time.sleep(0.02)
+            try:
+                merchant_tools.suggest_strategy.invoke({"product_type": "服装"})
+                assert False, "应抛出DeadlineExceeded"
+            except DeadlineExceeded:
+                pass
+    finally:
+        merchant_tools.get_task_llm, merchant_tools.is_llm_available = originals
+
+    # 策略步骤的LLM调用在wait超时之前就已超时失败，其余步骤正常完成
+    tools = stub_tools()
+
+    def timed_out_strategy(product_type, target_audience="通用", budget="中等", product_info=""):
+        raise DeadlineExceeded("请求超出时间预算")
+
+    tools["suggest_strategy"] = make_tool("suggest_strategy", timed_out_strategy, default_delay=0.05)
+    agent = MerchantAssistantAgent(llm_type="mock", embedding_type="mock")
+    with patched_tools(tools):
+        for name, run in [
+            ("同步", lambda: agent.generate_complete_solution(PRODUCT_INFO, COMPETITOR_TITLE, "年轻女性", "中等", time_budget=2)),
+            ("异步", lambda: asyncio.run(agent.agenerate_complete_solution(
+                PRODUCT_INFO, COMPETITOR_TITLE, "年轻女性", "中等", time_budget=2
+            )))
+        ]:
+            solution = run()
+            print(f"{name}: 各部分状态: {solution['sections']}")
+            assert solution["success"] is True
+            assert solution["partial"] is True
+            assert solution["sections"]["strategy_suggestion"] == "missing"
+            assert solution["strategy_suggestion"] is None
+            assert solution["sections"]["generated_titles"] == "done"
+            assert solution["sections"]["competitor_analysis"] == "done"
+    print("✅ LLM超时步骤标记测试通过")
+
+
+if __name__ == "__main__":
+    test_concurrent_matches_sequential()
+    test_timed_out_steps_are_reported()
+    test_llm_timeout_marks_section_missing()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+请求截止时间测试
+验证时间预算的嵌套、超时收紧以及跨线程传递
+"""
+
+import sys
+import os
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.deadline import (
+    DeadlineExceeded, request_deadline, remaining_time, deadline_timeout, check_deadline
+)
+
+
+def test_deadline_budget():
+    """测试剩余时间收紧超时，嵌套时取更早的截止时间"""
+    print("=" * 50)
+    print("测试时间预算")
+    print("=" * 50)
+
+    assert remaining_time() is None
+    assert deadline_timeout(120) == 120
+
+    with request_deadline(5):
+        assert deadline_timeout(120) <= 5
+        assert deadline_timeout(1) == 1
+        with request_deadline(60):
+            print(f"嵌套预算剩余: {remaining_time():.2f}s")
+            assert remaining_time() <= 5
+        with request_deadline(0):
+            assert remaining_time() <= 5
+
+    assert remaining_time() is None
+    print("✅ 时间预算测试通过")
+
+
+def test_deadline_exceeded():
+    """测试超出预算后抛出DeadlineExceeded，且预算随上下文传入线程池"""
+    print("=" * 50)
+    print("测试超出预算")
+    print("=" * 50)
+
+    with request_deadline(0.05):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            inherited = executor.submit(contextvars.copy_context().run, remaining_time).result()
+        print(f"线程内剩余时间: {inherited:.3f}s")
+        assert inherited is not None and inherited <= 0.05
+
+        time.sleep(0.06)
+        for call in (check_deadline, lambda: deadline_timeout(120)):
+            try:
+                call()
+            except DeadlineExceeded:
+                pass
+            else:
+                raise AssertionError("超出预算后应抛出DeadlineExceeded")
+
+    print("✅ 超出预算测试通过")
+
+
+if __name__ == "__main__":
+    test_deadline_budget()
+    test_deadline_exceeded()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+生成预算测试
+验证模型级预算覆盖、各工具调用LLM时带上最大生成token数/停止序列，以及prompt字数要求随预算变化
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from agent.llm_client import create_ollama_llm
+from agent.tools.merchant_tools import (
+    suggest_strategy, optimize_title_with_feedback, evaluate_title_quality, use_llm
+)
+
+
+class RecordingLLM:
+    """记录prompt与调用参数的LLM"""
+
+    def __init__(self, generation_budgets):
+        self.generation_budgets = generation_budgets
+        self.calls = []
+
+    def invoke(self, prompt, **kwargs):
+        self.calls.append((prompt, kwargs))
+        return "策略内容"
+
+
+def test_model_overrides():
+    """测试模型配置中的预算覆盖默认值，未覆盖的字段和任务保持默认"""
+    print("=" * 50)
+    print("测试模型级预算覆盖")
+    print("=" * 50)
+
+    budgets = Config.get_generation_budgets({"generation_budgets": {"strategy": {"num_predict": 400}}})
+    print(f"策略预算: {budgets['strategy']}")
+    assert budgets["strategy"] == {"num_predict": 400, "length_target": Config.GENERATION_BUDGETS["strategy"]["length_target"]}
+    assert budgets["title"] == Config.GENERATION_BUDGETS["title"]
+
+    llm = create_ollama_llm({**Config.LLM_CONFIGS["ollama_qwen"], "generation_budgets": {"agent": {"num_predict": 256}}})
+    payload = llm._build_payload("你好", None, {})
+    assert payload["options"]["num_predict"] == 256
+    assert llm._build_payload("你好", ["\n\n"], {"num_predict": 48})["options"] == {
+        **payload["options"], "num_predict": 48, "stop": ["\n\n"]
+    }
+    print("✅ 模型级预算覆盖测试通过")
+
+
+def test_tools_apply_budgets():
+    """测试工具调用LLM时按任务带上生成预算"""
+    print("=" * 50)
+    print("测试工具生成预算")
+    print("=" * 50)
+
+    budgets = Config.get_generation_budgets({"generation_budgets": {"strategy": {"num_predict": 400, "length_target": 300}}})
+    llm = RecordingLLM(budgets)
+    with use_llm(llm):
+        suggest_strategy.invoke({"product_type": "服装", "target_audience": "年轻女性", "product_info": "粉色连衣裙"})
+        evaluation = evaluate_title_quality("裙子", "粉色连衣裙", "年轻女性")
+        optimize_title_with_feedback("裙子", evaluation, "粉色连衣裙", "爆款", "年轻女性")
+
+    (strategy_prompt, strategy_options), (_, title_options) = llm.calls
+    print(f"策略调用参数: {strategy_options}，标题优化调用参数: {title_options}")
+    assert strategy_options == {"num_predict": 400}
+    assert "总字数控制在300字左右" in strategy_prompt
+    assert title_options == {"num_predict": budgets["title_optimize"]["num_predict"], "stop": ["\n\n"]}
+    print("✅ 工具生成预算测试通过")
+
+
+if __name__ == "__main__":
+    test_model_overrides()
+    test_tools_apply_budgets()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+意图快速路由测试
+验证单工具请求的意图识别与参数抽取，以及模糊请求回退到Agent
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.intent_router import route_request, format_tool_answer
+from agent.tools.merchant_tools import estimate_ctr
+
+
+def test_single_tool_routes():
+    """测试意图明确的请求被路由到对应工具"""
+    print("=" * 50)
+    print("测试单工具路由")
+    print("=" * 50)
+
+    route = route_request("帮我生成一个标题：粉色连衣裙，夏季新款，129元")
+    print(f"标题生成: {route}")
+    assert route["tool"] == "generate_product_title"
+    assert route["tool_input"]["product_info"] == "粉色连衣裙，夏季新款，129元"
+    assert route["tool_input"]["style"] == "爆款"
+
+    route = route_request("给年轻女性的蓝牙耳机写个高端风格的标题")
+    print(f"标题生成（无冒号）: {route}")
+    assert route["tool"] == "generate_product_title"
+    assert route["tool_input"]["style"] == "高端"
+    assert route["tool_input"]["target_audience"] == "年轻女性"
+
+    route = route_request("评估这个标题的CTR：【爆款】夏季粉色连衣裙，关键词：连衣裙、粉色")
+    print(f"CTR评估: {route}")
+    assert route["tool"] == "estimate_ctr"
+    assert route["tool_input"] == {"title": "【爆款】夏季粉色连衣裙", "keywords": ["连衣裙", "粉色"]}
+
+    route = route_request("学生党耳机怎么推广，预算低")
+    print(f"策略建议: {route}")
+    assert route["tool"] == "suggest_strategy"
+    assert route["tool_input"]["product_type"] == "数码"
+    assert route["tool_input"]["budget"] == "低"
+    assert route["tool_input"]["target_audience"] == "学生"
+
+    route = route_request("写个简约风格的标题：特别百搭的纯棉T恤，59元")
+    print(f"含“特别”的标题生成: {route}")
+    assert route["tool"] == "generate_product_title"
+    assert route["tool_input"]["style"] == "简约"
+
+    route = route_request("分析一下竞品「2024夏季新款连衣裙女显瘦」")
+    print(f"竞品分析: {route}")
+    assert route["tool"] == "analyze_competitor_title"
+    assert route["tool_input"]["competitor_title"] == "2024夏季新款连衣裙女显瘦"
+    print("✅ 单工具路由测试通过")
+
+
+def test_ambiguous_requests_fall_back():
+    """测试模糊、多步骤、依赖上下文或含否定/条件的请求交由Agent处理"""
+    print("=" * 50)
+    print("测试回退到Agent")
+    print("=" * 50)
+
+    for user_input in [
+        "你好，你能做什么？",
+        "帮我生成标题然后评估一下CTR：粉色连衣裙129元",
+        "把刚才的标题改得更简约一点",
+        "帮我生成一个标题",
+        "评估这个标题的CTR",
+        "这个商品怎么推广",
+        "不要写标题：手机 999元",
+        "先不用生成标题，评估一下这个标题的CTR：【爆款】夏季粉色连衣裙",
+        "别写爆款风格的标题：粉色连衣裙129元",
+        "如果预算低的话，学生党耳机怎么推广"
+    ]:
+        route = route_request(user_input)
+        print(f"{user_input} -> {route}")
+        assert route is None
+    print("✅ 回退测试通过")
+
+
+def test_format_answer():
+    """测试工具结果格式化"""
+    print("=" * 50)
+    print("测试回复格式化")
+    print("=" * 50)
+
+    tool_input = {"title": "【爆款】夏季粉色连衣裙"}
+    answer = format_tool_answer("estimate_ctr", tool_input, estimate_ctr.invoke(tool_input))
+    print(answer)
+    assert "预估CTR" in answer
+    assert "优化建议" in answer
+    print("✅ 回复格式化测试通过")
+
+
+if __name__ == "__main__":
+    test_single_tool_routes()
+    test_ambiguous_requests_fall_back()
+    test_format_answer()
+    print("\n🎉 所有测试通过！")
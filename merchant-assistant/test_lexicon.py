@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+词表测试
+验证词表内容有效（无空词、无重复词、颜色词以“色”结尾以便匹配简称），以及商品大类识别的顺序
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.lexicon import LEXICONS, COLORS, match_product_category
+
+
+def test_lexicons():
+    """测试各词表没有空词和重复词"""
+    print("=" * 50)
+    print("测试词表内容")
+    print("=" * 50)
+
+    for category, words in LEXICONS.items():
+        assert all(words), category
+        assert len(set(words)) == len(words), category
+    assert all(color.endswith("色") and len(color) > 1 for color in COLORS)
+    print(f"词表: {len(LEXICONS)} 类，共 {sum(len(words) for words in LEXICONS.values())} 词")
+    print("✅ 词表内容测试通过")
+
+
+def test_categories():
+    """测试商品大类按配置顺序识别"""
+    print("=" * 50)
+    print("测试商品大类识别")
+    print("=" * 50)
+
+    assert match_product_category("无线蓝牙耳机") == "数码"
+    assert match_product_category("连衣裙配手机壳") == "服装"
+    assert match_product_category("补水面膜 护肤") == "美妆"
+    assert match_product_category("杯子") == ""
+    print("✅ 商品大类识别测试通过")
+
+
+if __name__ == "__main__":
+    test_lexicons()
+    test_categories()
+    print("\n🎉 所有测试通过！")
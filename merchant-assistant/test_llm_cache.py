@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+LLM响应缓存测试
+验证缓存键、内存/磁盘两级命中、过期、容量淘汰和绕过开关
+"""
+
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.llm_cache import LLMResponseCache, make_cache_key, bypass_llm_cache, is_cache_bypassed
+
+
+def test_cache_key():
+    """测试缓存键区分模型、温度、prompt和停止词"""
+    print("=" * 50)
+    print("测试缓存键")
+    print("=" * 50)
+
+    key = make_cache_key("qwen2.5:7b", 0.7, "生成标题")
+    assert key == make_cache_key("qwen2.5:7b", 0.7, "生成标题")
+    assert key != make_cache_key("qwen2.5:14b", 0.7, "生成标题")
+    assert key != make_cache_key("qwen2.5:7b", 0.3, "生成标题")
+    assert key != make_cache_key("qwen2.5:7b", 0.7, "生成策略")
+    assert key != make_cache_key("qwen2.5:7b", 0.7, "生成标题", stop=["\n"])
+    print("✅ 缓存键测试通过")
+
+
+def test_memory_and_disk_hits():
+    """测试内存命中与重启后的磁盘命中"""
+    print("=" * 50)
+    print("测试两级缓存命中")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "llm_cache.sqlite")
+        key = make_cache_key("qwen2.5:7b", 0.7, "连衣裙标题")
+
+        cache = LLMResponseCache(path)
+        assert cache.get(key) is None
+        cache.set(key, "夏季新款粉色连衣裙", model="qwen2.5:7b")
+        assert cache.get(key) == "夏季新款粉色连衣裙"
+        assert cache.memory_hits == 1
+
+        # 新实例模拟进程重启，从SQLite读取
+        reopened = LLMResponseCache(path)
+        assert reopened.get(key) == "夏季新款粉色连衣裙"
+        assert reopened.disk_hits == 1
+        assert reopened.get(key) == "夏季新款粉色连衣裙"
+        assert reopened.memory_hits == 1
+
+        stats = reopened.get_stats()
+        print(f"统计结果: {stats}")
+        assert stats["hits"] == 2
+        assert stats["disk_entries"] == 1
+    print("✅ 两级缓存命中测试通过")
+
+
+def test_ttl_and_eviction():
+    """测试过期与容量淘汰"""
+    print("=" * 50)
+    print("测试过期与容量淘汰")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = LLMResponseCache(os.path.join(temp_dir, "ttl.sqlite"), ttl_seconds=0.05)
+        cache.set("expiring", "旧结果")
+        time.sleep(0.1)
+        assert cache.get("expiring") is None
+        assert cache.get_stats()["disk_entries"] == 0
+
+        cache = LLMResponseCache(os.path.join(temp_dir, "size.sqlite"), memory_entries=2, max_entries=3)
+        for i in range(5):
+            cache.set(f"key{i}", f"结果{i}")
+            time.sleep(0.01)
+        stats = cache.get_stats()
+        print(f"统计结果: {stats}")
+        assert stats["memory_entries"] == 2
+        assert stats["disk_entries"] == 3
+        assert cache.get("key0") is None
+        assert cache.get("key4") == "结果4"
+    print("✅ 过期与容量淘汰测试通过")
+
+
+def test_bypass():
+    """测试重新生成时的缓存绕过开关"""
+    print("=" * 50)
+    print("测试缓存绕过")
+    print("=" * 50)
+
+    assert not is_cache_bypassed()
+    with bypass_llm_cache():
+        assert is_cache_bypassed()
+    assert not is_cache_bypassed()
+    print("✅ 缓存绕过测试通过")
+
+
+if __name__ == "__main__":
+    test_cache_key()
+    test_memory_and_disk_hits()
+    test_ttl_and_eviction()
+    test_bypass()
+    print("\n🎉 所有测试通过！")
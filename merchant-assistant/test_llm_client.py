@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Ollama连接池测试
+用本地模拟的 /api/generate 与 /api/version 服务，验证并发名额上限（含同步与异步混合调用）、排队超时、流式请求的总超时、耗时统计和流式调用
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import threading
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.llm_client import OllamaConnectionPool, PooledOllamaLLM, get_ollama_pool
+
+
+class FakeOllamaServer:
+    """本地模拟的Ollama服务，记录同时处理中的请求数峰值和最近一次请求体"""
+
+    def __init__(self, delay: float = 0.1, tokens=("你好", "世界"), token_delay: float = 0):
+        self.delay = delay
+        self.token_delay = token_delay  # 流式输出相邻两个token之间的间隔
+        self.tokens = list(tokens)
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+        self.last_payload = None
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/api/version":
+                    self.send_error(404)
+                    return
+                self._send_json({"version": "0.0.0-fake"})
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake._lock:
+                    fake.active += 1
+                    fake.peak = max(fake.peak, fake.active)
+                    fake.requests += 1
+                    fake.last_payload = payload
+                try:
+                    time.sleep(fake.delay)
+                    if not payload.get("stream"):
+                        self._send_json({"response": "".join(fake.tokens), "done": True})
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.end_headers()
+                    for token in fake.tokens:
+                        time.sleep(fake.token_delay)
+                        self.wfile.write(json.dumps({"response": token, "done": False}).encode("utf-8") + b"\n")
+                    done = {"response": "", "done": True, "prompt_eval_count": 5, "prompt_eval_duration": 1_000_000,
+                            "eval_count": len(fake.tokens), "eval_duration": 2_000_000}
+                    self.wfile.write(json.dumps(done).encode("utf-8") + b"\n")
+                finally:
+                    with fake._lock:
+                        fake.active -= 1
+
+            def _send_json(self, data):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_in_flight_cap():
+    """测试同时进行中的请求数不超过max_in_flight"""
+    print("=" * 50)
+    print("测试并发名额上限")
+    print("=" * 50)
+
+    server = FakeOllamaServer(delay=0.1)
+    try:
+        pool = OllamaConnectionPool(server.base_url, pool_size=4, max_in_flight=2)
+        errors = []
+
+        def call():
+            try:
+                pool.post("/api/generate", {"model": "fake", "prompt": "标题", "stream": False}, timeout=10)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        print(f"请求数: {server.requests}，服务端并发峰值: {server.peak}")
+        assert not errors, errors
+        assert server.requests == 6
+        assert server.peak == 2
+        assert pool.in_flight == 0
+
+        stats = pool.get_stats()
+        assert stats["latency"]["queue"]["count"] == 6
+        assert stats["latency"]["/api/generate"]["count"] == 6
+        # 6个请求分3批执行，最后一批至少排队两轮
+        assert stats["latency"]["queue"]["p99_ms"] >= 100
+    finally:
+        server.close()
+    print("✅ 并发名额上限测试通过")
+
+
+def test_sync_and_async_share_cap():
+    """测试同步线程与多个事件循环中的异步调用共用同一并发上限，事件循环结束后其aiohttp会话被关闭"""
+    print("=" * 50)
+    print("测试同步与异步共用并发名额")
+    print("=" * 50)
+
+    server = FakeOllamaServer(delay=0.1)
+    try:
+        pool = OllamaConnectionPool(server.base_url, pool_size=4, max_in_flight=2)
+        payload = {"model": "fake", "prompt": "标题", "stream": True}
+        sessions = []
+        errors = []
+
+        async def stream_many(count):
+            async def consume():
+                return [data async for data in pool.astream_post("/api/generate", payload, timeout=10)]
+            results = await asyncio.gather(*(consume() for _ in range(count)))
+            sessions.append(await pool._async_session())
+            return results
+
+        def run_loop():
+            try:
+                results = asyncio.run(stream_many(3))
+                assert all(lines[-1]["done"] for lines in results)
+            except Exception as e:
+                errors.append(e)
+
+        def run_sync():
+            try:
+                lines = list(pool.stream_post("/api/generate", payload, timeout=10))
+                assert lines[-1]["done"]
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run_loop) for _ in range(2)] + [threading.Thread(target=run_sync) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        print(f"请求数: {server.requests}，服务端并发峰值: {server.peak}")
+        assert not errors, errors
+        assert server.requests == 9
+        assert server.peak == 2
+        assert pool.in_flight == 0
+
+        # asyncio.run 收尾时关闭各事件循环的会话
+        assert len(sessions) == 2 and all(session.closed for session in sessions)
+        assert pool._async_sessions == {}
+    finally:
+        server.close()
+    print("✅ 同步与异步共用并发名额测试通过")
+
+
+def test_queue_timeout():
+    """测试名额被占满时，超过超时时间的请求抛出TimeoutError且不发往服务"""
+    print("=" * 50)
+    print("测试排队超时")
+    print("=" * 50)
+
+    server = FakeOllamaServer(delay=0)
+    try:
+        pool = OllamaConnectionPool(server.base_url, max_in_flight=1)
+        with pool.slot():
+            assert pool.in_flight == 1
+            started = time.perf_counter()
+            try:
+                pool.post("/api/generate", {"model": "fake", "prompt": "标题", "stream": False}, timeout=0.05)
+                assert False, "应抛出TimeoutError"
+            except TimeoutError as e:
+                print(f"排队超时: {e}，等待 {time.perf_counter() - started:.3f}s")
+        assert server.requests == 0
+        assert pool.in_flight == 0
+
+        # 名额释放后可以正常请求
+        result = pool.post("/api/generate", {"model": "fake", "prompt": "标题", "stream": False}, timeout=5)
+        assert result["response"] == "你好世界"
+    finally:
+        server.close()
+    print("✅ 排队超时测试通过")
+
+
+def test_stream_total_timeout():
+    """测试流式调用的超时是总超时：每个token都在读取超时内到达，但总耗时超出时仍然中止"""
+    print("=" * 50)
+    print("测试流式调用总超时")
+    print("=" * 50)
+
+    server = FakeOllamaServer(delay=0, tokens=["你好"] * 6, token_delay=0.1)
+    try:
+        pool = OllamaConnectionPool(server.base_url, pool_size=2, max_in_flight=2)
+        payload = {"model": "fake", "prompt": "标题", "stream": True}
+
+        try:
+            list(pool.stream_post("/api/generate", payload, timeout=0.35))
+            assert False, "应抛出requests.Timeout"
+        except requests.Timeout as e:
+            print(f"同步流式调用中止: {e}")
+
+        async def consume():
+            return [data async for data in pool.astream_post("/api/generate", payload, timeout=0.35)]
+
+        started = time.perf_counter()
+        try:
+            asyncio.run(consume())
+            assert False, "应抛出asyncio.TimeoutError"
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - started
+        print(f"异步流式调用中止，耗时: {elapsed:.2f}s")
+        assert elapsed < 0.55, elapsed
+        assert pool.in_flight == 0
+
+        # 总超时足够时正常完成
+        lines = list(pool.stream_post("/api/generate", payload, timeout=5))
+        assert lines[-1]["done"]
+    finally:
+        server.close()
+    print("✅ 流式调用总超时测试通过")
+
+
+def test_pooled_llm_stream():
+    """测试PooledOllamaLLM流式调用、生成预算和耗时拆分记录"""
+    print("=" * 50)
+    print("测试PooledOllamaLLM流式调用")
+    print("=" * 50)
+
+    server = FakeOllamaServer(delay=0.01)
+    try:
+        llm = PooledOllamaLLM(model="fake", base_url=server.base_url, timeout=5,
+                              generation_budgets={"agent": {"num_predict": 64}})
+        result = llm.invoke("生成一个连衣裙标题")
+        print(f"生成结果: {result}，请求体: {server.last_payload}")
+        assert result == "你好世界"
+        assert server.last_payload["stream"] is True
+        assert server.last_payload["options"]["num_predict"] == 64
+
+        llm.invoke("生成一个连衣裙标题", num_predict=16, stop=["\n"])
+        assert server.last_payload["options"]["num_predict"] == 16
+        assert server.last_payload["options"]["stop"] == ["\n"]
+
+        latency = get_ollama_pool(server.base_url).latency.snapshot()
+        print(f"耗时统计: {sorted(latency)}")
+        for metric in ["generate.fake", "generate.fake.first_token", "generate.fake.prompt_eval",
+                       "generate.fake.eval", "generate.fake.eval_per_token"]:
+            assert latency[metric]["count"] == 2, metric
+    finally:
+        server.close()
+    print("✅ PooledOllamaLLM流式调用测试通过")
+
+
+if __name__ == "__main__":
+    test_in_flight_cap()
+    test_sync_and_async_share_cap()
+    test_queue_timeout()
+    test_stream_total_timeout()
+    test_pooled_llm_stream()
+    print("\n🎉 所有测试通过！")
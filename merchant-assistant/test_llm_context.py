@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+请求级LLM注入测试
+验证不同会话的LLM在并发线程和协程中互不覆盖
+"""
+
+import sys
+import os
+import time
+import asyncio
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.tools.merchant_tools import use_llm, get_llm_instance, set_llm_instance
+
+
+class FakeLLM:
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+
+def test_concurrent_threads():
+    """测试并发线程各自看到本会话的LLM"""
+    print("=" * 50)
+    print("测试线程间LLM隔离")
+    print("=" * 50)
+
+    set_llm_instance(FakeLLM("default"))
+    seen = {}
+    barrier = threading.Barrier(2)
+
+    def session(model_name):
+        with use_llm(FakeLLM(model_name)):
+            barrier.wait()
+            time.sleep(0.01)
+            seen[model_name] = get_llm_instance().model_name
+
+    threads = [threading.Thread(target=session, args=(name,)) for name in ["qwen2.5:7b", "qwen2.5:14b"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"各会话使用的模型: {seen}")
+    assert seen == {"qwen2.5:7b": "qwen2.5:7b", "qwen2.5:14b": "qwen2.5:14b"}
+    assert get_llm_instance().model_name == "default"
+    print("✅ 线程隔离测试通过")
+
+
+def test_concurrent_tasks():
+    """测试同一事件循环中的协程各自看到本会话的LLM"""
+    print("=" * 50)
+    print("测试协程间LLM隔离")
+    print("=" * 50)
+
+    async def session(model_name):
+        with use_llm(FakeLLM(model_name)):
+            await asyncio.sleep(0.01)
+            return get_llm_instance().model_name
+
+    async def main():
+        return await asyncio.gather(session("qwen2.5:7b"), session("qwen2.5:14b"))
+
+    results = asyncio.run(main())
+    print(f"各协程使用的模型: {results}")
+    assert results == ["qwen2.5:7b", "qwen2.5:14b"]
+    print("✅ 协程隔离测试通过")
+
+
+if __name__ == "__main__":
+    test_concurrent_threads()
+    test_concurrent_tasks()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Ollama健康监测与熔断器测试
+验证连续失败后熔断、冷却后试探恢复、试探结果的状态转换、试探恢复中只放行一个试探请求，
+以及存活接口探测不会替代真实调用关闭熔断
+"""
+
+import sys
+import os
+import json
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.llm_health import OllamaHealthMonitor, is_llm_healthy
+
+
+class VersionHandler(BaseHTTPRequestHandler):
+    """只提供 /api/version 的模拟Ollama服务"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != "/api/version":
+            self.send_error(404)
+            return
+        body = json.dumps({"version": "0.0.0-fake"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def unused_base_url() -> str:
+    """返回一个当前没有服务监听的本地地址"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def test_breaker_transitions():
+    """测试 closed -> open -> half_open -> open/closed 的状态转换"""
+    print("=" * 50)
+    print("测试熔断器状态转换")
+    print("=" * 50)
+
+    monitor = OllamaHealthMonitor("http://127.0.0.1:1", failure_threshold=3, recovery_timeout=0.1)
+    assert monitor.state == OllamaHealthMonitor.CLOSED
+
+    # 未达到阈值前保持关闭
+    monitor.record_failure("连接被拒绝")
+    monitor.record_failure("连接被拒绝")
+    assert monitor.state == OllamaHealthMonitor.CLOSED
+    assert monitor.allow_request()
+
+    # 第N次连续失败后熔断，冷却期内拒绝请求
+    monitor.record_failure("连接被拒绝")
+    assert monitor.state == OllamaHealthMonitor.OPEN
+    assert not monitor.allow_request()
+    assert monitor.get_status()["healthy"] is False
+
+    # 冷却后进入试探恢复，放行请求；试探失败立即重新熔断
+    time.sleep(0.15)
+    assert monitor.allow_request()
+    assert monitor.state == OllamaHealthMonitor.HALF_OPEN
+    monitor.record_failure("仍然不可用")
+    assert monitor.state == OllamaHealthMonitor.OPEN
+    assert not monitor.allow_request()
+
+    # 再次冷却后试探成功，恢复关闭并清零失败计数
+    time.sleep(0.15)
+    assert monitor.allow_request()
+    monitor.record_success()
+    status = monitor.get_status()
+    print(f"恢复后状态: {status}")
+    assert status["state"] == OllamaHealthMonitor.CLOSED
+    assert status["consecutive_failures"] == 0
+    assert status["last_error"] == "仍然不可用"
+
+    # 成功调用会打断连续失败计数
+    monitor.record_failure()
+    monitor.record_failure()
+    monitor.record_success()
+    monitor.record_failure()
+    assert monitor.state == OllamaHealthMonitor.CLOSED
+    print("✅ 熔断器状态转换测试通过")
+
+
+def test_half_open_single_trial():
+    """测试试探恢复中只放行一个在途的试探请求"""
+    print("=" * 50)
+    print("测试试探恢复的单个试探请求")
+    print("=" * 50)
+
+    monitor = OllamaHealthMonitor("http://127.0.0.1:1", failure_threshold=1, recovery_timeout=0.2)
+    monitor.record_failure("连接被拒绝")
+    assert not monitor.acquire_request()
+    time.sleep(0.25)
+
+    # 可用性检查不占用试探名额
+    assert monitor.allow_request()
+    assert monitor.allow_request()
+
+    # 第一个请求获得试探名额，其余请求在试探结束前被拒绝
+    assert monitor.acquire_request()
+    assert monitor.state == OllamaHealthMonitor.HALF_OPEN
+    assert not monitor.acquire_request()
+    assert not monitor.allow_request()
+
+    # 试探请求没有结果就结束时释放名额
+    monitor.release_trial()
+    assert monitor.acquire_request()
+
+    # 试探请求长时间无结果时名额过期，放行新的试探
+    time.sleep(0.25)
+    assert monitor.state == OllamaHealthMonitor.HALF_OPEN
+    assert monitor.acquire_request()
+
+    # 试探成功后关闭熔断，请求不再受限
+    monitor.record_success()
+    assert monitor.state == OllamaHealthMonitor.CLOSED
+    assert monitor.acquire_request()
+    assert monitor.acquire_request()
+    print("✅ 试探恢复单个试探请求测试通过")
+
+
+def test_version_probe():
+    """测试存活接口探测：服务不可达时熔断；服务可达时只在冷却期满后进入试探恢复，不关闭熔断"""
+    print("=" * 50)
+    print("测试存活接口探测")
+    print("=" * 50)
+
+    dead = OllamaHealthMonitor(unused_base_url(), probe_timeout=0.5, failure_threshold=2, recovery_timeout=60)
+    assert dead.check() is False
+    assert dead.state == OllamaHealthMonitor.CLOSED
+    assert dead.check() is False
+    status = dead.get_status()
+    print(f"不可达服务: {status}")
+    assert status["state"] == OllamaHealthMonitor.OPEN
+    assert status["last_check_ok"] is False
+    assert status["last_error"]
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), VersionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        # 服务过载：存活接口正常但生成请求持续失败，探测成功不清零失败计数，熔断照常打开
+        overloaded = OllamaHealthMonitor(base_url, probe_timeout=2, failure_threshold=2, recovery_timeout=60)
+        overloaded.record_failure("生成请求超时")
+        assert overloaded.check() is True
+        assert overloaded.consecutive_failures == 1
+        overloaded.record_failure("生成请求超时")
+        assert overloaded.state == OllamaHealthMonitor.OPEN
+
+        # 冷却期内探测成功不提前关闭熔断
+        assert overloaded.check() is True
+        status = overloaded.get_status()
+        print(f"过载服务: {status}")
+        assert status["state"] == OllamaHealthMonitor.OPEN
+        assert status["consecutive_failures"] == 2
+        assert status["last_check_ok"] is True
+        assert status["last_probe_latency_ms"] is not None
+
+        # 冷却期满后探测成功只进入试探恢复，由真实调用决定是否关闭
+        live = OllamaHealthMonitor(base_url, probe_timeout=2, failure_threshold=2, recovery_timeout=0.1)
+        live.record_failure()
+        live.record_failure()
+        time.sleep(0.15)
+        assert live.check() is True
+        assert live.state == OllamaHealthMonitor.HALF_OPEN
+        assert live.consecutive_failures == 2
+        assert live.acquire_request()
+        live.record_success()
+        assert live.state == OllamaHealthMonitor.CLOSED
+        assert live.consecutive_failures == 0
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✅ 存活接口探测测试通过")
+
+
+def test_non_ollama_llm():
+    """测试没有base_url的LLM视为始终可用"""
+    print("=" * 50)
+    print("测试非Ollama LLM")
+    print("=" * 50)
+
+    class OpenAILike:
+        model_name = "gpt-3.5-turbo"
+
+    assert is_llm_healthy(OpenAILike())
+    print("✅ 非Ollama LLM测试通过")
+
+
+if __name__ == "__main__":
+    test_breaker_transitions()
+    test_half_open_single_trial()
+    test_version_probe()
+    test_non_ollama_llm()
+    print("\n🎉 所有测试通过！")
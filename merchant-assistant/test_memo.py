@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+纯函数结果缓存测试
+验证参数规范化、命中统计、容量淘汰以及返回值隔离
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.memo import memoize, get_memo_stats
+
+calls = []
+
+
+@memoize("test_profile")
+def build_profile(product_info: str, keywords: list = None) -> dict:
+    calls.append(product_info)
+    return {"product_info": product_info, "keywords": list(keywords or [])}
+
+
+def test_memo_hits():
+    """测试相同参数（位置或关键字形式）只计算一次"""
+    print("=" * 50)
+    print("测试缓存命中")
+    print("=" * 50)
+
+    build_profile.memo_cache.clear()
+    calls.clear()
+
+    first = build_profile("粉色连衣裙", ["连衣裙"])
+    second = build_profile(product_info="粉色连衣裙", keywords=["连衣裙"])
+    build_profile("蓝牙耳机")
+
+    stats = get_memo_stats()["test_profile"]
+    print(f"缓存统计: {stats}")
+    assert calls == ["粉色连衣裙", "蓝牙耳机"]
+    assert first == second
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+    # 修改返回值不影响缓存
+    second["keywords"].append("夏季")
+    assert build_profile("粉色连衣裙", ["连衣裙"])["keywords"] == ["连衣裙"]
+    print("✅ 缓存命中测试通过")
+
+
+def test_memo_eviction():
+    """测试超出容量时淘汰最久未使用的条目"""
+    print("=" * 50)
+    print("测试容量淘汰")
+    print("=" * 50)
+
+    cache = build_profile.memo_cache
+    cache.clear()
+    calls.clear()
+    original_max = cache.max_entries
+    cache.max_entries = 2
+    try:
+        build_profile("商品A")
+        build_profile("商品B")
+        build_profile("商品A")
+        build_profile("商品C")  # 淘汰商品B
+        build_profile("商品A")
+        build_profile("商品B")
+    finally:
+        cache.max_entries = original_max
+
+    print(f"实际计算: {calls}")
+    assert calls == ["商品A", "商品B", "商品C", "商品B"]
+    print("✅ 容量淘汰测试通过")
+
+
+if __name__ == "__main__":
+    test_memo_hits()
+    test_memo_eviction()
+    print("\n🎉 所有测试通过！")
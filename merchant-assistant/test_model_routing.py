@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+模型路由测试
+验证固定策略按任务选择模型、auto策略按质量阈值和观测耗时选择模型，以及模拟LLM不参与路由
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from agent.llm_client import create_ollama_llm, record_generation_stats
+from agent.model_router import ModelRouter
+
+ROUTING_CONFIG = {
+    "enabled": True,
+    "routes": {"title": "ollama_qwen", "strategy": "ollama_qwen_large", "competitor": "auto", "agent": "auto"},
+    "auto": {
+        "candidates": ["ollama_qwen", "ollama_qwen_large"],
+        "min_quality": {"competitor": 0.8, "agent": 0.85}
+    }
+}
+
+
+def record_speed(llm_type: str, seconds_per_token: float):
+    """按Ollama返回格式记录一次生成耗时"""
+    llm_config = Config.get_llm_config(llm_type)
+    record_generation_stats(llm_config["base_url"], llm_config["model_name"], {
+        "prompt_eval_duration": int(0.2e9),
+        "eval_count": 100,
+        "eval_duration": int(seconds_per_token * 100 * 1e9)
+    }, prompt_chars=500)
+
+
+def test_fixed_routes():
+    """测试固定策略：标题走小模型，未配置的任务和模拟LLM保持会话LLM"""
+    print("=" * 50)
+    print("测试固定路由")
+    print("=" * 50)
+
+    router = ModelRouter(ROUTING_CONFIG)
+    session_llm = create_ollama_llm(Config.get_llm_config("ollama_qwen_large"))
+
+    title_llm = router.route("title", session_llm)
+    print(f"标题任务模型: {title_llm.model}")
+    assert title_llm.model == Config.LLM_CONFIGS["ollama_qwen"]["model_name"]
+    assert router.route("title", session_llm) is title_llm
+    assert router.route("summary", session_llm) is session_llm
+
+    class MockLLM:
+        pass
+
+    mock_llm = MockLLM()
+    assert router.route("title", mock_llm) is mock_llm
+    assert ModelRouter({**ROUTING_CONFIG, "enabled": False}).route("title", session_llm) is session_llm
+    print(f"路由统计: {router.get_stats()}")
+    print("✅ 固定路由测试通过")
+
+
+def test_auto_route():
+    """测试auto策略：先试用没有观测数据的模型，之后在质量达标的模型中选估算耗时最短的"""
+    print("=" * 50)
+    print("测试自动路由")
+    print("=" * 50)
+
+    router = ModelRouter(ROUTING_CONFIG)
+    llm_type, reason = router.select("competitor")
+    print(f"无观测数据: {llm_type} ({reason})")
+    assert reason == "auto_explore"
+
+    record_speed("ollama_qwen", 0.02)
+    record_speed("ollama_qwen_large", 0.05)
+    assert router.select("competitor") == ("ollama_qwen", "auto")
+    # ReAct推理要求的质量分只有大模型满足
+    assert router.select("agent") == ("ollama_qwen_large", "auto")
+    print("✅ 自动路由测试通过")
+
+
+if __name__ == "__main__":
+    test_fixed_routes()
+    test_auto_route()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+增量用户偏好测试
+验证偏好随新消息更新、滑动窗口淘汰、清空对话同步清空以及序列化恢复
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import HumanMessage, AIMessage
+from agent.preferences import PreferenceTracker, PreferenceTrackingHistory
+
+
+def test_incremental_updates():
+    """测试偏好随消息写入增量更新，超出窗口的消息不再计入"""
+    print("=" * 50)
+    print("测试增量更新")
+    print("=" * 50)
+
+    tracker = PreferenceTracker(window=4)
+    history = PreferenceTrackingHistory(tracker=tracker)
+
+    history.add_message(HumanMessage(content="我比较喜欢简约风格的标题"))
+    history.add_message(AIMessage(content="好的，我会为您提供简约风格的标题"))
+    history.add_message(HumanMessage(content="年轻女性群体的营销怎么做"))
+
+    preferences = tracker.get()
+    print(f"偏好: {preferences}")
+    assert preferences["preferred_styles"] == ["简约"]
+    assert preferences["target_audiences"] == ["年轻女性"]
+
+    # 再写入3条无关消息，最早的两条简约偏好移出窗口
+    for content in ["帮我看看耳机", "耳机推荐如下", "谢谢"]:
+        history.add_message(HumanMessage(content=content))
+    preferences = tracker.get()
+    print(f"窗口滑动后: {preferences}")
+    assert preferences["preferred_styles"] == []
+    assert preferences["target_audiences"] == ["年轻女性"]
+
+    history.clear()
+    assert tracker.get()["target_audiences"] == []
+    print("✅ 增量更新测试通过")
+
+
+def test_serialization():
+    """测试偏好状态可序列化并随会话恢复"""
+    print("=" * 50)
+    print("测试序列化恢复")
+    print("=" * 50)
+
+    tracker = PreferenceTracker(window=10)
+    tracker.update("高端风格很棒 学生 不喜欢")
+    tracker.update("我喜欢高端")
+
+    restored = PreferenceTracker.from_dict(tracker.to_dict())
+    print(f"恢复后: {restored.get()}")
+    assert restored.get() == tracker.get()
+    assert restored.get()["preferred_styles"] == ["高端"]
+    assert restored.get()["keywords_disliked"] == ["学生"]
+    print("✅ 序列化恢复测试通过")
+
+
+if __name__ == "__main__":
+    test_incremental_updates()
+    test_serialization()
+    print("\n🎉 所有测试通过！")
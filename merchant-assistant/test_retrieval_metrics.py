@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+检索指标统计测试
+验证延迟分位数和缓存命中率统计是否正确
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import LatencyTracker, CacheStats
+
+
+def test_latency_percentiles():
+    """测试延迟分位数统计"""
+    print("=" * 50)
+    print("测试延迟分位数统计")
+    print("=" * 50)
+
+    tracker = LatencyTracker(window_size=100)
+    for i in range(1, 101):
+        tracker.record("search.total", i / 1000)
+
+    summary = tracker.summary("search.total")
+    print(f"统计结果: {summary}")
+
+    assert summary["count"] == 100
+    assert 49 <= summary["p50_ms"] <= 51
+    assert 94 <= summary["p95_ms"] <= 96
+    assert 98 <= summary["p99_ms"] <= 100
+
+    # 滚动窗口只保留最近样本
+    for _ in range(100):
+        tracker.record("search.total", 0.5)
+    assert tracker.summary("search.total")["p50_ms"] == 500.0
+
+    # 未记录的指标返回空统计
+    assert tracker.summary("search.embed")["count"] == 0
+    print("✅ 延迟分位数统计正常")
+
+
+def test_cache_stats():
+    """测试缓存命中率统计"""
+    print("\n" + "=" * 50)
+    print("测试缓存命中率统计")
+    print("=" * 50)
+
+    stats = CacheStats()
+    assert stats.to_dict()["hit_rate"] == 0.0
+
+    stats.hit()
+    stats.hit()
+    stats.hit()
+    stats.miss()
+
+    result = stats.to_dict()
+    print(f"统计结果: {result}")
+    assert result == {"hits": 3, "misses": 1, "hit_rate": 0.75}
+
+    stats.reset()
+    assert stats.to_dict()["hits"] == 0
+    print("✅ 缓存命中率统计正常")
+
+
+if __name__ == "__main__":
+    test_latency_percentiles()
+    test_cache_stats()
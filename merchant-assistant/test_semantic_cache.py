@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+语义查询缓存测试
+验证相似度阈值的命中与未命中、按最久未使用淘汰、按附加键（上下文长度）区分，
+以及知识库构建、添加文档和加载向量库时清空缓存
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import zlib
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from knowledge.semantic_cache import SemanticQueryCache
+
+
+class CharEmbeddings:
+    """按字符计数的确定性embedding，字面相近的文本向量相近"""
+
+    dimension = 64
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        vector = [0.0] * self.dimension
+        for char in text:
+            vector[zlib.crc32(char.encode("utf-8")) % self.dimension] += 1.0
+        return vector
+
+
+def test_similarity_threshold():
+    """测试相似度达到阈值时命中，低于阈值时未命中"""
+    print("=" * 50)
+    print("测试相似度阈值")
+    print("=" * 50)
+
+    cache = SemanticQueryCache(max_size=8, threshold=0.95)
+    cache.store([1.0, 0.0, 0.0], "连衣裙上下文")
+
+    # 同方向不同长度的向量视为同一问题
+    assert cache.lookup([2.0, 0.0, 0.0]) == "连衣裙上下文"
+    # 余弦相似度约0.995，达到阈值
+    assert cache.lookup([1.0, 0.1, 0.0]) == "连衣裙上下文"
+    # 余弦相似度约0.89，低于阈值
+    assert cache.lookup([1.0, 0.5, 0.0]) is None
+    # 零向量无法比较，始终未命中也不写入
+    assert cache.lookup([0.0, 0.0, 0.0]) is None
+    cache.store([0.0, 0.0, 0.0], "零向量")
+    assert len(cache) == 1
+
+    stats = cache.stats.to_dict()
+    print(f"命中统计: {stats}")
+    assert stats["hits"] == 2 and stats["misses"] == 2
+
+    strict = SemanticQueryCache(max_size=8, threshold=0.999)
+    strict.store([1.0, 0.0, 0.0], "连衣裙上下文")
+    assert strict.lookup([1.0, 0.1, 0.0]) is None
+    print("✅ 相似度阈值测试通过")
+
+
+def test_lru_eviction():
+    """测试超过max_size时淘汰最久未使用的条目，命中会刷新使用顺序"""
+    print("=" * 50)
+    print("测试LRU淘汰")
+    print("=" * 50)
+
+    cache = SemanticQueryCache(max_size=2, threshold=0.99)
+    cache.store([1.0, 0.0, 0.0], "A")
+    cache.store([0.0, 1.0, 0.0], "B")
+
+    # 命中A后B成为最久未使用，写入C时淘汰B
+    assert cache.lookup([1.0, 0.0, 0.0]) == "A"
+    cache.store([0.0, 0.0, 1.0], "C")
+    assert len(cache) == 2
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0]) == "A"
+    assert cache.lookup([0.0, 0.0, 1.0]) == "C"
+
+    # max_size为0时关闭缓存
+    disabled = SemanticQueryCache(max_size=0)
+    disabled.store([1.0, 0.0, 0.0], "A")
+    assert len(disabled) == 0 and disabled.lookup([1.0, 0.0, 0.0]) is None
+    print("✅ LRU淘汰测试通过")
+
+
+def test_key_isolation():
+    """测试附加键不同的条目互不命中（知识库以max_length为键）"""
+    print("=" * 50)
+    print("测试按附加键区分")
+    print("=" * 50)
+
+    cache = SemanticQueryCache(max_size=8, threshold=0.95)
+    cache.store([1.0, 0.0, 0.0], "短上下文", key=500)
+    assert cache.lookup([1.0, 0.0, 0.0], key=1000) is None
+    assert cache.lookup([1.0, 0.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0], key=500) == "短上下文"
+
+    cache.store([1.0, 0.0, 0.0], "长上下文", key=1000)
+    assert cache.lookup([1.0, 0.0, 0.0], key=1000) == "长上下文"
+    assert cache.lookup([1.0, 0.0, 0.0], key=500) == "短上下文"
+
+    cache.clear()
+    assert len(cache) == 0
+    print("✅ 按附加键区分测试通过")
+
+
+def test_knowledge_base_invalidation():
+    """测试知识库按max_length缓存上下文，构建、添加文档和加载向量库时清空语义缓存"""
+    print("=" * 50)
+    print("测试知识库语义缓存失效")
+    print("=" * 50)
+
+    from knowledge.vector_store import MerchantKnowledgeBase
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(work_dir, "guide.md"), "w", encoding="utf-8") as f:
+            f.write("连衣裙标题建议包含季节、风格和材质。\n\n夏季促销可以突出清凉透气和限时折扣。")
+
+        kb = MerchantKnowledgeBase(knowledge_dir=work_dir, vector_store_path=os.path.join(work_dir, "vector_store"))
+        kb.embeddings = CharEmbeddings()
+        kb.build_vector_store()
+        assert kb.vector_store is not None
+
+        def fill_cache():
+            context = kb.get_relevant_context("连衣裙标题怎么写", max_length=1000)
+            assert kb.get_relevant_context("连衣裙标题怎么写", max_length=1000) == context
+            assert len(kb.semantic_cache) == 1
+            # 不同max_length单独缓存
+            kb.get_relevant_context("连衣裙标题怎么写", max_length=50)
+            assert len(kb.semantic_cache) == 2
+
+        fill_cache()
+        print(f"语义缓存统计: {kb.semantic_cache.stats.to_dict()}")
+        assert kb.semantic_cache.stats.hits == 1
+
+        kb.build_vector_store(force_rebuild=True)
+        assert len(kb.semantic_cache) == 0
+
+        fill_cache()
+        kb.add_document("新品连衣裙上架时标题加入新品二字。", {"source": "new.md"})
+        assert len(kb.semantic_cache) == 0
+
+        fill_cache()
+        kb._load_existing_vector_store()
+        assert kb.vector_store is not None
+        assert len(kb.semantic_cache) == 0
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print("✅ 知识库语义缓存失效测试通过")
+
+
+if __name__ == "__main__":
+    test_similarity_threshold()
+    test_lru_eviction()
+    test_key_isolation()
+    test_knowledge_base_invalidation()
+    print("\n🎉 所有测试通过！")
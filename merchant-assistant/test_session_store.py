@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+会话存储测试
+验证异步写入、同一会话排队状态合并、重新打开后加载、删除以及存储路径解析
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from agent.session_store import SessionStore
+
+
+def test_save_and_reload():
+    """测试异步保存后在新的存储实例（模拟重启后的worker）中加载"""
+    print("=" * 50)
+    print("测试保存与恢复")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "sessions.sqlite")
+        store = SessionStore(path)
+
+        for turn in range(5):
+            store.save_async("merchant-001", {
+                "memory": {"summary": "", "messages": [{"type": "human", "data": {"content": f"第{turn}轮"}}]},
+                "preferences": {"window": 10, "signals": []}
+            })
+        assert store.load("merchant-001")["memory"]["messages"][0]["data"]["content"] == "第4轮"
+        assert store.flush(timeout=5)
+        print(f"写入次数: {store.writes}")
+        assert 1 <= store.writes <= 5
+
+        reopened = SessionStore(path)
+        state = reopened.load("merchant-001")
+        print(f"恢复状态: {state}")
+        assert state["memory"]["messages"][0]["data"]["content"] == "第4轮"
+        assert reopened.load("merchant-002") is None
+        assert [item["session_id"] for item in reopened.list_sessions()] == ["merchant-001"]
+
+        reopened.delete("merchant-001")
+        assert reopened.load("merchant-001") is None
+    print("✅ 保存与恢复测试通过")
+
+
+def test_store_path_resolution():
+    """测试存储路径相对于项目目录解析，与启动时的工作目录无关"""
+    print("=" * 50)
+    print("测试存储路径解析")
+    print("=" * 50)
+
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        try:
+            path = Config.resolve_path(Config.SESSION_STORE_CONFIG["path"])
+        finally:
+            os.chdir(cwd)
+        absolute = os.path.join(temp_dir, "sessions.sqlite")
+        assert Config.resolve_path(absolute) == absolute
+
+    print(f"存储路径: {path}")
+    assert path == os.path.join(project_dir, "sessions", "sessions.sqlite")
+    print("✅ 存储路径解析测试通过")
+
+
+if __name__ == "__main__":
+    test_save_and_reload()
+    test_store_path_resolution()
+    print("\n🎉 所有测试通过！")
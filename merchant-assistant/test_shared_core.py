@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+共享Agent核心测试
+验证多个会话共用LLM、工具和Agent执行器，同时各自保留独立的对话记忆
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.agent_executor import MerchantAssistantAgent, SessionState, get_agent_core
+
+
+def test_sessions_share_core():
+    """测试会话共享核心但记忆互相隔离"""
+    print("=" * 50)
+    print("测试共享Agent核心")
+    print("=" * 50)
+
+    first = MerchantAssistantAgent(llm_type="mock", embedding_type="mock")
+
+    start = time.perf_counter()
+    second = MerchantAssistantAgent(llm_type="mock", embedding_type="mock")
+    session_ms = (time.perf_counter() - start) * 1000
+    print(f"新会话创建耗时: {session_ms:.2f}ms")
+
+    assert first.core is second.core is get_agent_core("mock")
+    assert first.agent_executor is second.agent_executor
+    assert first.agent_executor.memory is None
+    assert first.memory is not second.memory
+
+    first.memory.save_context({"input": "我喜欢简约风格"}, {"output": "好的"})
+    assert "简约" in first.memory.load_memory_variables({})["chat_history"]
+    assert second.memory.load_memory_variables({})["chat_history"] == ""
+    print("✅ 共享核心测试通过")
+
+
+def test_fast_path_uses_session_memory():
+    """测试快速路由结果写入各自会话的记忆"""
+    print("=" * 50)
+    print("测试会话记忆写入")
+    print("=" * 50)
+
+    first = MerchantAssistantAgent(llm_type="mock", embedding_type="mock")
+    second = MerchantAssistantAgent(llm_type="mock", embedding_type="mock")
+
+    result = first.process_request("评估这个标题的CTR：【爆款】夏季粉色连衣裙，关键词：连衣裙、粉色")
+    print(f"路由: {result.get('route')}")
+    assert result["route"] == "fast_path"
+    assert result["success"]
+    assert len(first.memory.chat_memory.messages) == 2
+    assert len(second.memory.chat_memory.messages) == 0
+    print("✅ 会话记忆测试通过")
+
+
+def test_session_state_roundtrip():
+    """测试会话状态导出后可完整恢复（会话存储的序列化格式）"""
+    print("=" * 50)
+    print("测试会话状态序列化")
+    print("=" * 50)
+
+    session = SessionState()
+    session.memory.save_context({"input": "我喜欢简约风格，主要卖给年轻女性"}, {"output": "好的，已记录"})
+
+    restored = SessionState.from_dict(session.to_dict())
+    print(f"恢复的偏好: {restored.preferences.get()}")
+    assert restored.memory.load_memory_variables({}) == session.memory.load_memory_variables({})
+    assert restored.preferences.get() == session.preferences.get()
+    assert restored.preferences.get()["preferred_styles"] == ["简约"]
+
+    # 恢复的消息不会被重复计入偏好
+    restored.memory.save_context({"input": "再来一个"}, {"output": "好的"})
+    assert restored.preferences.get()["target_audiences"] == ["年轻女性"]
+    print("✅ 会话状态序列化测试通过")
+
+
+if __name__ == "__main__":
+    test_sessions_share_core()
+    test_fast_path_uses_session_memory()
+    test_session_state_roundtrip()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+流式输出测试
+用逐块产出token的模拟LLM，验证 Final Answer 过滤、工具事件与token的顺序，以及工作线程异常的传递
+"""
+
+import sys
+import os
+import queue
+import time
+from typing import Any, Iterator, List, Optional
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+from agent.agent_executor import AgentCore, MerchantAssistantAgent
+from agent.intent_router import route_request
+from agent.streaming import StreamingEventHandler
+
+
+class FakeStreamingLLM(LLM):
+    """按顺序返回预设回复的模拟LLM，每次产出chunk_size个字符，使 Final Answer 标记跨块出现"""
+
+    responses: List[str]
+    chunk_size: int = 3
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake_streaming"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        response = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        for start in range(0, len(response), self.chunk_size):
+            chunk = GenerationChunk(text=response[start:start + self.chunk_size])
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class FakeAgentCore(AgentCore):
+    """使用模拟LLM构建的Agent核心，不注册为进程共享核心"""
+
+    def __init__(self, llm: FakeStreamingLLM):
+        self.fake_llm = llm
+        super().__init__("mock")
+
+    def _init_llm(self):
+        return self.fake_llm
+
+
+def drain(events: queue.Queue) -> list:
+    items = []
+    while not events.empty():
+        items.append(events.get_nowait())
+    return items
+
+
+def test_final_answer_filtering():
+    """测试只转发 Final Answer 之后的token，标记跨块时不丢字，工具内部的LLM调用不产生token事件"""
+    print("=" * 50)
+    print("测试Final Answer过滤")
+    print("=" * 50)
+
+    events = queue.Queue()
+    handler = StreamingEventHandler(events)
+
+    llm = FakeStreamingLLM(responses=["Thought: 现在我知道最终答案了\nFinal Answer: 推荐使用爆款风格标题"])
+    llm.invoke("问题", config={"callbacks": [handler]})
+    tokens = drain(events)
+    print(f"token事件: {tokens}")
+    assert all(event["type"] == "token" for event in tokens)
+    assert len(tokens) > 1
+    assert "".join(event["text"] for event in tokens) == "推荐使用爆款风格标题"
+
+    # 工具内部的标题生成调用不含标记，不应出现在回答中
+    tool_llm = FakeStreamingLLM(responses=["夏季新款粉色连衣裙"])
+    tool_llm.invoke("生成标题", config={"callbacks": [handler]})
+    assert drain(events) == []
+    assert handler._buffers == {} and handler._emitted == {}
+    print("✅ Final Answer过滤测试通过")
+
+
+def test_stream_request_ordering():
+    """测试stream_request按 工具开始 -> 工具结束 -> 回答token -> final 的顺序产出事件"""
+    print("=" * 50)
+    print("测试流式事件顺序")
+    print("=" * 50)
+
+    user_input = "你好，帮我看看店铺整体情况怎么样"
+    assert route_request(user_input) is None
+
+    answer = "标题包含热门关键词，预估点击率良好"
+    llm = FakeStreamingLLM(responses=[
+        "Thought: 需要评估标题\nAction: estimate_ctr\nAction Input: 夏季新款粉色连衣裙",
+        f"Thought: 现在我知道最终答案了\nFinal Answer: {answer}"
+    ])
+    agent = MerchantAssistantAgent(llm_type="mock", embedding_type="mock")
+    agent.core = FakeAgentCore(llm)
+
+    events = list(agent.stream_request(user_input))
+    types = [event["type"] for event in events]
+    print(f"事件顺序: {types}")
+
+    assert types[0] == "tool_start" and events[0]["tool"] == "estimate_ctr"
+    assert types[1] == "tool_end"
+    assert types[-1] == "final"
+    assert set(types[2:-1]) == {"token"}
+    assert "".join(event["text"] for event in events[2:-1]) == answer
+
+    final = events[-1]
+    assert final["success"] is True
+    assert final["response"] == answer
+    assert answer in agent.memory.load_memory_variables({})["chat_history"]
+    print("✅ 流式事件顺序测试通过")
+
+
+def test_worker_exception_propagates():
+    """测试工作线程异常：已产出的事件照常返回，随后在调用方重新抛出，而不是阻塞等待"""
+    print("=" * 50)
+    print("测试工作线程异常传递")
+    print("=" * 50)
+
+    agent = MerchantAssistantAgent(llm_type="mock", embedding_type="mock")
+
+    def failing_process_request(user_input, callbacks=None):
+        callbacks[0].on_tool_start({"name": "estimate_ctr"}, "夏季新款粉色连衣裙")
+        raise RuntimeError("工作线程异常")
+
+    agent.process_request = failing_process_request
+
+    received = []
+    started = time.perf_counter()
+    try:
+        for event in agent.stream_request("评估这个标题"):
+            received.append(event)
+        assert False, "应抛出RuntimeError"
+    except RuntimeError as e:
+        elapsed = time.perf_counter() - started
+        print(f"收到事件: {received}，异常: {e}，耗时 {elapsed:.3f}s")
+        assert str(e) == "工作线程异常"
+        assert elapsed < 5
+
+    assert [event["type"] for event in received] == ["tool_start"]
+    print("✅ 工作线程异常传递测试通过")
+
+
+if __name__ == "__main__":
+    test_final_answer_filtering()
+    test_stream_request_ordering()
+    test_worker_exception_propagates()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+摘要式对话记忆测试
+验证token预算约束、早期轮次折叠为摘要以及清空逻辑
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.summary_memory import SummarizingTokenBufferMemory, estimate_tokens
+
+
+def test_token_budget():
+    """测试多轮长对话后记忆仍在token预算内"""
+    print("=" * 50)
+    print("测试token预算")
+    print("=" * 50)
+
+    memory = SummarizingTokenBufferMemory(max_token_limit=300, summary_token_limit=80)
+    long_report = "营销策略建议：" + "投放小红书种草内容，配合直播间限时折扣。" * 20
+
+    for turn in range(10):
+        memory.save_context({"input": f"第{turn}轮：帮我分析连衣裙的推广策略"}, {"output": long_report})
+
+    assert memory.wait_for_summary(timeout=5)
+    history = memory.load_memory_variables({})["chat_history"]
+    stats = memory.get_stats()
+    print(f"记忆统计: {stats}")
+    print(f"历史长度: {estimate_tokens(history)} tokens")
+
+    assert estimate_tokens(history) <= 300 + 20  # 允许"对话摘要："等前缀
+    assert stats["summary_count"] >= 1
+    assert "对话摘要" in history
+    assert "第9轮" in history
+    print("✅ token预算测试通过")
+
+
+def test_short_conversation_kept_verbatim():
+    """测试预算内的对话保持原文"""
+    print("=" * 50)
+    print("测试短对话保留原文")
+    print("=" * 50)
+
+    memory = SummarizingTokenBufferMemory(max_token_limit=2000, summary_token_limit=500)
+    memory.save_context({"input": "我喜欢简约风格的标题"}, {"output": "好的，已记录您的偏好"})
+
+    history = memory.load_memory_variables({})["chat_history"]
+    print(history)
+    assert history == "Human: 我喜欢简约风格的标题\nAI: 好的，已记录您的偏好"
+
+    memory.clear()
+    assert memory.load_memory_variables({})["chat_history"] == ""
+    print("✅ 短对话测试通过")
+
+
+if __name__ == "__main__":
+    test_token_budget()
+    test_short_conversation_kept_verbatim()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+多候选标题生成测试
+验证单次调用的候选解析、本地评分择优，以及仅在全部候选不达标时二次优化
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from agent.tools.merchant_tools import generate_product_title, use_llm, _parse_title_candidates
+
+
+class RecordingLLM:
+    """按顺序返回预设输出并记录调用次数的LLM"""
+
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.prompts = []
+        self.options = []
+
+    def invoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        self.options.append(kwargs)
+        return self.outputs[min(len(self.prompts), len(self.outputs)) - 1]
+
+
+def test_parse_candidates():
+    """测试JSON数组与编号列表两种输出格式"""
+    print("=" * 50)
+    print("测试候选标题解析")
+    print("=" * 50)
+
+    titles = _parse_title_candidates('["【爆款】粉色连衣裙 夏季新款", "甜美粉色连衣裙", "【爆款】粉色连衣裙 夏季新款"]', 4)
+    print(f"JSON输出: {titles}")
+    assert titles == ["【爆款】粉色连衣裙 夏季新款", "甜美粉色连衣裙"]
+
+    titles = _parse_title_candidates("1. 甜美粉色连衣裙\n2、仙女风夏季连衣裙", 4)
+    print(f"编号列表: {titles}")
+    assert titles == ["甜美粉色连衣裙", "仙女风夏季连衣裙"]
+    print("✅ 候选解析测试通过")
+
+
+def test_best_candidate_single_call():
+    """测试达标候选直接返回，只调用一次LLM"""
+    print("=" * 50)
+    print("测试单次调用择优")
+    print("=" * 50)
+
+    llm = RecordingLLM(['["粉色裙子", "【爆款】甜美少女心粉色连衣裙 夏季新款"]'])
+    with use_llm(llm):
+        title = generate_product_title.invoke({
+            "product_info": "粉色连衣裙，夏季新款，129元",
+            "style": "爆款",
+            "target_audience": "年轻女性"
+        })
+
+    print(f"最优标题: {title}，LLM调用 {len(llm.prompts)} 次")
+    assert title == "【爆款】甜美少女心粉色连衣裙 夏季新款"
+    assert len(llm.prompts) == 1
+    assert "JSON数组" in llm.prompts[0]
+    assert llm.options[0]["num_predict"] == Config.GENERATION_BUDGETS["title_candidates"]["num_predict"]
+    print("✅ 单次调用测试通过")
+
+
+def test_optimize_when_all_candidates_fail():
+    """测试全部候选不达标时才进行二次优化"""
+    print("=" * 50)
+    print("测试全部候选不达标")
+    print("=" * 50)
+
+    llm = RecordingLLM(['["裙子", "衣服"]', "【爆款】甜美少女心粉色连衣裙 夏季新款"])
+    with use_llm(llm):
+        title = generate_product_title.invoke({
+            "product_info": "粉色连衣裙，夏季新款，129元",
+            "style": "爆款",
+            "target_audience": "年轻女性"
+        })
+
+    print(f"优化后标题: {title}，LLM调用 {len(llm.prompts)} 次")
+    assert len(llm.prompts) == 2
+    assert title == "【爆款】甜美少女心粉色连衣裙 夏季新款"
+    print("✅ 二次优化测试通过")
+
+
+if __name__ == "__main__":
+    test_parse_candidates()
+    test_best_candidate_single_call()
+    test_optimize_when_all_candidates_fail()
+    print("\n🎉 所有测试通过！")
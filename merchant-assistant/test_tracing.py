@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+请求链路追踪测试
+验证span嵌套、跨线程传递、错误状态、按请求采样以及JSON Lines后台导出与轮转
+"""
+
+import sys
+import os
+import json
+import tempfile
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from tracing import Tracer, traced, trace_span, start_span, get_tracer
+
+
+@traced(kind="tool", record_output=True)
+def fake_tool(text: str) -> str:
+    span = start_span("llm.generate", kind="llm", prompt_chars=len(text))
+    span.set(completion_chars=4)
+    span.end()
+    return "生成结果"
+
+
+def test_nested_spans():
+    """测试span嵌套与跨线程传递"""
+    print("=" * 50)
+    print("测试span嵌套")
+    print("=" * 50)
+
+    Config.TRACING_CONFIG["enabled"] = True
+    tracer = get_tracer()
+    tracer.clear()
+
+    with trace_span("agent.process_request", kind="request", input_chars=6):
+        fake_tool("连衣裙标题")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, fake_tool, "耳机") for _ in range(2)]
+            [future.result() for future in futures]
+
+    trace = tracer.get_traces()[0]
+    spans = {span["span_id"]: span for span in trace["spans"]}
+    print(f"trace: {trace['name']} {trace['duration_ms']}ms, {len(spans)} spans")
+
+    assert trace["name"] == "agent.process_request"
+    assert len(spans) == 7
+    root = next(span for span in spans.values() if span["parent_id"] is None)
+    tools = [span for span in spans.values() if span["kind"] == "tool"]
+    assert len(tools) == 3
+    assert all(span["parent_id"] == root["span_id"] for span in tools)
+    assert all(spans[span["parent_id"]]["kind"] == "tool" for span in spans.values() if span["kind"] == "llm")
+    assert tools[0]["attributes"]["output_chars"] == 4
+    print("✅ span嵌套测试通过")
+
+
+def test_error_and_export():
+    """测试错误状态记录与JSONL导出"""
+    print("=" * 50)
+    print("测试错误状态与导出")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        export_path = os.path.join(temp_dir, "traces.jsonl")
+        tracer = Tracer(max_traces=5, export_path=export_path)
+
+        try:
+            with tracer.span("kb.search", kind="retrieval", k=3):
+                raise ValueError("索引未加载")
+        except ValueError:
+            pass
+
+        tracer.flush()
+        with open(export_path, encoding="utf-8") as f:
+            exported = [json.loads(line) for line in f]
+        print(f"导出: {exported}")
+        assert len(exported) == 1
+        assert exported[0]["status"] == "error"
+        assert "索引未加载" in exported[0]["error"]
+        assert exported[0]["attributes"] == {"k": 3}
+    print("✅ 错误状态与导出测试通过")
+
+
+def test_sampling():
+    """测试按请求采样：未采样的请求连同子调用整条不记录"""
+    print("=" * 50)
+    print("测试按请求采样")
+    print("=" * 50)
+
+    for sample_rate, expected in [(0.0, 0), (1.0, 3)]:
+        tracer = Tracer(max_traces=5, sample_rate=sample_rate)
+        for _ in range(3):
+            with tracer.span("agent.process_request", kind="request") as root:
+                child = tracer.start_span("llm.generate", kind="llm")
+                child.set(prompt_chars=10)
+                child.end()
+                with tracer.span("kb.search", kind="retrieval"):
+                    pass
+                root.set(output_chars=4)
+        traces = tracer.get_traces()
+        print(f"采样率 {sample_rate}: 记录 {len(traces)} 条trace")
+        assert len(traces) == expected
+        assert all(len(trace["spans"]) == 3 for trace in traces)
+    print("✅ 按请求采样测试通过")
+
+
+def test_export_rotation():
+    """测试导出文件超过大小上限后轮转，只保留指定数量的旧文件"""
+    print("=" * 50)
+    print("测试导出轮转")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        export_path = os.path.join(temp_dir, "traces.jsonl")
+        tracer = Tracer(max_traces=5, export_path=export_path, max_export_bytes=200, export_backups=2)
+        for index in range(6):
+            with tracer.span(f"request-{index}", kind="request"):
+                pass
+        tracer.flush()
+
+        files = sorted(os.listdir(temp_dir))
+        print(f"导出文件: {files}")
+        assert files == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+        with open(export_path, encoding="utf-8") as f:
+            assert json.loads(f.readlines()[-1])["name"] == "request-5"
+    print("✅ 导出轮转测试通过")
+
+
+if __name__ == "__main__":
+    test_nested_spans()
+    test_error_and_export()
+    test_sampling()
+    test_export_rotation()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+向量量化测试
+用确定性的模拟embedding按每种向量存储格式构建知识库，验证索引类型、索引内存缩减、
+相对float32的召回率报告，以及量化索引与构建统计的保存和加载
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import zlib
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from knowledge.vector_store import MerchantKnowledgeBase, VECTOR_STORAGE_TYPES
+
+
+class SeededEmbeddings:
+    """以文本CRC为随机种子生成的确定性embedding，相同文本在不同实例中向量一致"""
+
+    dimension = 128
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        return rng.standard_normal(self.dimension).astype(np.float32).tolist()
+
+
+def write_documents(knowledge_dir: str, count: int = 60):
+    """生成足够切分出数十个文本块的知识文档"""
+    paragraphs = [
+        f"第{i}条运营经验：{'标题关键词、主图卖点和价格区间' if i % 2 else '详情页结构、评价维护和活动节奏'}"
+        f"需要结合类目特点持续优化，" * 6
+        for i in range(count)
+    ]
+    with open(os.path.join(knowledge_dir, "operations.md"), "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs))
+
+
+def test_quantized_builds():
+    """测试各向量存储格式的索引类型、内存占用、召回率报告与保存加载"""
+    print("=" * 50)
+    print("测试向量量化")
+    print("=" * 50)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        write_documents(work_dir)
+        memory = {}
+
+        for storage in VECTOR_STORAGE_TYPES:
+            store_path = os.path.join(work_dir, f"vector_store_{storage}")
+            kb = MerchantKnowledgeBase(knowledge_dir=work_dir, vector_store_path=store_path, vector_storage=storage)
+            kb.embeddings = SeededEmbeddings()
+            kb.build_vector_store()
+
+            stats = kb.get_stats()
+            report = stats["quantization_report"]
+            print(f"{storage}: 索引 {stats['index_type']}，{stats['document_count']} 条向量，"
+                  f"内存 {stats['index_memory_bytes']} 字节，量化报告 {report}")
+            assert stats["document_count"] >= 20
+            assert stats["vector_storage"] == storage
+            assert stats["embedding_dimension"] == SeededEmbeddings.dimension
+            memory[storage] = stats["index_memory_bytes"]
+
+            if storage == "float32":
+                assert stats["index_type"].startswith("IndexFlat")
+                assert report == {}
+            else:
+                assert stats["index_type"] == "IndexScalarQuantizer"
+                assert report["storage"] == storage
+                assert 0 < report["recall_vs_float32"] <= 1
+                assert report["recall_delta"] == round(report["recall_vs_float32"] - 1.0, 4)
+                assert report["memory_bytes"] < report["float32_memory_bytes"]
+                if storage == "fp16":
+                    assert report["recall_vs_float32"] >= 0.9
+
+            # 重新加载：索引格式、检索结果与构建统计保持一致
+            query = "标题关键词怎么优化"
+            expected = [result["content"] for result in kb.search(query, k=3)]
+            loaded = MerchantKnowledgeBase(knowledge_dir=work_dir, vector_store_path=store_path, vector_storage=storage)
+            loaded.embeddings = SeededEmbeddings()
+            loaded_stats = loaded.get_stats()
+            assert loaded_stats["vector_storage"] == storage
+            assert loaded_stats["index_type"] == stats["index_type"]
+            assert loaded_stats["document_count"] == stats["document_count"]
+            assert loaded_stats["last_build_timings"] == stats["last_build_timings"]
+            assert loaded_stats["quantization_report"] == report
+            assert [result["content"] for result in loaded.search(query, k=3)] == expected
+
+        assert memory["sq8"] < memory["fp16"] < memory["float32"]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print("✅ 向量量化测试通过")
+
+
+if __name__ == "__main__":
+    test_quantized_builds()
+    print("\n🎉 所有测试通过！")
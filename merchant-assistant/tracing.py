@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+请求链路追踪模块
+为LLM调用、工具调用、商品信息预处理和知识库检索记录结构化span，
+span通过contextvars沿调用链（含线程池和协程）嵌套，一次顶层调用构成一条trace；
+完成的trace保留在内存中供分析页展示瀑布图，并由后台线程按span逐行导出为JSON Lines（按大小轮转）；
+开启后按请求采样，未采样的请求整条不记录
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import asyncio
+import threading
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from config import Config
+
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("merchant_current_span", default=None)
+
+
+class Span:
+    """一次被追踪的操作"""
+
+    def __init__(self, trace: "Trace", name: str, kind: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes)
+        self.start_time = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status = "ok"
+        self.error = ""
+        self.thread = threading.current_thread().name
+
+    def set(self, **attributes):
+        """补充span属性（如生成长度、命中缓存等）"""
+        self.attributes.update(attributes)
+
+    def end(self, error: BaseException = None):
+        """结束span；顶层span结束时整条trace完成"""
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = round((time.perf_counter() - self._start_perf) * 1000, 3)
+        if error is not None:
+            self.status = "cancelled" if isinstance(error, (asyncio.CancelledError, GeneratorExit)) else "error"
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace.on_span_end(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "thread": self.thread,
+            "attributes": self.attributes
+        }
+
+
+class Trace:
+    """一次顶层调用产生的全部span"""
+
+    def __init__(self, tracer: "Tracer"):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex
+        self.root: Optional[Span] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def on_span_end(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+        if span is self.root:
+            self.tracer.finish_trace(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda item: item.start_time)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "start_time": self.root.start_time,
+            "duration_ms": self.root.duration_ms,
+            "status": self.root.status,
+            "spans": [span.to_dict() for span in spans]
+        }
+
+
+class Tracer:
+    """追踪器：保存最近完成的trace，由后台线程导出JSON Lines"""
+
+    def __init__(self, max_traces: int = 50, export_path: str = None, sample_rate: float = 1.0,
+                 max_export_bytes: int = 0, export_backups: int = 3, export_queue_size: int = 1000):
+        """
+        Args:
+            max_traces: 内存中保留的最近trace数
+            export_path: JSON Lines导出文件，为空时不导出
+            sample_rate: 记录的请求比例（0~1），按顶层调用采样
+            max_export_bytes: 导出文件超过该大小时轮转，0表示不轮转
+            export_backups: 保留的轮转文件数
+            export_queue_size: 待导出trace的队列长度，写入跟不上时丢弃新的trace并计数
+        """
+        self.export_path = export_path
+        self.sample_rate = sample_rate
+        self.max_export_bytes = max_export_bytes
+        self.export_backups = export_backups
+        self.dropped_exports = 0
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+        self._export_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=export_queue_size)
+        self._writer: Optional[threading.Thread] = None
+
+    def start_span(self, name: str, kind: str = "function", **attributes):
+        """
+        创建span（不切换当前span，适用于LLM调用等叶子节点）
+
+        当前上下文没有活动span时按采样率新建一条trace，该span即为根span；
+        未被采样的请求及其子调用返回空span
+        """
+        parent = _current_span.get()
+        if isinstance(parent, _NullSpan):
+            return parent
+        if parent is not None and parent.duration_ms is None:
+            return Span(parent.trace, name, kind, parent.span_id, attributes)
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return _NullSpan()
+        trace = Trace(self)
+        span = Span(trace, name, kind, None, attributes)
+        trace.root = span
+        return span
+
+    @contextmanager
+    def span(self, name: str, kind: str = "function", **attributes):
+        """创建span并设为当前span，期间的子调用嵌套在其下（未采样时子调用同样不记录）"""
+        span = self.start_span(name, kind, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        else:
+            span.end()
+        finally:
+            _current_span.reset(token)
+
+    def finish_trace(self, trace: Trace):
+        """保存完成的trace，并交给后台线程导出"""
+        record = trace.to_dict()
+        with self._lock:
+            self._traces.append(record)
+            if not self.export_path:
+                return
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._export_loop, name="trace-exporter", daemon=True)
+                self._writer.start()
+        try:
+            self._export_queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped_exports += 1
+
+    def flush(self):
+        """等待已完成的trace全部写入导出文件"""
+        if self._writer is not None:
+            self._export_queue.join()
+
+    def _export_loop(self):
+        while True:
+            record = self._export_queue.get()
+            try:
+                self._export(record)
+            except OSError as e:
+                print(f"⚠️ trace导出失败: {e}")
+            finally:
+                self._export_queue.task_done()
+
+    def _export(self, record: Dict[str, Any]):
+        os.makedirs(os.path.dirname(os.path.abspath(self.export_path)), exist_ok=True)
+        if self.max_export_bytes and os.path.exists(self.export_path) \
+                and os.path.getsize(self.export_path) >= self.max_export_bytes:
+            self._rotate()
+        with open(self.export_path, "a", encoding="utf-8") as f:
+            for span in record["spans"]:
+                f.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+
+    def _rotate(self):
+        """traces.jsonl -> traces.jsonl.1 -> … -> traces.jsonl.N，超出保留数的最旧文件删除"""
+        if self.export_backups <= 0:
+            os.remove(self.export_path)
+            return
+        for index in range(self.export_backups - 1, 0, -1):
+            source = f"{self.export_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.export_path}.{index + 1}")
+        os.replace(self.export_path, f"{self.export_path}.1")
+
+    def get_traces(self) -> List[Dict[str, Any]]:
+        """获取最近完成的trace（最新的在前）"""
+        with self._lock:
+            return list(reversed(self._traces))
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+_tracer = Tracer(
+    max_traces=Config.TRACING_CONFIG["max_traces"],
+    export_path=Config.resolve_path(Config.TRACING_CONFIG["export_path"]),
+    sample_rate=Config.TRACING_CONFIG["sample_rate"],
+    max_export_bytes=Config.TRACING_CONFIG["max_export_bytes"],
+    export_backups=Config.TRACING_CONFIG["export_backups"]
+)
+# 退出前写完队列中的trace
+atexit.register(_tracer.flush)
+
+
+def get_tracer() -> Tracer:
+    """获取进程内共享的追踪器"""
+    return _tracer
+
+
+def current_span() -> Optional[Span]:
+    """当前活动span（未被采样的请求中为空span）"""
+    return _current_span.get()
+
+
+def annotate_span(**attributes):
+    """为当前活动span补充属性，没有活动span时忽略"""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def trace_span(name: str, kind: str = "function", **attributes):
+    """创建并激活span的上下文管理器；关闭追踪时不记录"""
+    if not Config.TRACING_CONFIG["enabled"]:
+        return _NullSpanContext()
+    return _tracer.span(name, kind, **attributes)
+
+
+def start_span(name: str, kind: str = "function", **attributes):
+    """创建不激活的span，需手动调用 end()；关闭追踪时返回空span"""
+    if not Config.TRACING_CONFIG["enabled"]:
+        return _NullSpan()
+    return _tracer.start_span(name, kind, **attributes)
+
+
+def traced(name: str = None, kind: str = "function", attributes: Callable[..., Dict[str, Any]] = None,
+           record_output: bool = False):
+    """
+    追踪函数调用的装饰器，支持同步函数和协程函数
+
+    Args:
+        name: span名称，默认使用函数名
+        kind: span类型（request/tool/llm/retrieval/function）
+        attributes: 根据调用参数生成span属性的函数
+        record_output: 是否记录返回值长度（output_chars）
+    """
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with trace_span(span_name, kind, **(attributes(*args, **kwargs) if attributes else {})) as span:
+                    result = await fn(*args, **kwargs)
+                    if record_output:
+                        span.set(output_chars=len(str(result)))
+                    return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace_span(span_name, kind, **(attributes(*args, **kwargs) if attributes else {})) as span:
+                result = fn(*args, **kwargs)
+                if record_output:
+                    span.set(output_chars=len(str(result)))
+                return result
+        return wrapper
+
+    return decorator
+
+
+class _NullSpan:
+    """关闭追踪或请求未被采样时使用的空span"""
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, error: BaseException = None):
+        pass
+
+
+class _NullSpanContext:
+    def __enter__(self):
+        return _NullSpan()
+
+    def __exit__(self, *exc_info):
+        return False
@@ -7,24 +7,101 @@
 import streamlit as st
 import sys
 import os
+import re
 import json
+import secrets
+import altair as alt
+from contextlib import nullcontext
 from typing import Dict, Any
 
 # 添加父目录到path以便导入agent模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from config import Config
 from agent.agent_executor import MerchantAssistantAgent
+from agent.llm_client import get_ollama_pool_stats, get_generation_measurements
+from agent.llm_cache import bypass_llm_cache, get_llm_cache
+from agent.memo import get_memo_stats, clear_memo_caches
+from agent.model_router import get_model_router
 from agent.tools.merchant_tools import (
     generate_product_title,
     suggest_strategy,
     estimate_ctr,
-    analyze_competitor_title
+    analyze_competitor_title,
+    use_llm
 )
+from knowledge.vector_store import MerchantKnowledgeBase
+from tracing import get_tracer
+
+
+@st.cache_resource
+def get_knowledge_base(embedding_type: str) -> MerchantKnowledgeBase:
+    """获取进程内共享的知识库实例"""
+    return MerchantKnowledgeBase(embedding_type=embedding_type)
+
+
+def session_llm():
+    """当前浏览器会话的LLM，直接调用工具时通过use_llm传入，避免与其他会话互相覆盖"""
+    assistant = st.session_state.assistant
+    return assistant.llm if assistant is not None else None
+
+
+# 会话令牌：服务端随机生成（token_urlsafe(24) 为32个URL安全字符），不可猜测
+SESSION_TOKEN_PATTERN = re.compile(r"^[A-Za-z0-9_-]{32}$")
+
+
+def session_token() -> str:
+    """
+    当前浏览器会话的令牌，对话记忆与偏好按该令牌保存
+
+    令牌由服务端随机生成并写回URL参数，刷新页面后凭同一URL恢复会话；
+    只接受服务端生成格式的令牌，无法通过填写商家ID等可编辑字段读取其他会话的记录
+    """
+    token = st.session_state.get("session_token") or st.query_params.get("session")
+    if not token or not SESSION_TOKEN_PATTERN.match(token):
+        token = secrets.token_urlsafe(24)
+    st.session_state.session_token = token
+    st.query_params["session"] = token
+    return token
+
+
+def chat_history_from_memory(assistant: MerchantAssistantAgent) -> list:
+    """由恢复的对话记忆重建页面上的对话记录"""
+    return [
+        {"role": "user" if message.type == "human" else "assistant", "content": message.content}
+        for message in assistant.memory.chat_memory.messages
+    ]
+
+
+def build_waterfall_rows(trace: Dict[str, Any]) -> list:
+    """将trace中的span按调用层级展开为瀑布图数据"""
+    children = {}
+    for span in trace["spans"]:
+        children.setdefault(span["parent_id"], []).append(span)
+    
+    rows = []
+    
+    def visit(span, depth):
+        offset_ms = (span["start_time"] - trace["start_time"]) * 1000
+        rows.append({
+            "span": f"{len(rows):02d} " + "　" * depth + span["name"],
+            "kind": span["kind"],
+            "start_ms": round(offset_ms, 1),
+            "end_ms": round(offset_ms + (span["duration_ms"] or 0), 1),
+            "duration_ms": span["duration_ms"],
+            "status": span["status"],
+            "attributes": json.dumps(span["attributes"], ensure_ascii=False, default=str)
+        })
+        for child in sorted(children.get(span["span_id"], []), key=lambda item: item["start_time"]):
+            visit(child, depth + 1)
+    
+    for root in children.get(None, []):
+        visit(root, 0)
+    return rows
 
 
 def init_session_state():
     """初始化session state"""
-<<<<<<< HEAD
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
     
@@ -34,6 +111,9 @@ def init_session_state():
     if 'assistant' not in st.session_state:
         st.session_state.assistant = None
     
+    if 'current_session_id' not in st.session_state:
+        st.session_state.current_session_id = None
+    
     # 初始化工具结果存储
     if 'tool_results' not in st.session_state:
         st.session_state.tool_results = {
@@ -42,13 +122,6 @@ def init_session_state():
             'ctr_evaluation': None,
             'competitor_analysis': None
         }
-=======
-    if 'assistant' not in st.session_state:
-        st.session_state.assistant = MerchantAssistantAgent()
-    
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
 
 
 def main():
@@ -87,13 +160,19 @@ def main():
         )
         
         if model_type == "Ollama模式":
-<<<<<<< HEAD
             model_name = st.text_input("模型名称", value="qwen2.5:7b")
             model_url = st.text_input("服务地址", value="http://localhost:11434")
         
+        # 对话记忆与偏好按服务端生成的会话令牌保存，凭当前页面URL可恢复；新会话使用新的令牌
+        if st.button("🆕 开始新会话", help="对话记忆与偏好随当前页面URL保存，重新打开该URL或服务重启后自动恢复"):
+            st.session_state.session_token = secrets.token_urlsafe(24)
+        session_id = f"web-{session_token()}"
+        
         # 检查是否需要重新初始化assistant
-        if st.session_state.current_model_type != model_type or st.session_state.assistant is None:
+        if (st.session_state.current_model_type != model_type or st.session_state.assistant is None
+                or st.session_state.current_session_id != session_id):
             st.session_state.current_model_type = model_type
+            st.session_state.current_session_id = session_id
             
             # 根据选择的模式设置LLM类型
             if model_type == "Ollama模式":
@@ -103,22 +182,19 @@ def main():
                 llm_type = "mock"
                 embedding_type = "mock"
             
-            # 重新初始化assistant
+            # 创建本会话的assistant：LLM、工具和Agent执行器取自进程内共享核心，
+            # 会话记忆与偏好按会话令牌从会话存储恢复（没有记录时新建）
             st.session_state.assistant = MerchantAssistantAgent(
                 llm_type=llm_type,
-                embedding_type=embedding_type
+                embedding_type=embedding_type,
+                session_id=session_id
             )
             
-            # 清除对话历史
-            st.session_state.chat_history = []
+            # 按恢复的记忆重建对话记录
+            st.session_state.chat_history = chat_history_from_memory(st.session_state.assistant)
             
             st.success(f"✅ 已切换到{model_type}")
         
-=======
-            model_name = st.text_input("模型名称", value="qwen2")
-            model_url = st.text_input("服务地址", value="http://localhost:11434")
-        
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
         # 全局参数
         st.subheader("默认参数")
         default_audience = st.selectbox(
@@ -175,10 +251,12 @@ def main():
                 key="solution_budget"
             )
             
+            regenerate_solution = st.checkbox("重新生成（不使用缓存结果）", key="solution_regenerate",
+                                              disabled=get_llm_cache() is None)
             generate_solution = st.button("🚀 生成完整解决方案", type="primary")
         
         if generate_solution and product_info:
-            with st.spinner("正在生成解决方案..."):
+            with st.spinner("正在生成解决方案..."), (bypass_llm_cache() if regenerate_solution else nullcontext()):
                 solution = st.session_state.assistant.generate_complete_solution(
                     product_info=product_info,
                     competitor_title=competitor_title if competitor_title else None,
@@ -186,7 +264,6 @@ def main():
                     budget=budget
                 )
                 
-<<<<<<< HEAD
                 # 保存解决方案到session state
                 st.session_state.last_solution = solution
                 
@@ -194,11 +271,22 @@ def main():
         if hasattr(st.session_state, 'last_solution') and st.session_state.last_solution:
             solution = st.session_state.last_solution
             if solution["success"]:
-=======
-                if solution["success"]:
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
                     # 显示结果
-                    st.success("✅ 解决方案生成成功！")
+                    if solution.get("partial"):
+                        section_labels = {
+                            "generated_titles": "标题生成",
+                            "ctr_evaluations": "CTR评估",
+                            "strategy_suggestion": "营销策略",
+                            "competitor_analysis": "竞品分析",
+                            "recommended_title": "推荐标题"
+                        }
+                        unfinished = [
+                            f"{section_labels.get(name, name)}（{'部分完成' if status == 'partial' else '未完成'}）"
+                            for name, status in solution["sections"].items() if status != "done"
+                        ]
+                        st.warning(f"⏱️ 已达到时间预算，以下部分未完成：{'、'.join(unfinished)}")
+                    else:
+                        st.success("✅ 解决方案生成成功！")
                     
                     # 推荐标题
                     st.subheader("🏆 推荐标题")
@@ -242,7 +330,10 @@ def main():
                     
                     # 策略建议
                     st.subheader("💡 营销策略建议")
-                    st.info(solution["strategy_suggestion"])
+                    if solution["strategy_suggestion"] is not None:
+                        st.info(solution["strategy_suggestion"])
+                    else:
+                        st.caption("营销策略未在时间预算内完成，可稍后重新生成")
                     
                     # 竞品分析
                     if "competitor_analysis" in solution:
@@ -270,7 +361,6 @@ def main():
                         st.write("**差异化建议：**")
                         for suggestion in comp_analysis["differentiation_suggestions"]:
                             st.write(f"• {suggestion}")
-<<<<<<< HEAD
             else:
                 st.error(f"❌ 生成失败：{solution.get('error', '未知错误')}")
                 
@@ -279,10 +369,6 @@ def main():
             if 'last_solution' in st.session_state:
                 del st.session_state.last_solution
             st.rerun()
-=======
-                else:
-                    st.error(f"❌ 生成失败：{solution.get('error', '未知错误')}")
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
     
     with tab2:
         st.header("🔧 单项工具测试")
@@ -302,8 +388,9 @@ def main():
                 product_input = st.text_area("商品信息", height=100)
             with col2:
                 title_style = st.selectbox("标题风格", ["爆款", "简约", "高端"], key="title_style_select")
-<<<<<<< HEAD
                 title_audience = st.selectbox("目标受众", ["年轻女性", "中年女性", "年轻男性", "学生", "通用"], key="title_audience_select")
+                regenerate_title = st.checkbox("重新生成（不使用缓存结果）", key="title_regenerate",
+                                               disabled=get_llm_cache() is None)
                 generate_title = st.button("生成标题")
             
             if generate_title and product_input:
@@ -311,7 +398,8 @@ def main():
                 if st.session_state.assistant is None:
                     st.error("请先在侧边栏选择模式初始化系统")
                 else:
-                    with st.spinner("正在生成标题..."):
+                    with st.spinner("正在生成标题..."), use_llm(session_llm()), \
+                            (bypass_llm_cache() if regenerate_title else nullcontext()):
                         result = generate_product_title.invoke({
                             "product_info": product_input,
                             "style": title_style,
@@ -337,16 +425,6 @@ def main():
                 if st.button("🗑️ 清除标题结果"):
                     st.session_state.tool_results['title_generation'] = None
                     st.rerun()
-=======
-                generate_title = st.button("生成标题")
-            
-            if generate_title and product_input:
-                result = generate_product_title.invoke({
-                    "product_info": product_input,
-                    "style": title_style
-                })
-                st.success(f"生成的标题：**{result}**")
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
         
         elif tool_option == "策略推荐":
             st.subheader("💡 策略推荐工具")
@@ -359,7 +437,6 @@ def main():
             with col3:
                 budget_level = st.selectbox("预算", ["低", "中等", "高"], key="strategy_budget")
             
-<<<<<<< HEAD
             strategy_product_info = st.text_area("商品详细信息（可选）", height=80, key="strategy_product_info")
             
             if st.button("获取策略建议"):
@@ -367,7 +444,7 @@ def main():
                 if st.session_state.assistant is None:
                     st.error("请先在侧边栏选择模式初始化系统")
                 else:
-                    with st.spinner("正在生成策略..."):
+                    with st.spinner("正在生成策略..."), use_llm(session_llm()):
                         result = suggest_strategy.invoke({
                             "product_type": product_type,
                             "target_audience": audience,
@@ -394,15 +471,6 @@ def main():
                 if st.button("🗑️ 清除策略结果"):
                     st.session_state.tool_results['strategy_suggestion'] = None
                     st.rerun()
-=======
-            if st.button("获取策略建议"):
-                result = suggest_strategy.invoke({
-                    "product_type": product_type,
-                    "target_audience": audience,
-                    "budget": budget_level
-                })
-                st.info(result)
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
         
         elif tool_option == "CTR评估":
             st.subheader("📊 CTR评估工具")
@@ -417,7 +485,6 @@ def main():
                     "keywords": keywords
                 })
                 
-<<<<<<< HEAD
                 # 保存结果到session state
                 st.session_state.tool_results['ctr_evaluation'] = {
                     'result': result,
@@ -430,8 +497,6 @@ def main():
                 saved_result = st.session_state.tool_results['ctr_evaluation']
                 result = saved_result['result']
                 
-=======
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     st.metric("CTR评分", result["ctr_percentage"])
@@ -443,7 +508,6 @@ def main():
                 st.write("**优化建议：**")
                 for rec in result["recommendations"]:
                     st.write(f"• {rec}")
-<<<<<<< HEAD
                 
                 st.caption(f"标题：{saved_result['title']} | 关键词：{saved_result['keywords']}")
                 
@@ -451,8 +515,6 @@ def main():
                 if st.button("🗑️ 清除CTR结果"):
                     st.session_state.tool_results['ctr_evaluation'] = None
                     st.rerun()
-=======
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
         
         elif tool_option == "竞品分析":
             st.subheader("🔍 竞品分析工具")
@@ -462,12 +524,12 @@ def main():
             
             if st.button("分析竞品") and competitor_input and our_keywords_input:
                 our_keywords = [k.strip() for k in our_keywords_input.split(",")]
-                result = analyze_competitor_title.invoke({
-                    "competitor_title": competitor_input,
-                    "our_keywords": our_keywords
-                })
+                with use_llm(session_llm()):
+                    result = analyze_competitor_title.invoke({
+                        "competitor_title": competitor_input,
+                        "our_keywords": our_keywords
+                    })
                 
-<<<<<<< HEAD
                 # 保存结果到session state
                 st.session_state.tool_results['competitor_analysis'] = {
                     'result': result,
@@ -480,8 +542,6 @@ def main():
                 saved_result = st.session_state.tool_results['competitor_analysis']
                 result = saved_result['result']
                 
-=======
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
                 st.write(f"**竞品标题：** {result['competitor_title']}")
                 st.write(f"**竞品CTR：** {result['competitor_ctr_analysis']['ctr_percentage']}")
                 
@@ -499,7 +559,6 @@ def main():
                 st.write("**差异化建议：**")
                 for suggestion in result["differentiation_suggestions"]:
                     st.write(f"• {suggestion}")
-<<<<<<< HEAD
                 
                 # 显示详细分析（如果存在）
                 if "detailed_analysis" in result and result["detailed_analysis"] and result["detailed_analysis"] != "未能生成详细分析，请查看LLM连接状态":
@@ -515,8 +574,6 @@ def main():
                 if st.button("🗑️ 清除竞品分析结果"):
                     st.session_state.tool_results['competitor_analysis'] = None
                     st.rerun()
-=======
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
     
     with tab3:
         st.header("💬 智能对话助手")
@@ -532,50 +589,56 @@ def main():
             # 添加用户消息到历史
             st.session_state.chat_history.append({"role": "user", "content": prompt})
             
-<<<<<<< HEAD
-            # 获取AI回复
-            with st.spinner("思考中..."):
-                response = st.session_state.assistant.process_request(prompt)
+            with st.chat_message("user"):
+                st.write(prompt)
+            
+            # 流式获取AI回复：工具调用过程与最终回答逐步显示
+            with st.chat_message("assistant"):
+                status_box = st.status("思考中...", expanded=False)
+                answer_placeholder = st.empty()
+                streamed_answer = ""
+                response = None
+                
+                try:
+                    for event in st.session_state.assistant.stream_request(prompt):
+                        if event["type"] == "tool_start":
+                            status_box.update(label=f"正在调用工具：{event['tool']}")
+                            status_box.write(f"🔧 {event['tool']}：{event['input']}")
+                        elif event["type"] == "tool_end":
+                            status_box.write(f"✅ 工具返回：{event['output'][:200]}")
+                        elif event["type"] == "token":
+                            streamed_answer += event["text"]
+                            answer_placeholder.markdown(streamed_answer + "▌")
+                        elif event["type"] == "final":
+                            response = event
+                except Exception as e:
+                    response = {"success": False, "error": str(e)}
                 
-                if response["success"]:
+                status_box.update(label="处理完成", state="complete")
+                
+                if response and response["success"]:
+                    answer_placeholder.markdown(response["response"])
                     # 添加助手回复到历史
                     st.session_state.chat_history.append({
                         "role": "assistant", 
                         "content": response["response"]
                     })
                 else:
+                    error = response["error"] if response else "未知错误"
+                    answer_placeholder.error(f"处理失败: {error}")
                     # 添加错误信息到历史
                     st.session_state.chat_history.append({
                         "role": "assistant", 
-                        "content": f"处理失败: {response['error']}"
+                        "content": f"处理失败: {error}"
                     })
             
             # 重新运行以显示更新的对话历史
             st.rerun()
-=======
-            with st.chat_message("user"):
-                st.write(prompt)
-            
-            # 获取AI回复
-            with st.chat_message("assistant"):
-                with st.spinner("思考中..."):
-                    response = st.session_state.assistant.process_request(prompt)
-                    
-                    if response["success"]:
-                        st.write(response["response"])
-                        # 添加助手回复到历史
-                        st.session_state.chat_history.append({
-                            "role": "assistant", 
-                            "content": response["response"]
-                        })
-                    else:
-                        st.error(f"处理失败: {response['error']}")
->>>>>>> 897f5b5e2b65b2fb6f20eaeae1ac142ff40eee56
         
         # 清除对话历史
         if st.button("🗑️ 清除对话历史"):
             st.session_state.chat_history = []
-            st.session_state.assistant.memory.clear()
+            st.session_state.assistant.clear_history()
             st.rerun()
     
     with tab4:
@@ -610,7 +673,168 @@ def main():
         with col2:
             st.metric("对话轮次", len(st.session_state.chat_history))
         with col3:
-            st.metric("系统状态", "正常运行")
+            llm_status = st.session_state.assistant.get_llm_status()
+            status_labels = {"mock": "模拟模式", "closed": "正常运行", "half_open": "恢复中", "open": "LLM不可用（规则引擎）"}
+            st.metric("系统状态", status_labels.get(llm_status["state"], llm_status["state"]))
+        
+        # 请求链路追踪
+        st.subheader("🧭 请求链路追踪")
+        traces = get_tracer().get_traces()
+        if traces:
+            trace_index = st.selectbox(
+                "选择请求",
+                range(len(traces)),
+                format_func=lambda i: (f"{traces[i]['name']} | {traces[i]['duration_ms'] / 1000:.2f}s | "
+                                       f"{len(traces[i]['spans'])} spans | {traces[i]['status']}"),
+                key="trace_select"
+            )
+            trace_rows = build_waterfall_rows(traces[trace_index])
+            waterfall = alt.Chart(alt.Data(values=trace_rows)).mark_bar().encode(
+                x=alt.X("start_ms:Q", title="开始时间 (ms)"),
+                x2="end_ms:Q",
+                y=alt.Y("span:N", sort=None, title=None),
+                color=alt.Color("kind:N", title="类型"),
+                tooltip=["span:N", "duration_ms:Q", "status:N", "attributes:N"]
+            ).properties(height=max(120, 24 * len(trace_rows)))
+            st.altair_chart(waterfall, use_container_width=True)
+            
+            with st.expander("span明细"):
+                st.table([
+                    {key: row[key] for key in ["span", "kind", "duration_ms", "status", "attributes"]}
+                    for row in trace_rows
+                ])
+            st.download_button(
+                "导出该请求的trace (JSONL)",
+                "\n".join(json.dumps(span, ensure_ascii=False, default=str) for span in traces[trace_index]["spans"]),
+                file_name=f"trace_{traces[trace_index]['trace_id']}.jsonl"
+            )
+        elif not Config.TRACING_CONFIG["enabled"]:
+            st.caption("请求链路追踪未开启，可在 config.py 的 TRACING_CONFIG 中开启")
+        else:
+            st.caption("暂无追踪记录，在智能对话或一站式方案中发起请求后在此查看耗时瀑布图")
+        
+        # LLM调用统计
+        pool_stats = get_ollama_pool_stats()
+        if pool_stats:
+            st.subheader("🤖 Ollama调用统计")
+            for pool in pool_stats:
+                st.write(f"**{pool['base_url']}** 进行中请求：{pool['in_flight']}/{pool['max_in_flight']}")
+                st.table([
+                    {"指标": name, **summary}
+                    for name, summary in pool["latency"].items()
+                ])
+        
+        # 测量模式：prompt评估与生成耗时拆分
+        measurements = get_generation_measurements()
+        if measurements:
+            st.subheader("⏱️ 单次调用耗时拆分（测量模式）")
+            st.caption("prompt评估token数只统计实际评估部分，命中前缀缓存时会明显小于prompt长度")
+            st.table([
+                {
+                    "模型": item["model"],
+                    "prompt字符数": item["prompt_chars"],
+                    "prompt评估token": item["prompt_eval_count"],
+                    "prompt评估(ms)": item["prompt_eval_ms"],
+                    "生成token": item["eval_count"],
+                    "生成(ms)": item["eval_ms"],
+                    "加载(ms)": item["load_ms"]
+                }
+                for item in reversed(measurements[-20:])
+            ])
+        
+        # LLM响应缓存
+        llm_cache = get_llm_cache()
+        if llm_cache is not None:
+            st.subheader("💾 LLM响应缓存")
+            cache_stats = llm_cache.get_stats()
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("命中率", f"{cache_stats['hit_rate']:.1%}",
+                          help=f"命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']}")
+            with col2:
+                st.metric("内存命中", cache_stats["memory_hits"])
+            with col3:
+                st.metric("磁盘命中", cache_stats["disk_hits"])
+            with col4:
+                st.metric("缓存条目", f"{cache_stats['disk_entries']}/{cache_stats['max_entries']}")
+            if st.button("清空LLM缓存"):
+                llm_cache.clear()
+                st.rerun()
+        
+        # 纯函数结果缓存
+        memo_stats = get_memo_stats()
+        if memo_stats:
+            st.subheader("🧮 计算结果缓存")
+            st.table([
+                {
+                    "函数": name,
+                    "命中率": f"{stats['hit_rate']:.1%}",
+                    "命中": stats["hits"],
+                    "未命中": stats["misses"],
+                    "条目": f"{stats['entries']}/{stats['max_entries']}"
+                }
+                for name, stats in memo_stats.items()
+            ])
+            if st.button("清空计算缓存"):
+                clear_memo_caches()
+                st.rerun()
+        
+        # 模型路由
+        route_stats = get_model_router().get_stats()
+        if route_stats:
+            st.subheader("🔀 模型路由")
+            st.table([
+                {"任务": item["task"], "模型": item["model"], "调用次数": item["count"]}
+                for item in route_stats
+            ])
+        
+        # 知识库检索指标
+        st.subheader("🔍 知识库检索指标")
+        
+        kb = get_knowledge_base(st.session_state.assistant.embedding_type)
+        
+        probe_query = st.text_input("测试检索", placeholder="例如：如何优化商品标题", key="kb_probe_query")
+        if st.button("执行检索") and probe_query:
+            probe_results = kb.search(probe_query, k=Config.KNOWLEDGE_BASE_CONFIG["top_k"])
+            st.caption(f"找到 {len(probe_results)} 个相关结果")
+        
+        kb_stats = kb.get_stats()
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("索引类型", kb_stats["index_type"] or "未建立")
+        with col2:
+            st.metric("向量维度", kb_stats["embedding_dimension"] or "-")
+        with col3:
+            st.metric("索引内存", f"{kb_stats['index_memory_bytes'] / 1024:.1f} KB")
+        with col4:
+            st.metric("向量数量", kb_stats["document_count"])
+        st.caption(f"向量存储格式：{kb_stats['vector_storage']}")
+        
+        if kb_stats["quantization_report"]:
+            report = kb_stats["quantization_report"]
+            st.write(f"**量化效果：** recall@{report['k']} 相对float32为 {report['recall_vs_float32']:.2%}，"
+                     f"索引内存 {report['float32_memory_bytes'] / 1024:.1f} KB → {report['memory_bytes'] / 1024:.1f} KB")
+        
+        st.write("**最近一次构建各阶段耗时（秒）：**")
+        if kb_stats["last_build_timings"]:
+            st.json(kb_stats["last_build_timings"])
+        else:
+            st.caption("本进程内尚未构建向量库")
+        
+        st.write("**检索延迟（毫秒）：**")
+        stage_names = {"embed": "查询向量化", "index": "索引检索", "total": "总计"}
+        st.table([
+            {"阶段": stage_names[stage], **summary}
+            for stage, summary in kb_stats["search_latency"].items()
+        ])
+        
+        st.write("**缓存命中率：**")
+        cache_cols = st.columns(len(kb_stats["cache"]))
+        for cache_col, (cache_name, cache_stats) in zip(cache_cols, kb_stats["cache"].items()):
+            with cache_col:
+                st.metric(cache_name, f"{cache_stats['hit_rate']:.1%}",
+                          help=f"命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']}")
 
 
 if __name__ == "__main__":